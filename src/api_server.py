@@ -0,0 +1,337 @@
+import os
+import re
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date as date_type
+from urllib.parse import urlsplit, parse_qs, unquote
+from database import db
+
+API_HOST = os.getenv('API_HOST', '0.0.0.0')
+API_PORT = int(os.getenv('API_PORT', '8080'))
+DB_WORKERS = int(os.getenv('API_DB_WORKERS', '8'))  # Threads issuing queries on the shared pooled client
+CHANGE_POLL_INTERVAL = 1.0  # Seconds between checks of the database change counter
+CACHE_TTL = 300  # Seconds a cached response may be served if change polling fails
+MAX_CACHE_ENTRIES = 1024
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_HEADER_BYTES = 8192
+KEEPALIVE_TIMEOUT = 15  # Seconds an idle connection is kept open
+
+STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    431: 'Request Header Fields Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'
+}
+
+# (pattern, handler name) pairs, matched against the request path in order
+ROUTES = [
+    (re.compile(r'^/health$'), 'health'),
+    (re.compile(r'^/attendance/today$'), 'attendance_today'),
+    (re.compile(r'^/attendance/range$'), 'attendance_range'),
+    (re.compile(r'^/attendance$'), 'attendance'),
+    (re.compile(r'^/stats/daily$'), 'daily_stats'),
+    (re.compile(r'^/summary$'), 'summary'),
+    (re.compile(r'^/users$'), 'users'),
+    (re.compile(r'^/users/([^/]+)/stats$'), 'user_stats'),
+    (re.compile(r'^/users/([^/]+)/attendance$'), 'user_attendance'),
+]
+
+class BadRequest(Exception):
+    pass
+
+def _json_default(value):
+    if isinstance(value, (datetime, date_type)):
+        return value.isoformat()
+    return str(value)
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+def _date_param(query, name, default=None):
+    value = query.get(name, default)
+    if value is None:
+        raise BadRequest(f"missing '{name}' (YYYY-MM-DD)")
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise BadRequest(f"'{name}' must be YYYY-MM-DD")
+    return value
+
+def _page_params(query):
+    try:
+        skip = int(query.get('skip', 0))
+        limit = int(query.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("'skip' and 'limit' must be integers")
+    if skip < 0 or limit <= 0:
+        raise BadRequest("'skip' must be >= 0 and 'limit' > 0")
+    return skip, min(limit, MAX_PAGE_SIZE)
+
+class ResponseCache:
+    """LRU cache of serialized JSON responses.
+
+    Every clear() starts a new generation. A query records the generation
+    before it runs and its result is only stored if no clear happened
+    meanwhile, so a response computed from pre-write data is never cached
+    after the write invalidated it. Entries also expire after ttl seconds
+    in case change polling stops working.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=MAX_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generation = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        body, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return body
+
+    def put(self, key, body, generation):
+        if generation != self.generation:
+            return
+        self.entries[key] = (body, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.generation += 1
+
+class AttendanceAPI:
+    """Read-only JSON API over the attendance database.
+
+    Requests are served by one asyncio loop. Database methods are blocking
+    pymongo calls, so they run on a small thread pool sharing the module's
+    single pooled client. Identical concurrent requests share one query,
+    and responses stay cached until the database change counter moves.
+    """
+
+    def __init__(self, host=API_HOST, port=API_PORT, workers=DB_WORKERS,
+                 poll_interval=CHANGE_POLL_INTERVAL, cache=None):
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.cache = cache or ResponseCache()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-db')
+        self.change_counter = None
+        self.stats = {'requests': 0, 'cache_hits': 0, 'queries': 0, 'invalidations': 0}
+        self._inflight = {}
+
+    # Route handlers turn the path arguments and query string into a Database call
+
+    def _attendance_today(self, query):
+        return db.get_attendance, (_today(),) + _page_params(query)
+
+    def _attendance(self, query):
+        return db.get_attendance, (_date_param(query, 'date', _today()),) + _page_params(query)
+
+    def _attendance_range(self, query):
+        start_date = _date_param(query, 'start')
+        end_date = _date_param(query, 'end')
+        return db.get_attendance_range, (start_date, end_date) + _page_params(query)
+
+    def _daily_stats(self, query):
+        return db.get_daily_stats, (_date_param(query, 'date', _today()),)
+
+    def _summary(self, query):
+        if 'start' in query or 'end' in query:
+            return db.get_attendance_summary, (_date_param(query, 'start'), _date_param(query, 'end'))
+        return db.get_attendance_summary, ()
+
+    def _users(self, query):
+        return db.get_all_users, _page_params(query)
+
+    def _user_stats(self, query, user_id):
+        return db.get_user_stats, (user_id,)
+
+    def _user_attendance(self, query, user_id):
+        return db.get_user_attendance, (user_id,) + _page_params(query)
+
+    async def dispatch(self, method, target):
+        """Return (status, body, served from cache) for a request"""
+        self.stats['requests'] += 1
+        if method != 'GET':
+            return 405, self._error("only GET is supported"), False
+
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        for pattern, name in ROUTES:
+            match = pattern.match(url.path)
+            if match:
+                break
+        else:
+            return 404, self._error(f"no route for {url.path}"), False
+
+        if name == 'health':
+            return 200, self._serialize(self.health()), False
+
+        try:
+            function, args = getattr(self, '_' + name)(query, *map(unquote, match.groups()))
+        except BadRequest as e:
+            return 400, self._error(str(e)), False
+
+        # Dates are resolved before keying, so /attendance/today rolls over at midnight
+        key = f"{name}:{json.dumps(args)}"
+        body = self.cache.get(key)
+        if body is not None:
+            self.stats['cache_hits'] += 1
+            return 200, body, True
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._query(key, function, args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        status, body = await asyncio.shield(task)
+        return status, body, False
+
+    async def _query(self, key, function, args):
+        generation = self.cache.generation
+        self.stats['queries'] += 1
+        loop = asyncio.get_event_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, function, *args)
+        except Exception as e:
+            print(f"❌ Error serving {key}: {str(e)}")
+            return 500, self._error("query failed")
+        if result is None:
+            # Database methods return None when MongoDB failed, never cache that
+            return 503, self._error("database unavailable")
+        body = self._serialize(result)
+        self.cache.put(key, body, generation)
+        return 200, body
+
+    def health(self):
+        return {
+            'status': 'ok' if self.change_counter is not None else 'degraded',
+            'change_counter': self.change_counter,
+            'cached_responses': len(self.cache.entries),
+            **self.stats
+        }
+
+    @staticmethod
+    def _serialize(result):
+        return json.dumps(result, default=_json_default).encode('utf-8')
+
+    @staticmethod
+    def _error(message):
+        return json.dumps({'error': message}).encode('utf-8')
+
+    async def watch_changes(self):
+        """Clear the response cache whenever the database change counter moves"""
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                counter = await loop.run_in_executor(self.executor, db.get_change_counter)
+            except Exception as e:
+                print(f"❌ Error polling change counter: {str(e)}")
+                counter = None
+            # An unreachable database also clears, as empty results may have been cached meanwhile
+            if counter is None or counter != self.change_counter:
+                if self.cache.entries:
+                    self.stats['invalidations'] += 1
+                self.cache.clear()
+                self.change_counter = counter
+            await asyncio.sleep(self.poll_interval)
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes or idles out"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    self._respond(writer, 431, self._error("request header too large"), False, False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    self._respond(writer, 400, self._error("malformed request line"), False, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                # Read past any body so the next request on the connection parses cleanly
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    self._respond(writer, 400, self._error("invalid Content-Length"), False, False)
+                    break
+                if length:
+                    await reader.readexactly(length)
+
+                try:
+                    status, body, cached = await self.dispatch(method, target)
+                except Exception as e:
+                    print(f"❌ Error handling {target}: {str(e)}")
+                    status, body, cached = 500, self._error("internal error"), False
+                self._respond(writer, status, body, cached, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _respond(writer, status, body, cached, keep_alive):
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"X-Cache: {'HIT' if cached else 'MISS'}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES)
+        watcher = asyncio.ensure_future(self.watch_changes())
+        print(f"✅ Attendance API listening on http://{self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            self.executor.shutdown(wait=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve attendance data as a read-only JSON API")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--workers', type=int, default=DB_WORKERS, help="Threads running database queries")
+    parser.add_argument('--poll-interval', type=float, default=CHANGE_POLL_INTERVAL,
+                        help="Seconds between cache invalidation checks")
+    args = parser.parse_args()
+
+    api = AttendanceAPI(args.host, args.port, args.workers, args.poll_interval)
+    try:
+        asyncio.run(api.serve())
+    except KeyboardInterrupt:
+        print("\n👋 API server stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import sys
+from database import db, HOT_MONTHS
+
+def main():
+    hot_months = int(sys.argv[1]) if len(sys.argv) > 1 else HOT_MONTHS
+    print(f"📦 Archiving attendance older than {hot_months} months...")
+    archived_count = db.archive_old_attendance(hot_months)
+    print(f"✅ Moved {archived_count} attendance records into archive partitions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import time
+import argparse
+import cv2
+from detectors import DETECTORS, create_detector
+
+DATASET_DIR = "images/registered"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def load_images(dataset_dir=DATASET_DIR):
+    """Load the registered photos, each of which shows exactly one person"""
+    images = []
+    for img_name in sorted(os.listdir(dataset_dir)):
+        if not img_name.endswith(IMAGE_EXTENSIONS):
+            continue
+        image = cv2.imread(os.path.join(dataset_dir, img_name))
+        if image is not None:
+            images.append((img_name, image))
+    return images
+
+def benchmark(name, images, repeats=5, batch_size=1):
+    """Time a detector backend over the images and measure its recall"""
+    detector = create_detector(name)
+    frames = [image for _, image in images]
+
+    # Warm up so model loading is not timed
+    detector.detect(frames[0])
+
+    results = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        results = []
+        for i in range(0, len(frames), batch_size):
+            batch = frames[i:i + batch_size]
+            if batch_size > 1:
+                results.extend(detector.detect_batch(batch))
+            else:
+                results.extend(detector.detect(frame) for frame in batch)
+    elapsed = time.perf_counter() - start
+
+    detected = sum(1 for boxes in results if boxes)
+    extra_boxes = sum(max(len(boxes) - 1, 0) for boxes in results)
+    missed = [img_name for (img_name, _), boxes in zip(images, results) if not boxes]
+    return {
+        'backend': name,
+        'images_per_sec': len(frames) * repeats / elapsed,
+        'faces_per_sec': sum(len(boxes) for boxes in results) * repeats / elapsed,
+        'recall': detected / len(frames),
+        'extra_boxes': extra_boxes,
+        'missed': missed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU benchmark of the face detector backends")
+    parser.add_argument('--backends', nargs='+', default=list(DETECTORS), help="Backends to run")
+    parser.add_argument('--dataset', default=DATASET_DIR, help="Directory of single-person photos")
+    parser.add_argument('--repeats', type=int, default=5, help="Passes over the dataset")
+    parser.add_argument('--batch-size', type=int, default=1, help="Frames per detect_batch call")
+    parser.add_argument('--threads', type=int, default=None, help="OpenCV worker threads")
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    images = load_images(args.dataset)
+    if not images:
+        print(f"❌ No images found in {args.dataset}")
+        return
+
+    print(f"📊 Benchmarking on {len(images)} images, {args.repeats} passes, batch size {args.batch_size}\n")
+    print(f"{'Backend':<8} {'Images/s':>10} {'Faces/s':>10} {'Recall':>8} {'Extra':>6}")
+    for name in args.backends:
+        try:
+            result = benchmark(name, images, args.repeats, args.batch_size)
+        except (ImportError, FileNotFoundError, ValueError) as e:
+            print(f"{name:<8} skipped: {e}")
+            continue
+        print(f"{result['backend']:<8} {result['images_per_sec']:>10.1f} {result['faces_per_sec']:>10.1f} "
+              f"{result['recall']:>8.2%} {result['extra_boxes']:>6}")
+        if result['missed']:
+            print(f"         missed: {', '.join(result['missed'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import time
+import argparse
+import tracemalloc
+from camera import Camera
+from recognition import create_engine, AttendanceSink, RecognitionPipeline
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def rss_bytes():
+    """Resident set size of this process"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+class _DetectOnlyEngine:
+    # Used when no model is trained, so the capture and detect path can still be measured
+    def identify(self, frame, gray, box, state, pool=None):
+        return None, 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Steady-state memory of the capture, detect and recognize loop")
+    parser.add_argument('--source', default='synthetic',
+                        help="'synthetic', a camera index, a video file or a stream URL")
+    parser.add_argument('--duration', type=float, default=300, help="Seconds to run")
+    parser.add_argument('--interval', type=float, default=30, help="Seconds between samples")
+    parser.add_argument('--warmup', type=int, default=100, help="Frames before the baseline sample")
+    args = parser.parse_args()
+
+    if args.source == 'synthetic':
+        camera = Camera('synthetic:benchmark')
+    else:
+        camera = Camera(int(args.source) if args.source.isdigit() else args.source)
+    camera.start()
+
+    engine = create_engine() or _DetectOnlyEngine()
+    sink = AttendanceSink(lambda user_id, timestamp: None)
+    pipeline = RecognitionPipeline(engine, sink)
+
+    for _ in range(args.warmup):
+        frame, gray = camera.read()
+        pipeline.process_frame(frame, gray)
+
+    tracemalloc.start()
+    baseline = rss_bytes()
+    start = time.perf_counter()
+    next_sample = start + args.interval
+    frames = 0
+    print(f"📊 Baseline RSS {baseline / 2**20:.1f} MiB after {args.warmup} warm-up frames\n")
+    print(f"{'Elapsed':>8} {'Frames':>8} {'FPS':>7} {'RSS MiB':>9} {'Drift MiB':>10} {'Py alloc MiB':>13}")
+    try:
+        while time.perf_counter() - start < args.duration:
+            frame, gray = camera.read()
+            if frame is None:
+                print("❌ Failed to grab frame")
+                break
+            pipeline.process_frame(frame, gray)
+            frames += 1
+
+            now = time.perf_counter()
+            if now >= next_sample:
+                rss = rss_bytes()
+                traced, _ = tracemalloc.get_traced_memory()
+                print(f"{now - start:>7.0f}s {frames:>8} {frames / (now - start):>7.1f} "
+                      f"{rss / 2**20:>9.1f} {(rss - baseline) / 2**20:>10.2f} {traced / 2**20:>13.2f}")
+                next_sample += args.interval
+    finally:
+        tracemalloc.stop()
+        sink.close()
+        camera.stop()
+
+if __name__ == "__main__":
+    main()
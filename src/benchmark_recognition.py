@@ -0,0 +1,110 @@
+import time
+import argparse
+import cv2
+import numpy as np
+from benchmark_detectors import DATASET_DIR, load_images
+from detectors import create_detector
+from recognition import create_engine
+from embedding_engine import EmbeddingEngine, face_recognition
+from identities import IdentityResolver
+
+ENGINES = ('lbph', 'embedding')
+
+def augment(image):
+    """Return the original photo plus flipped, brightened, darkened and blurred copies"""
+    return [
+        image,
+        cv2.flip(image, 1),
+        cv2.convertScaleAbs(image, alpha=1.0, beta=40),
+        cv2.convertScaleAbs(image, alpha=0.7, beta=0),
+        cv2.GaussianBlur(image, (5, 5), 0)
+    ]
+
+def build_samples(images, detector):
+    """Detect the largest face in every augmented photo, labelled by its identity"""
+    resolver = IdentityResolver.load()
+    samples = []
+    for img_name, image in images:
+        user_id = resolver.user_id_for(img_name)
+        for frame in augment(image):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            box = detector.detect_largest(frame, gray)
+            if box is not None:
+                samples.append((user_id, frame, gray, box))
+    return samples
+
+def embedding_loader(images, detector):
+    """Loader that encodes the registered photos in memory instead of reading MongoDB"""
+    resolver = IdentityResolver.load()
+    def load():
+        user_ids, encodings = [], []
+        for img_name, image in images:
+            box = detector.detect_largest(image)
+            if box is None:
+                continue
+            x, y, w, h = box
+            rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            found = face_recognition.face_encodings(rgb, known_face_locations=[(y, x + w, y + h, x)])
+            if found:
+                user_ids.append(resolver.user_id_for(img_name))
+                encodings.append(found[0])
+        matrix = np.array(encodings, dtype=np.float32) if encodings else np.empty((0, 128), dtype=np.float32)
+        return user_ids, matrix
+    return load
+
+def make_engine(name, images, detector):
+    if name == 'lbph':
+        engine = create_engine('lbph')
+        if engine is None:
+            raise FileNotFoundError("no trained LBPH model, run train_model.py first")
+        return engine
+    if face_recognition is None:
+        raise ImportError("face_recognition is not installed")
+    return EmbeddingEngine(embedding_loader(images, detector))
+
+def benchmark(engine, samples, track_frames=1):
+    """Time engine.identify over the samples, each kept in view for track_frames frames"""
+    correct = 0
+    start = time.perf_counter()
+    for user_id, frame, gray, box in samples:
+        # One state dict per sample simulates a single tracked face
+        state = {}
+        for _ in range(track_frames):
+            predicted, _ = engine.identify(frame, gray, box, state)
+        correct += predicted == user_id
+    elapsed = time.perf_counter() - start
+    return {
+        'faces_per_sec': len(samples) * track_frames / elapsed,
+        'accuracy': correct / len(samples)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU benchmark of the LBPH and embedding recognition engines")
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=ENGINES, help="Engines to run")
+    parser.add_argument('--dataset', default=DATASET_DIR, help="Directory of single-person photos")
+    parser.add_argument('--detector', default=None, help="Face detector backend used to find the boxes")
+    parser.add_argument('--track-frames', type=int, default=1,
+                        help="Frames each face stays in view, reusing its track state")
+    args = parser.parse_args()
+
+    images = load_images(args.dataset)
+    if not images:
+        print(f"❌ No images found in {args.dataset}")
+        return
+
+    detector = create_detector(args.detector)
+    samples = build_samples(images, detector)
+    print(f"📊 Benchmarking on {len(samples)} faces from {len(images)} photos, "
+          f"{args.track_frames} frame(s) per track\n")
+    print(f"{'Engine':<10} {'Faces/s':>10} {'Accuracy':>9}")
+    for name in args.engines:
+        try:
+            engine = make_engine(name, images, detector)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"{name:<10} skipped: {e}")
+            continue
+        result = benchmark(engine, samples, args.track_frames)
+        print(f"{name:<10} {result['faces_per_sec']:>10.1f} {result['accuracy']:>9.2%}")
+
+if __name__ == "__main__":
+    main()
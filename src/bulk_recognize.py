@@ -0,0 +1,200 @@
+import os
+import csv
+import time
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+from camera import FramePool
+from detectors import create_detector
+from recognition import create_engine
+from tracking import FaceTracker
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.ts')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+CHUNK_SECONDS = 600  # Length of the video slice handed to one worker
+SAMPLE_FPS = 2.0  # Frames analyzed per second of footage
+IMAGES_PER_CHUNK = 200
+
+# Per-process recognition state, created once by the pool initializer
+_worker = {}
+
+def _init_worker(engine_name, detector_name):
+    # One OpenCV thread per process, the pool provides the parallelism
+    cv2.setNumThreads(1)
+    _worker['engine'] = create_engine(engine_name)
+    _worker['detector'] = create_detector(detector_name)
+
+def _recognize(frame, tracker, pool):
+    """Return (user_id, confidence) for each recognized face in a frame"""
+    gray = pool.gray(frame)
+    faces = _worker['detector'].detect(frame, gray)
+    track_ids = tracker.update(faces)
+    hits = []
+    for box, track_id in zip(faces, track_ids):
+        user_id, confidence = _worker['engine'].identify(frame, gray, box, tracker.state(track_id), pool)
+        if user_id is not None:
+            hits.append((user_id, float(confidence)))
+    return hits
+
+def process_video_chunk(path, start_frame, end_frame, step, started_at, fps):
+    """Recognize every step-th frame of [start_frame, end_frame), returning (sightings, frames analyzed)"""
+    if _worker['engine'] is None:
+        raise RuntimeError("No recognition engine available, train the model first")
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    tracker = FaceTracker()
+    pool = FramePool()
+    sightings = []
+    analyzed = 0
+    frame = None
+    try:
+        for index in range(start_frame, end_frame):
+            # grab() skips decoding into BGR for frames that are not analyzed
+            if not cap.grab():
+                break
+            if (index - start_frame) % step:
+                continue
+            ret, frame = cap.retrieve(image=frame)
+            if not ret:
+                break
+            analyzed += 1
+            timestamp = started_at + timedelta(seconds=index / fps)
+            sightings.extend((user_id, timestamp, confidence) for user_id, confidence in _recognize(frame, tracker, pool))
+    finally:
+        cap.release()
+    return sightings, analyzed
+
+def process_images(paths):
+    """Recognize a batch of still images, timestamped by file modification time"""
+    if _worker['engine'] is None:
+        raise RuntimeError("No recognition engine available, train the model first")
+    pool = FramePool()
+    sightings = []
+    analyzed = 0
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        analyzed += 1
+        timestamp = datetime.fromtimestamp(os.path.getmtime(path))
+        # Stills are unrelated, so each gets a fresh tracker
+        for user_id, confidence in _recognize(frame, FaceTracker(), pool):
+            sightings.append((user_id, timestamp, confidence))
+    return sightings, analyzed
+
+def plan_jobs(inputs, start=None, chunk_seconds=CHUNK_SECONDS, sample_fps=SAMPLE_FPS):
+    """Split the inputs into (function, args) jobs and return them with the seconds of footage covered"""
+    jobs = []
+    footage_seconds = 0.0
+    for path in inputs:
+        if os.path.isdir(path):
+            images = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            for i in range(0, len(images), IMAGES_PER_CHUNK):
+                jobs.append((process_images, (images[i:i + IMAGES_PER_CHUNK],)))
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                print(f"❌ Failed to open video: {path}")
+                continue
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            duration = frame_count / fps
+            footage_seconds += duration
+
+            # Without --start, assume the recording ended when the file was last written
+            started_at = start or datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=duration)
+            step = max(int(round(fps / sample_fps)), 1)
+            chunk_frames = max(int(chunk_seconds * fps) // step * step, step)
+            for first in range(0, frame_count, chunk_frames):
+                jobs.append((process_video_chunk, (path, first, min(first + chunk_frames, frame_count), step, started_at, fps)))
+        else:
+            print(f"⚠️ Skipping unsupported input: {path}")
+    return jobs, footage_seconds
+
+def to_sessions(sightings):
+    """Deduplicate sightings into first/last seen per user per day"""
+    sessions = {}
+    for user_id, timestamp, _ in sightings:
+        key = (timestamp.strftime("%Y-%m-%d"), user_id)
+        session = sessions.get(key)
+        if session is None:
+            sessions[key] = {'date': key[0], 'user_id': user_id, 'first_seen': timestamp,
+                             'last_seen': timestamp, 'sightings': 1}
+        else:
+            session['first_seen'] = min(session['first_seen'], timestamp)
+            session['last_seen'] = max(session['last_seen'], timestamp)
+            session['sightings'] += 1
+    return sorted(sessions.values(), key=lambda session: (session['date'], session['first_seen']))
+
+def write_csv(sessions, csv_path):
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'User ID', 'First Seen', 'Last Seen', 'Sightings'])
+        for session in sessions:
+            writer.writerow([
+                session['date'], session['user_id'],
+                session['first_seen'].strftime("%H:%M:%S"), session['last_seen'].strftime("%H:%M:%S"),
+                session['sightings']
+            ])
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognize faces in recorded footage and image folders")
+    parser.add_argument('inputs', nargs='+', help="Video files and/or directories of images")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--chunk-seconds', type=float, default=CHUNK_SECONDS, help="Video seconds per job")
+    parser.add_argument('--sample-fps', type=float, default=SAMPLE_FPS, help="Frames analyzed per second of video")
+    parser.add_argument('--start', help="Recording start time 'YYYY-MM-DD HH:MM:SS' for the videos")
+    parser.add_argument('--engine', default=None, help="Recognition engine (lbph or embedding)")
+    parser.add_argument('--detector', default=None, help="Face detector backend")
+    parser.add_argument('--csv', help="Write attendance to this CSV file instead of MongoDB")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d %H:%M:%S") if args.start else None
+    jobs, footage_seconds = plan_jobs(args.inputs, start, args.chunk_seconds, args.sample_fps)
+    if not jobs:
+        print("❌ Nothing to process")
+        return
+
+    print(f"🔄 Processing {len(jobs)} jobs on {args.workers} workers...")
+    began = time.perf_counter()
+    sightings = []
+    analyzed = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.engine, args.detector)) as executor:
+        futures = [executor.submit(function, *job_args) for function, job_args in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                job_sightings, job_frames = future.result()
+                sightings.extend(job_sightings)
+                analyzed += job_frames
+            except Exception as e:
+                failed += 1
+                print(f"❌ Job failed: {str(e)}")
+            print(f"   {done}/{len(jobs)} jobs done", end='\r')
+    elapsed = time.perf_counter() - began
+
+    sessions = to_sessions(sightings)
+    if args.csv:
+        write_csv(sessions, args.csv)
+        print(f"\n✅ Wrote {len(sessions)} attendance records to {args.csv}")
+    else:
+        from database import db
+        if db.upsert_sessions(sessions):
+            print(f"\n✅ Saved {len(sessions)} attendance records to MongoDB")
+        else:
+            print("\n❌ Failed to save attendance to MongoDB")
+
+    print(f"📊 {analyzed} frames analyzed in {elapsed:.1f}s ({analyzed / elapsed:.1f} frames/s), "
+          f"{len(sightings)} sightings, {failed} failed jobs")
+    if footage_seconds:
+        print(f"📊 {footage_seconds / 3600:.2f} h of footage at {footage_seconds / elapsed:.0f}x real time")
+
+if __name__ == "__main__":
+    main()
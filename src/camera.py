@@ -1,28 +1,170 @@
 import cv2
+import os
+import time
 import logging
+import numpy as np
+from camera_discovery import discovery, LOCAL_INDICES
+
+class FramePool:
+    """Reusable image buffers for one camera's capture and detect loop.
+
+    Buffers are keyed by name and reallocated only when the requested shape
+    changes, so a steady stream reuses the same memory every frame. Images
+    returned from the pool are overwritten by the next call with the same
+    name; copy them if they must outlive the current frame.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Return the named buffer, allocating it if the shape or dtype changed"""
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self._buffers[name] = np.empty(shape, dtype)
+        return buf
+
+    def gray(self, frame, name='gray'):
+        """Convert a BGR frame to grayscale into a pooled buffer"""
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.get(name, frame.shape[:2]))
+
+    def resize(self, image, size, name='resize'):
+        """Resize an image to (width, height) into a pooled buffer"""
+        shape = (size[1], size[0]) + image.shape[2:]
+        return cv2.resize(image, size, dst=self.get(name, shape, image.dtype))
+
+    def rgb(self, image, name='rgb'):
+        """Convert a BGR image (or ROI view) to RGB into a pooled buffer"""
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self.get(name, image.shape))
+
+    @staticmethod
+    def roi(image, box):
+        """View of an (x, y, w, h) region, no copy is made"""
+        x, y, w, h = box
+        return image[y:y+h, x:x+w]
+
+SYNTHETIC_PREFIX = 'synthetic:'
+SYNTHETIC_DATASET_DIR = "images/registered"
+SYNTHETIC_FRAME_SIZE = (640, 480)
+# Packed 4:2:2 formats read as (height, width, 2): fourcc -> (luma channel, BGR conversion)
+PACKED_YUV_FORMATS = {
+    cv2.VideoWriter_fourcc(*'YUYV'): (0, cv2.COLOR_YUV2BGR_YUYV),
+    cv2.VideoWriter_fourcc(*'YUY2'): (0, cv2.COLOR_YUV2BGR_YUY2),
+    cv2.VideoWriter_fourcc(*'UYVY'): (1, cv2.COLOR_YUV2BGR_UYVY),
+}
+
+class SyntheticCapture:
+    """cv2.VideoCapture stand-in that loops over the registered photos.
+
+    Used for benchmarks and load tests where no real camera exists. With
+    fps set, read() is paced like a live camera; with fps None frames are
+    returned as fast as they are requested.
+    """
+
+    def __init__(self, source=None, dataset_dir=SYNTHETIC_DATASET_DIR, frame_size=SYNTHETIC_FRAME_SIZE, fps=None):
+        self.frames = []
+        if os.path.isdir(dataset_dir):
+            for img_name in sorted(os.listdir(dataset_dir)):
+                image = cv2.imread(os.path.join(dataset_dir, img_name))
+                if image is not None:
+                    self.frames.append(cv2.resize(image, frame_size))
+        self.fps = fps
+        self.index = 0
+        self._next_frame = time.monotonic()
+
+    def isOpened(self):
+        return bool(self.frames)
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        return float(self.fps or 0) if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def read(self, image=None):
+        if not self.frames:
+            return False, image
+        if self.fps:
+            delay = self._next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_frame = max(self._next_frame, time.monotonic() - 1) + 1.0 / self.fps
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if image is None or image.shape != frame.shape:
+            image = np.empty_like(frame)
+        np.copyto(image, frame)
+        return True, image
+
+    def release(self):
+        self.frames = []
+
+def create_capture(source):
+    """Open a capture for a camera index, file or URL, or a 'synthetic:<name>[@fps]' test camera"""
+    if isinstance(source, str) and source.startswith(SYNTHETIC_PREFIX):
+        _, _, fps = source[len(SYNTHETIC_PREFIX):].partition('@')
+        return SyntheticCapture(source, fps=float(fps) if fps else None)
+    return cv2.VideoCapture(source)
 
 class Camera:
-    def __init__(self, camera_id=0):
-        """Initialize camera with specified ID (default is 0 for primary camera)"""
+    def __init__(self, camera_id=0, luma=True, capture_factory=create_capture):
+        """Initialize camera with specified ID (default is 0 for primary camera).
+
+        With luma=True the camera is asked for raw YUYV or UYVY frames where
+        the backend supports it, so grayscale comes straight from the Y plane.
+        capture_factory builds the capture object (create_capture by default).
+        """
         self.camera_id = camera_id
         self.cam = None
         self.is_running = False
+        self.luma = luma
+        self.capture_factory = capture_factory
+        self.buffers = FramePool()
+        self._packed = None  # (luma channel, BGR conversion) of raw frames
+        self._raw = None
+        self._frame = None
 
     def start(self):
         """Start the camera"""
         if not self.is_running:
-            self.cam = cv2.VideoCapture(self.camera_id)
+            self.cam = self.capture_factory(self.camera_id)
             if not self.cam.isOpened():
                 raise Exception("Failed to open camera")
             self.is_running = True
+            if self.luma:
+                self._enable_luma()
             return True
         return False
 
+    def _enable_luma(self):
+        # Only local devices (V4L2, DirectShow, MSMF) deliver raw packed YUV
+        # frames, as (height, width, 2); files and network streams decode to
+        # other layouts. The fourcc tells where Y sits, other formats use BGR
+        if not isinstance(self.camera_id, int) or not self.cam.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+            return
+        ret, raw = self.cam.read()
+        packed = PACKED_YUV_FORMATS.get(int(self.cam.get(cv2.CAP_PROP_FOURCC)) & 0xFFFFFFFF)
+        if packed and ret and raw is not None and raw.ndim == 3 and raw.shape[2] == 2:
+            self._packed = packed
+            self._raw = raw
+            return
+
+        # Some backends don't switch back to BGR cleanly, so reopen the device
+        self.cam.release()
+        self.cam = self.capture_factory(self.camera_id)
+        if not self.cam.isOpened():
+            self.is_running = False
+            raise Exception("Failed to open camera")
+
     def stop(self):
         """Stop the camera"""
         if self.is_running:
             self.cam.release()
-            cv2.destroyAllWindows()
+            try:
+                cv2.destroyAllWindows()
+            except cv2.error:
+                # Headless OpenCV builds (servers, cluster workers) have no windows
+                pass
             self.is_running = False
             return True
         return False
@@ -37,6 +179,32 @@ class Camera:
             return None
         return frame
 
+    def read(self):
+        """Read the next frame into pooled buffers and return (frame, gray), or (None, None).
+
+        Both images are reused by the next read, copy them to keep them longer.
+        """
+        if not self.is_running:
+            return None, None
+
+        if self._packed:
+            ret, raw = self.cam.read(image=self._raw)
+            if not ret:
+                return None, None
+            self._raw = raw
+            height, width = raw.shape[:2]
+            luma_channel, conversion = self._packed
+            gray = cv2.extractChannel(raw, luma_channel, dst=self.buffers.get('gray', (height, width)))
+            frame = cv2.cvtColor(raw, conversion, dst=self.buffers.get('frame', (height, width, 3)))
+            return frame, gray
+
+        ret, frame = self.cam.read(image=self._frame)
+        if not ret:
+            return None, None
+        # Keep whatever the backend returned as the buffer for the next read
+        self._frame = frame
+        return frame, self.buffers.gray(frame)
+
     def show_frame(self, frame, window_name='Camera'):
         """Display a frame in a window"""
         if frame is None:
@@ -76,14 +244,8 @@ class Camera:
 
     @staticmethod
     def list_cameras():
-        """List available cameras"""
-        available_cameras = []
-        for i in range(10):  # Check first 10 camera indices
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                available_cameras.append(i)
-                cap.release()
-        return available_cameras
+        """List available cameras, probing the first 10 indices concurrently with a cached result"""
+        return discovery.healthy(LOCAL_INDICES)
 
     def __enter__(self):
         """Context manager entry"""
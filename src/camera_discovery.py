@@ -0,0 +1,146 @@
+import os
+import time
+import threading
+import cv2
+
+PROBE_TIMEOUT = 3.0  # Seconds before a source that hasn't answered is reported unhealthy
+CACHE_TTL = 60  # Seconds a probe result is reused
+REPROBE_INTERVAL = 30  # Seconds between background re-probes of unhealthy sources
+LOCAL_INDICES = range(10)
+# Comma-separated RTSP/HTTP URLs watched in addition to local devices
+CAMERA_STREAMS = [url.strip() for url in os.getenv('CAMERA_STREAMS', '').split(',') if url.strip()]
+
+def probe(source, timeout=PROBE_TIMEOUT, abandoned=None):
+    """Open a camera index or stream URL, read one frame and report its health.
+
+    abandoned is an Event set once the caller stopped waiting; an open that
+    returns after that is released straight away instead of being read.
+    """
+    started = time.monotonic()
+    result = {'source': source, 'healthy': False, 'error': None, 'resolution': None}
+    cap = None
+    try:
+        if isinstance(source, str) and source.startswith('synthetic:'):
+            # Test cameras from camera.create_capture (imported here, camera imports this module)
+            from camera import create_capture
+            cap = create_capture(source)
+        elif isinstance(source, str):
+            # FFmpeg honours these, so dead streams fail fast instead of after its 30 s default
+            timeout_ms = int(timeout * 1000)
+            cap = cv2.VideoCapture(source, cv2.CAP_ANY, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms
+            ])
+        else:
+            cap = cv2.VideoCapture(source)
+        if abandoned is not None and abandoned.is_set():
+            result['error'] = "timed out"
+        elif not cap.isOpened():
+            result['error'] = "cannot open"
+        else:
+            ret, frame = cap.read()
+            if ret and frame is not None:
+                result['healthy'] = True
+                result['resolution'] = (frame.shape[1], frame.shape[0])
+            else:
+                result['error'] = "no frames"
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        if cap is not None:
+            cap.release()
+    result['latency'] = time.monotonic() - started
+    result['checked_at'] = time.time()
+    return result
+
+class CameraDiscovery:
+    """Concurrent camera probing with a TTL cache and background re-probing.
+
+    Each source is probed on its own daemon thread and waited for at most
+    timeout seconds, so one hung device never delays the others or blocks
+    shutdown. Results are cached for ttl seconds. Once start() is called,
+    unhealthy sources are re-probed every reprobe_interval seconds, so a
+    reconnecting loop can just ask is_healthy() instead of probing itself.
+    """
+
+    def __init__(self, timeout=PROBE_TIMEOUT, ttl=CACHE_TTL, reprobe_interval=REPROBE_INTERVAL, prober=probe):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.reprobe_interval = reprobe_interval
+        self.prober = prober
+        self.results = {}
+        self.watched = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fresh(self, source):
+        result = self.results.get(source)
+        return result is not None and time.time() - result['checked_at'] < self.ttl
+
+    def probe_all(self, sources, force=False):
+        """Probe sources concurrently, reusing fresh cached results, and return {source: result}"""
+        sources = list(sources)
+        with self._lock:
+            self.watched.update(sources)
+            pending = [source for source in sources if force or not self._fresh(source)]
+
+        outcomes = {}
+        abandoned = threading.Event()
+        def run(source):
+            outcomes[source] = self.prober(source, self.timeout, abandoned)
+
+        threads = [threading.Thread(target=run, args=(source,), daemon=True) for source in pending]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + self.timeout
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        # Probes still opening release their capture as soon as the open returns
+        abandoned.set()
+
+        now = time.time()
+        with self._lock:
+            for source in pending:
+                self.results[source] = outcomes.get(source) or {
+                    'source': source, 'healthy': False, 'error': "timed out",
+                    'resolution': None, 'latency': self.timeout, 'checked_at': now
+                }
+            return {source: self.results[source] for source in sources}
+
+    def healthy(self, sources):
+        """Healthy sources in the given order"""
+        results = self.probe_all(sources)
+        return [source for source in sources if results[source]['healthy']]
+
+    def is_healthy(self, source):
+        """Cached health of a source, probing it only if the cache has expired"""
+        return self.probe_all([source])[source]['healthy']
+
+    def start(self):
+        """Re-probe unhealthy watched sources in the background"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.reprobe_interval):
+            with self._lock:
+                unhealthy = [source for source in self.watched if not self.results.get(source, {}).get('healthy')]
+            if unhealthy:
+                try:
+                    for source, result in self.probe_all(unhealthy, force=True).items():
+                        if result['healthy']:
+                            print(f"✅ Camera {source} is back online")
+                except Exception as e:
+                    print(f"❌ Error re-probing cameras: {str(e)}")
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+discovery = CameraDiscovery()
@@ -0,0 +1,466 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import socketserver
+from uuid import uuid4
+from camera import Camera
+from camera_discovery import discovery, CAMERA_STREAMS
+from event_log import EventLog, EVENT_LOG_DIR
+from recognition import create_engine, AttendanceSink, RecognitionPipeline
+
+COORDINATOR_HOST = os.getenv('COORDINATOR_HOST', '127.0.0.1')
+COORDINATOR_PORT = int(os.getenv('COORDINATOR_PORT', '7700'))
+HEARTBEAT_INTERVAL = 2  # Seconds between worker heartbeats
+HEARTBEAT_TIMEOUT = 6  # Seconds without a heartbeat before a worker is considered dead
+STREAM_FPS = 10  # Assumed cost of a stream until its worker reports a measured FPS
+CAPACITY_PROBE_SECONDS = 2  # Seconds a worker spends measuring its own frames/sec
+CAPACITY_PROBE_STREAMS = 8  # Most concurrent synthetic streams used for the measurement
+RECONNECT_DELAY = 5
+STATUS_INTERVAL = 10
+
+def send_message(wfile, message):
+    """Write one newline-delimited JSON message"""
+    wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+    wfile.flush()
+
+def _shutdown(connection):
+    try:
+        connection.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+class Coordinator:
+    """Owns the camera list and assigns streams to workers by capacity.
+
+    Workers report their measured capacity (frames/sec one node can
+    process) when they join and send heartbeats with per-stream FPS. A
+    stream's cost is its reported FPS, or STREAM_FPS until one is known.
+    Unassigned streams go to the worker with the most spare capacity, and
+    streams of overloaded workers move to workers that can absorb them.
+    When a worker joins, streams move to it from the busiest workers until
+    no move lowers the highest load/capacity ratio.
+    Workers that disconnect or miss heartbeats lose their streams, which
+    are then placed on the remaining workers. A worker that reconnects
+    under its own id keeps its streams and its old connection is closed.
+    """
+
+    def __init__(self, streams, stream_fps=STREAM_FPS, heartbeat_timeout=HEARTBEAT_TIMEOUT):
+        self.streams = list(streams)
+        self.stream_fps = stream_fps
+        self.heartbeat_timeout = heartbeat_timeout
+        self.workers = {}
+        self.assignments = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._server = None
+
+    def _cost(self, worker, stream):
+        return worker['fps'].get(stream) or self.stream_fps
+
+    def _load(self, worker_id):
+        worker = self.workers[worker_id]
+        return sum(self._cost(worker, stream) for stream in worker['streams'])
+
+    def _spare(self, worker_id):
+        return self.workers[worker_id]['capacity'] - self._load(worker_id)
+
+    def join(self, worker_id, capacity, wfile, connection):
+        with self._lock:
+            previous = self.workers.get(worker_id)
+            self.workers[worker_id] = {
+                'capacity': capacity, 'streams': [], 'fps': {},
+                'last_seen': time.monotonic(), 'wfile': wfile, 'connection': connection
+            }
+            if previous is None:
+                print(f"✅ Worker {worker_id} joined with capacity {capacity:.1f} frames/s")
+                self.rebalance(spread=True)
+                return
+            # Reconnected before its old connection was noticed as dead: it keeps its streams
+            self.workers[worker_id]['streams'] = previous['streams']
+            self.workers[worker_id]['fps'] = previous['fps']
+            _shutdown(previous['connection'])
+            print(f"🔄 Worker {worker_id} rejoined with capacity {capacity:.1f} frames/s")
+            self.rebalance(spread=True)
+            self._send_assignment(worker_id)
+
+    def heartbeat(self, worker_id, fps):
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                return
+            worker['last_seen'] = time.monotonic()
+            worker['fps'] = {stream: rate for stream, rate in fps.items() if stream in worker['streams']}
+            if any(self._spare(w) < 0 for w in self.workers):
+                self.rebalance()
+
+    def leave(self, worker_id, connection, reason):
+        """Drop a worker, unless it has since rejoined on another connection"""
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if worker is None or worker['connection'] is not connection:
+                return
+            del self.workers[worker_id]
+            for stream in worker['streams']:
+                self.assignments.pop(stream, None)
+            print(f"⚠️ Worker {worker_id} {reason}, reassigning {len(worker['streams'])} streams")
+            _shutdown(connection)
+            self.rebalance()
+
+    def _utilization(self, worker_id):
+        return self._load(worker_id) / max(self.workers[worker_id]['capacity'], 1e-6)
+
+    def _spread(self):
+        """Move streams from the busiest to the least busy worker while that lowers the peak, returning changed workers"""
+        changed = set()
+        for _ in range(len(self.streams) * len(self.workers)):
+            busiest = max(self.workers, key=self._utilization)
+            idlest = min(self.workers, key=self._utilization)
+            worker = self.workers[busiest]
+            if busiest == idlest or not worker['streams']:
+                break
+            stream = worker['streams'][-1]
+            cost = self._cost(worker, stream)
+            after = max((self._load(busiest) - cost) / max(worker['capacity'], 1e-6),
+                        (self._load(idlest) + cost) / max(self.workers[idlest]['capacity'], 1e-6))
+            if after >= self._utilization(busiest):
+                break
+            worker['streams'].pop()
+            worker['fps'].pop(stream, None)
+            self.workers[idlest]['streams'].append(stream)
+            self.assignments[stream] = idlest
+            changed.update((busiest, idlest))
+        return changed
+
+    def rebalance(self, spread=False):
+        """Place unassigned streams and relieve overloaded workers, evening out load too if spread is set"""
+        with self._lock:
+            if not self.workers:
+                return
+            changed = set()
+            for stream in self.streams:
+                if stream in self.assignments:
+                    continue
+                worker_id = max(self.workers, key=self._spare)
+                self.workers[worker_id]['streams'].append(stream)
+                self.assignments[stream] = worker_id
+                changed.add(worker_id)
+
+            # Move the most recently assigned streams off overloaded workers
+            # while another worker has room for them
+            for worker_id in list(self.workers):
+                worker = self.workers[worker_id]
+                while self._spare(worker_id) < 0 and len(worker['streams']) > 1:
+                    stream = worker['streams'][-1]
+                    cost = self._cost(worker, stream)
+                    target = max((w for w in self.workers if w != worker_id), key=self._spare, default=None)
+                    if target is None or self._spare(target) < cost:
+                        break
+                    worker['streams'].pop()
+                    worker['fps'].pop(stream, None)
+                    self.workers[target]['streams'].append(stream)
+                    self.assignments[stream] = target
+                    changed.update((worker_id, target))
+
+            if spread:
+                changed.update(self._spread())
+
+            for worker_id in changed:
+                self._send_assignment(worker_id)
+
+    def _send_assignment(self, worker_id):
+        worker = self.workers[worker_id]
+        try:
+            send_message(worker['wfile'], {'type': 'assign', 'streams': worker['streams']})
+        except OSError:
+            # The reader thread notices the dead connection and reassigns its streams
+            pass
+
+    def reap(self):
+        """Drop workers whose heartbeats stopped"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [(w, worker['connection']) for w, worker in self.workers.items()
+                     if now - worker['last_seen'] > self.heartbeat_timeout]
+        for worker_id, connection in stale:
+            self.leave(worker_id, connection, "missed its heartbeats")
+
+    def status(self):
+        """Assignment, load and per-stream FPS of every worker"""
+        with self._lock:
+            return {
+                worker_id: {
+                    'capacity': worker['capacity'],
+                    'load': self._load(worker_id),
+                    'streams': {stream: worker['fps'].get(stream) for stream in worker['streams']}
+                }
+                for worker_id, worker in self.workers.items()
+            }
+
+    def print_status(self):
+        status = self.status()
+        unassigned = [stream for stream in self.streams if stream not in self.assignments]
+        print(f"\n📊 {len(status)} workers, {len(self.streams) - len(unassigned)}/{len(self.streams)} streams assigned")
+        for worker_id, worker in status.items():
+            print(f"   {worker_id}: load {worker['load']:.1f}/{worker['capacity']:.1f} frames/s")
+            for stream, fps in worker['streams'].items():
+                print(f"      {stream}: {'-' if fps is None else f'{fps:.1f}'} fps")
+
+    def _maintain(self, status_interval):
+        next_status = time.monotonic() + status_interval
+        while not self._stop.wait(1):
+            self.reap()
+            if time.monotonic() >= next_status:
+                self.print_status()
+                next_status += status_interval
+
+    def serve(self, host=COORDINATOR_HOST, port=COORDINATOR_PORT, status_interval=STATUS_INTERVAL):
+        """Accept workers until stopped"""
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                worker_id = None
+                try:
+                    hello = json.loads(self.rfile.readline() or b'null')
+                    if not hello or hello.get('type') != 'hello':
+                        return
+                    worker_id = hello['worker_id']
+                    coordinator.join(worker_id, float(hello['capacity']), self.wfile, self.connection)
+                    for line in self.rfile:
+                        message = json.loads(line)
+                        if message.get('type') == 'heartbeat':
+                            coordinator.heartbeat(worker_id, message.get('fps', {}))
+                except (OSError, ValueError) as e:
+                    print(f"❌ Worker connection error: {str(e)}")
+                finally:
+                    if worker_id is not None:
+                        coordinator.leave(worker_id, self.connection, "disconnected")
+
+        server = self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=self._maintain, args=(status_interval,), daemon=True).start()
+        print(f"✅ Coordinator listening on {host}:{port} with {len(self.streams)} streams")
+        try:
+            server.serve_forever()
+        finally:
+            self._stop.set()
+            server.server_close()
+
+    def stop(self):
+        """Stop a serve() running on another thread"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+class StreamRunner:
+    """Capture and recognize one stream on a worker, reconnecting until stopped"""
+
+    def __init__(self, stream, engine, sink, sessions=None):
+        self.stream = stream
+        self.pipeline = RecognitionPipeline(engine, sink, sessions=sessions, camera_id=stream)
+        self.frames = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        camera = Camera(self.stream)
+        while not self._stop.is_set():
+            if not camera.is_running:
+                if not discovery.is_healthy(self.stream):
+                    self._stop.wait(RECONNECT_DELAY)
+                    continue
+                try:
+                    camera.start()
+                except Exception:
+                    self._stop.wait(RECONNECT_DELAY)
+                    continue
+            frame, gray = camera.read()
+            if frame is None:
+                print(f"❌ Lost stream {self.stream}, reconnecting")
+                camera.stop()
+                continue
+            try:
+                self.pipeline.process_frame(frame, gray)
+            except Exception as e:
+                print(f"❌ Error processing frame from {self.stream}: {str(e)}")
+            self.frames += 1
+        camera.stop()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+class Worker:
+    """Runs the streams a coordinator assigns to this node"""
+
+    def __init__(self, host=COORDINATOR_HOST, port=COORDINATOR_PORT, worker_id=None, output='mongodb', capacity=None):
+        self.address = (host, port)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:4]}"
+        self.engine = create_engine()
+        if self.engine is None:
+            raise RuntimeError("No recognition engine available, train the model first")
+        self.sink, self.sessions, self.event_log = self._create_output(output)
+        self.runners = {}
+        self.capacity = capacity or self.measure_capacity()
+
+    def _create_output(self, output):
+        if output == 'events':
+            # One log per worker, so several workers can share a host
+            event_log = EventLog(os.path.join(EVENT_LOG_DIR, self.worker_id))
+            return AttendanceSink(event_log.append, event_log.append, details=True), None, event_log
+        from database import db
+        from sessions import SessionTable
+        sessions = SessionTable(db.upsert_sessions)
+        sessions.start()
+        return AttendanceSink(db.mark_attendance, db.mark_checkout), sessions, None
+
+    def measure_capacity(self, seconds=CAPACITY_PROBE_SECONDS, streams=None):
+        """Frames per second this node can recognize, measured on concurrent synthetic streams"""
+        # One stream per core, as runners do, so the figure includes GIL and memory contention
+        streams = streams or min(os.cpu_count() or 1, CAPACITY_PROBE_STREAMS)
+        counts = [0] * streams
+        deadline = time.perf_counter() + seconds
+
+        def probe(index):
+            camera = Camera(f'synthetic:capacity-{index}')
+            camera.start()
+            pipeline = RecognitionPipeline(self.engine, AttendanceSink(lambda user_id, timestamp: None))
+            try:
+                while time.perf_counter() < deadline:
+                    frame, gray = camera.read()
+                    pipeline.process_frame(frame, gray)
+                    counts[index] += 1
+            finally:
+                camera.stop()
+                pipeline.sink.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=probe, args=(index,), daemon=True) for index in range(streams)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(counts) / (time.perf_counter() - started)
+
+    def apply(self, streams):
+        """Start newly assigned streams and stop the ones taken away"""
+        for stream in set(self.runners) - set(streams):
+            self.runners.pop(stream).stop()
+            print(f"ℹ️ Stopped stream {stream}")
+        for stream in streams:
+            if stream not in self.runners:
+                self.runners[stream] = StreamRunner(stream, self.engine, self.sink, self.sessions)
+                print(f"✅ Started stream {stream}")
+
+    def _heartbeats(self, wfile, stop):
+        last = {stream: runner.frames for stream, runner in self.runners.items()}
+        last_time = time.monotonic()
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            now = time.monotonic()
+            counts = {stream: runner.frames for stream, runner in list(self.runners.items())}
+            fps = {
+                stream: (count - last.get(stream, count)) / (now - last_time)
+                for stream, count in counts.items() if stream in last
+            }
+            last, last_time = counts, now
+            try:
+                send_message(wfile, {'type': 'heartbeat', 'fps': fps})
+            except OSError:
+                return
+
+    def run(self):
+        """Serve the coordinator, reconnecting if it goes away; streams keep running meanwhile"""
+        print(f"✅ Worker {self.worker_id} ready, capacity {self.capacity:.1f} frames/s")
+        try:
+            while True:
+                try:
+                    with socket.create_connection(self.address) as connection:
+                        rfile = connection.makefile('rb')
+                        wfile = connection.makefile('wb')
+                        send_message(wfile, {'type': 'hello', 'worker_id': self.worker_id, 'capacity': self.capacity})
+                        stop = threading.Event()
+                        threading.Thread(target=self._heartbeats, args=(wfile, stop), daemon=True).start()
+                        try:
+                            for line in rfile:
+                                message = json.loads(line)
+                                if message.get('type') == 'assign':
+                                    self.apply(message['streams'])
+                        finally:
+                            stop.set()
+                except OSError as e:
+                    print(f"⚠️ Coordinator unreachable: {str(e)}")
+                time.sleep(RECONNECT_DELAY)
+        finally:
+            self.close()
+
+    def close(self):
+        self.apply([])
+        self.sink.close()
+        if self.sessions is not None:
+            self.sessions.stop()
+        if self.event_log is not None:
+            self.event_log.close()
+
+def run_local(streams, workers, port, output):
+    """Run a coordinator and several worker processes on this host for testing"""
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker',
+                          '--host', '127.0.0.1', '--port', str(port), '--output', output])
+        for _ in range(workers)
+    ]
+    try:
+        Coordinator(streams).serve('127.0.0.1', port)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard camera streams across worker nodes")
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    coordinator_parser = subparsers.add_parser('coordinator', help="Assign streams to workers")
+    coordinator_parser.add_argument('--streams', nargs='+', default=CAMERA_STREAMS, help="Stream URLs")
+    coordinator_parser.add_argument('--host', default=COORDINATOR_HOST)
+    coordinator_parser.add_argument('--port', type=int, default=COORDINATOR_PORT)
+
+    worker_parser = subparsers.add_parser('worker', help="Process streams assigned by a coordinator")
+    worker_parser.add_argument('--host', default=COORDINATOR_HOST)
+    worker_parser.add_argument('--port', type=int, default=COORDINATOR_PORT)
+    worker_parser.add_argument('--output', choices=('mongodb', 'events'), default='mongodb',
+                               help="Write attendance to MongoDB or a per-worker event log")
+    worker_parser.add_argument('--capacity', type=float, default=None,
+                               help="Frames/sec this node can handle, measured when omitted")
+
+    local_parser = subparsers.add_parser('local', help="Coordinator plus worker processes on this host")
+    local_parser.add_argument('--streams', nargs='+', default=CAMERA_STREAMS, help="Stream URLs")
+    local_parser.add_argument('--workers', type=int, default=2)
+    local_parser.add_argument('--port', type=int, default=COORDINATOR_PORT)
+    local_parser.add_argument('--output', choices=('mongodb', 'events'), default='events')
+    args = parser.parse_args()
+
+    try:
+        if args.mode == 'coordinator':
+            if not args.streams:
+                print("❌ No streams configured, pass --streams or set CAMERA_STREAMS")
+                return
+            Coordinator(args.streams).serve(args.host, args.port)
+        elif args.mode == 'worker':
+            Worker(args.host, args.port, output=args.output, capacity=args.capacity).run()
+        else:
+            if not args.streams:
+                print("❌ No streams configured, pass --streams or set CAMERA_STREAMS")
+                return
+            run_local(args.streams, args.workers, args.port, args.output)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+if __name__ == "__main__":
+    main()
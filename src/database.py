@@ -1,51 +1,287 @@
 import os
+import time
+import heapq
+import threading
+from itertools import islice
 from datetime import datetime
-from pymongo import MongoClient, ASCENDING
-from bson import Binary
-import pickle
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+from pymongo.errors import OperationFailure, ConnectionFailure, BulkWriteError
 import numpy as np
+import encoding_codec
+from image_store import images
+from db_client import create_client, with_retry, AttendanceJournal, DATABASE_NAME, OUTAGE_RETRY_INTERVAL, RETRY_ATTEMPTS
+
+HOT_MONTHS = 3  # Months of attendance kept in the hot collection
+ARCHIVE_PREFIX = 'attendance_archive_'
+ARCHIVE_BATCH_SIZE = 1000
+LEGACY_LISTING_INDEXES = (
+    [('date', DESCENDING), ('time', ASCENDING), ('user_id', ASCENDING), ('name', ASCENDING)],
+    [('user_id', ASCENDING), ('date', DESCENDING), ('time', ASCENDING), ('name', ASCENDING)],
+)
+ENCODING_DIM = 128  # Length of a face_recognition encoding
+INDEX_CONFLICT_CODES = (85, 86)  # IndexOptionsConflict, IndexKeySpecsConflict
+DUPLICATE_KEY_CODE = 11000
+
+class _HotView:
+    """The hot attendance collection minus the months being drained into an archive.
+
+    While an archive run deletes a month's rows from hot, the archive
+    already holds them, so reads go through this view to count them once.
+    """
+
+    def __init__(self, collection, periods):
+        self.collection = collection
+        self.exclusion = {'$nor': [
+            {'date': {'$gte': f"{period}-01", '$lte': f"{period}-31"}} for period in periods
+        ]}
+
+    def _scope(self, query):
+        return {'$and': [query or {}, self.exclusion]}
+
+    def find(self, query=None, *args, **kwargs):
+        return self.collection.find(self._scope(query), *args, **kwargs)
+
+    def find_one(self, query=None, *args, **kwargs):
+        return self.collection.find_one(self._scope(query), *args, **kwargs)
+
+    def count_documents(self, query, **kwargs):
+        return self.collection.count_documents(self._scope(query), **kwargs)
+
+    def estimated_document_count(self):
+        return self.collection.count_documents(self.exclusion)
+
+    def distinct(self, key, query=None):
+        return self.collection.distinct(key, self._scope(query))
+
+    def aggregate(self, pipeline):
+        return self.collection.aggregate([{'$match': self.exclusion}] + list(pipeline))
+
+    def __getattr__(self, name):
+        # Writes address single records and go to the collection unchanged
+        return getattr(self.collection, name)
+
+def _listing_order(record):
+    # Date descending, then time ascending
+    return -int(record['date'].replace('-', '')), record.get('time', '')
 
 class Database:
-    def __init__(self):
+    def __init__(self, client=None, journal=None, name=DATABASE_NAME):
+        # Marks that cannot reach MongoDB are spilled here and replayed later
+        self.journal = journal or AttendanceJournal()
+        # Until this monotonic time marks go straight to the journal
+        self._offline_until = 0
+        
         try:
-            # Connect to MongoDB
-            self.client = MongoClient('mongodb://localhost:27017/')
+            # Connect to MongoDB with a tuned pool (or an injected client, e.g. mongomock)
+            self.client = client or create_client()
             
             # Create/Get database
-            self.db = self.client['attendance_system']
+            self.db = self.client[name]
             
             # Get collections
             self.users = self.db['users']
             self.attendance = self.db['attendance']
+            self.partitions = self.db['attendance_partitions']
+            # Written by register_user.py with face_recognition encodings
+            self.employees = self.db['employees']
+            # Change counters that let long-lived readers drop cached responses
+            self.meta = self.db['meta']
             
-            # Drop existing indexes to avoid conflicts
-            self.users.drop_indexes()
-            self.attendance.drop_indexes()
-            
-            # Create new indexes
-            self.users.create_index([('user_id', ASCENDING)], unique=True)
-            self.attendance.create_index(
-                [('date', ASCENDING), ('user_id', ASCENDING)], 
-                unique=True
-            )
+            # Create indexes (a no-op when they already exist)
+            self._ensure_index(self.users, [('user_id', ASCENDING)], unique=True)
+            self._ensure_index(self.partitions, [('period', ASCENDING)], unique=True)
+            self._ensure_attendance_indexes(self.attendance)
             
             print("✅ Connected to MongoDB successfully!")
             
+            if self.journal.has_pending():
+                self.replay_journal()
+            
         except Exception as e:
             print(f"❌ Error connecting to MongoDB: {str(e)}")
             print("⚠️ Please make sure MongoDB is installed and running!")
 
+    @staticmethod
+    def _ensure_index(collection, keys, **kwargs):
+        """Create an index, replacing an existing one with conflicting options"""
+        try:
+            collection.create_index(keys, **kwargs)
+        except OperationFailure as e:
+            # Anything else, e.g. a unique build failing on duplicates, must surface
+            if e.code not in INDEX_CONFLICT_CODES:
+                raise
+            collection.drop_index(keys)
+            collection.create_index(keys, **kwargs)
+
+    def _ensure_attendance_indexes(self, collection):
+        """Create the attendance indexes on the hot or an archive collection"""
+        self._ensure_index(
+            collection,
+            [('date', ASCENDING), ('user_id', ASCENDING)],
+            unique=True
+        )
+        # Covering indexes for paged listings in (date desc, time asc) order,
+        # including the sightings the listings return for hours on site
+        self._ensure_index(collection, [
+            ('date', DESCENDING), ('time', ASCENDING),
+            ('user_id', ASCENDING), ('name', ASCENDING),
+            ('first_seen', ASCENDING), ('last_seen', ASCENDING)
+        ])
+        self._ensure_index(collection, [
+            ('user_id', ASCENDING), ('date', DESCENDING),
+            ('time', ASCENDING), ('name', ASCENDING),
+            ('first_seen', ASCENDING), ('last_seen', ASCENDING)
+        ])
+        # The listing indexes from before sightings were covered
+        for keys in LEGACY_LISTING_INDEXES:
+            self._drop_index_if_exists(collection, keys)
+
+    @staticmethod
+    def _drop_index_if_exists(collection, keys):
+        name = '_'.join(f"{field}_{direction}" for field, direction in keys)
+        if name in collection.index_information():
+            collection.drop_index(name)
+
+    def _partitions(self, start_date=None, end_date=None):
+        """List the attendance collections overlapping a date range, newest first"""
+        period_query = {}
+        if start_date:
+            period_query['$gte'] = start_date[:7]
+        if end_date:
+            period_query['$lte'] = end_date[:7]
+        query = {'period': period_query} if period_query else {}
+        
+        collections = []
+        for partition in self.partitions.find(query, {'collection': 1, '_id': 0}).sort('period', -1):
+            collections.append(self.db[partition['collection']])
+        
+        draining = [partition['period'] for partition in self.partitions.find({'draining': True}, {'period': 1, '_id': 0})]
+        return [_HotView(self.attendance, draining) if draining else self.attendance] + collections
+
+    def _collection_for(self, date):
+        """The collection a date's records are written to: its month's archive once registered, else hot"""
+        # Archives only ever hold months before the current one
+        if date >= datetime.now().strftime("%Y-%m"):
+            return self.attendance
+        partition = self.partitions.find_one({'period': date[:7]}, {'collection': 1, '_id': 0})
+        return self.db[partition['collection']] if partition else self.attendance
+
+    def archive_old_attendance(self, hot_months=HOT_MONTHS):
+        """Move attendance older than the hot window into per-month archive collections"""
+        try:
+            now = datetime.now()
+            month_index = now.year * 12 + now.month - 1 - hot_months
+            cutoff = f"{month_index // 12:04d}-{month_index % 12 + 1:02d}-01"
+            
+            old_dates = self.attendance.distinct('date', {'date': {'$lt': cutoff}})
+            periods = sorted({date[:7] for date in old_dates})
+            
+            archived_count = 0
+            for period in periods:
+                archive = self.db[f"{ARCHIVE_PREFIX}{period.replace('-', '_')}"]
+                self._ensure_attendance_indexes(archive)
+                period_query = {'date': {'$gte': f"{period}-01", '$lte': f"{period}-31"}}
+                
+                # Copy while the archive is unregistered, so reads and writes still use hot
+                batch = []
+                for record in self.attendance.find(period_query):
+                    batch.append(record)
+                    if len(batch) >= ARCHIVE_BATCH_SIZE:
+                        self._copy_to_archive(archive, batch)
+                        batch = []
+                if batch:
+                    self._copy_to_archive(archive, batch)
+                
+                # From here reads skip the month in hot and writes go to the archive
+                self.partitions.update_one(
+                    {'period': period},
+                    {'$set': {'collection': archive.name, 'archived_at': now, 'draining': True}},
+                    upsert=True
+                )
+                
+                # Delete the hot rows, moving any written there since the copy
+                while True:
+                    batch = list(self.attendance.find(period_query).limit(ARCHIVE_BATCH_SIZE))
+                    if not batch:
+                        break
+                    archived_count += self._move_to_archive(archive, batch)
+                self.partitions.update_one({'period': period}, {'$unset': {'draining': ''}})
+                print(f"✅ Archived attendance for {period} into {archive.name}")
+            
+            return archived_count
+        except Exception as e:
+            print(f"❌ Error archiving attendance: {str(e)}")
+            return 0
+
+    @staticmethod
+    def _copy_to_archive(archive, records):
+        """Upsert a batch of attendance records into an archive"""
+        archive.bulk_write(
+            [ReplaceOne({'_id': record['_id']}, record, upsert=True) for record in records],
+            ordered=False
+        )
+
+    def _move_to_archive(self, archive, records):
+        """Merge hot records into an archive the way upsert_sessions merges sightings, and remove them from hot"""
+        updates = []
+        for record in records:
+            first_seen = record.get('first_seen', record['timestamp'])
+            earliest = {'first_seen': first_seen}
+            latest = {'last_seen': record.get('last_seen', first_seen)}
+            for zone, zone_session in record.get('zones', {}).items():
+                earliest[f"zones.{zone}.first_seen"] = zone_session['first_seen']
+                latest[f"zones.{zone}.last_seen"] = zone_session['last_seen']
+            key = {'date': record['date'], 'user_id': record['user_id']}
+            # The archive may already hold the day: copied earlier, or written there while draining
+            updates.append(UpdateOne(key, {
+                '$min': earliest,
+                '$max': latest,
+                '$setOnInsert': {field: value for field, value in record.items()
+                                 if field not in ('first_seen', 'last_seen', 'zones')}
+            }, upsert=True))
+            # The check-in time follows the earlier of the two marks
+            updates.append(UpdateOne(
+                dict(key, timestamp={'$gt': record['timestamp']}),
+                {'$set': {'time': record['time'], 'timestamp': record['timestamp']}}
+            ))
+        try:
+            archive.bulk_write(updates, ordered=False)
+        except BulkWriteError as e:
+            # A write routed to the archive inserted the same day concurrently, the retry merges into it
+            if any(error['code'] != DUPLICATE_KEY_CODE for error in e.details['writeErrors']):
+                raise
+            archive.bulk_write(updates, ordered=False)
+        result = self.attendance.delete_many({'_id': {'$in': [record['_id'] for record in records]}})
+        self._bump_change_counter()
+        return result.deleted_count
+
+    def _bump_change_counter(self):
+        """Record that attendance or user data changed"""
+        try:
+            self.meta.update_one({'_id': 'changes'}, {'$inc': {'counter': 1}}, upsert=True)
+        except Exception as e:
+            # Readers fall back to their cache TTL, the write itself already succeeded
+            print(f"⚠️ Error updating change counter: {str(e)}")
+
+    def get_change_counter(self):
+        """Get a counter that increases whenever attendance or user data is written"""
+        try:
+            doc = self.meta.find_one({'_id': 'changes'}, {'counter': 1, '_id': 0})
+            return doc['counter'] if doc else 0
+        except Exception as e:
+            print(f"❌ Error retrieving change counter: {str(e)}")
+            return None
+
     def add_user(self, user_id, name, image_path, face_encoding=None):
         """Add a new user to the database"""
         try:
-            # Read the image file as binary
-            with open(image_path, 'rb') as f:
-                image_data = Binary(f.read())
+            # Keep the image in the content-addressed store, the document only references it
+            image_ref = images.put_file(image_path)
             
             # Convert face encoding to bytes if it exists
             if face_encoding is not None:
                 if isinstance(face_encoding, np.ndarray):
-                    face_encoding_bytes = Binary(pickle.dumps(face_encoding))
+                    face_encoding_bytes = encoding_codec.encode(face_encoding)
                 else:
                     face_encoding_bytes = None
             else:
@@ -55,31 +291,44 @@ class Database:
             user_doc = {
                 'user_id': user_id,
                 'name': name,
-                'image_data': image_data,
+                'image_ref': image_ref,
                 'face_encoding': face_encoding_bytes,
                 'registered_date': datetime.now(),
                 'last_updated': datetime.now()
             }
             
             # Check if user exists
-            existing_user = self.users.find_one({'user_id': user_id})
+            existing_user = self.users.find_one({'user_id': user_id}, {'name': 1})
             if existing_user:
-                # Update existing user
+                # Update existing user and bump its version
                 self.users.update_one(
                     {'user_id': user_id},
-                    {'$set': user_doc}
+                    {'$set': user_doc, '$unset': {'image_data': ''}, '$inc': {'version': 1}}
                 )
+                if existing_user.get('name') != name:
+                    self.schedule_name_propagation(user_id)
                 print(f"✅ User {user_id} updated in MongoDB")
             else:
                 # Insert new user
+                user_doc['version'] = 1
                 self.users.insert_one(user_doc)
                 print(f"✅ User {user_id} added to MongoDB")
+            self._bump_change_counter()
             return True
             
         except Exception as e:
             print(f"❌ Error adding user to MongoDB: {str(e)}")
             return False
 
+    def get_user_image(self, user_id, thumbnail=False):
+        """Path of a user's stored image (or its cached thumbnail), None if there is none"""
+        user = self.users.find_one({'user_id': user_id}, {'image_ref': 1, '_id': 0})
+        if not user or not user.get('image_ref') or not images.exists(user['image_ref']):
+            return None
+        if thumbnail:
+            return images.thumbnail(user['image_ref'])
+        return images.path(user['image_ref'])
+
     def get_user(self, user_id):
         """Get user information"""
         try:
@@ -87,77 +336,268 @@ class Database:
             if user:
                 # Convert Binary face_encoding back to numpy array if it exists
                 if user.get('face_encoding'):
-                    user['face_encoding'] = pickle.loads(user['face_encoding'])
+                    if encoding_codec.is_encoded(user['face_encoding']):
+                        user['face_encoding'] = encoding_codec.decode(user['face_encoding'])
+                    else:
+                        print(f"⚠️ User {user_id} has a legacy face encoding, run python src/migrate_to_mongodb.py")
+                        user['face_encoding'] = None
             return user
         except Exception as e:
             print(f"❌ Error retrieving user: {str(e)}")
             return None
 
-    def mark_attendance(self, user_id):
-        """Mark attendance for a user"""
+    def load_face_encodings(self):
+        """Load every stored face encoding as (user_ids, float32 matrix)"""
+        user_ids = []
+        blobs = []
+        list_ids = []
+        lists = []
+        legacy_count = 0
         try:
-            # Get current date and time
-            now = datetime.now()
-            date = now.strftime("%Y-%m-%d")
+            sources = (
+                (self.users, 'user_id', {'face_encoding': {'$ne': None}}),
+                (self.employees, 'employee_id', {'face_encoding': {'$exists': True}})
+            )
+            for collection, id_field, query in sources:
+                for doc in collection.find(query, {id_field: 1, 'face_encoding': 1, '_id': 0}):
+                    encoding = doc['face_encoding']
+                    # A corrupt encoding only skips its own user
+                    try:
+                        if encoding_codec.is_encoded(encoding):
+                            if encoding_codec.decode(encoding).shape != (ENCODING_DIM,):
+                                raise ValueError("wrong encoding size")
+                            user_ids.append(doc[id_field])
+                            blobs.append(encoding)
+                        elif isinstance(encoding, list):
+                            # Employees registered before the codec stored plain lists
+                            if np.asarray(encoding, dtype=np.float32).shape != (ENCODING_DIM,):
+                                raise ValueError("wrong encoding size")
+                            list_ids.append(doc[id_field])
+                            lists.append(encoding)
+                        else:
+                            legacy_count += 1
+                    except Exception as e:
+                        print(f"⚠️ Skipping unreadable face encoding of {doc.get(id_field)}: {str(e)}")
+        except Exception as e:
+            print(f"❌ Error loading face encodings: {str(e)}")
+        
+        if legacy_count:
+            print(f"⚠️ Skipped {legacy_count} legacy pickled face encodings, run python src/migrate_to_mongodb.py")
+        
+        matrix = encoding_codec.decode_matrix(blobs, ENCODING_DIM)
+        if lists:
+            matrix = np.vstack([matrix, np.asarray(lists, dtype=np.float32)])
+        return user_ids + list_ids, matrix
+
+    def get_encodings_version(self):
+        """Get a cheap token that changes when users or employees are added or updated"""
+        latest_user = self.users.find_one({}, {'last_updated': 1}, sort=[('last_updated', -1)])
+        latest_employee = self.employees.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+        return (
+            self.users.estimated_document_count(),
+            latest_user.get('last_updated') if latest_user else None,
+            self.employees.estimated_document_count(),
+            latest_employee['_id'] if latest_employee else None
+        )
+
+    def _find_people(self, user_ids):
+        """Map ids to their name and version, from users or, for face_recognition enrollments, employees"""
+        user_ids = list(user_ids)
+        people = {
+            user['user_id']: user for user in self.users.find(
+                {'user_id': {'$in': user_ids}},
+                {'user_id': 1, 'name': 1, 'version': 1, '_id': 0}
+            )
+        }
+        # The embedding engine reports employees by employee_id
+        missing = [user_id for user_id in user_ids if user_id not in people]
+        if missing:
+            for employee in self.employees.find(
+                {'employee_id': {'$in': missing}},
+                {'employee_id': 1, 'name': 1, '_id': 0}
+            ):
+                people[employee['employee_id']] = {'name': employee.get('name'), 'version': 0}
+        return people
+
+    def _offline(self):
+        """Whether MongoDB failed recently enough that writes should not wait on it"""
+        return time.monotonic() < self._offline_until
+
+    def mark_attendance(self, user_id, timestamp=None):
+        """Mark attendance for a user, journaling the mark if MongoDB is unreachable"""
+        # Get current date and time
+        now = timestamp or datetime.now()
+        
+        # During an outage only one mark per OUTAGE_RETRY_INTERVAL waits on
+        # server selection, the rest are journaled straight away
+        if self._offline():
+            self.journal.append(user_id, now)
+            return True
+        
+        try:
+            # After an outage a single attempt probes whether MongoDB is back
+            attempts = 1 if self._offline_until else RETRY_ATTEMPTS
+            marked = with_retry(lambda: self._insert_attendance(user_id, now), attempts=attempts)
+            self._offline_until = 0
+        except ConnectionFailure as e:
+            self._offline_until = time.monotonic() + OUTAGE_RETRY_INTERVAL
+            self.journal.append(user_id, now)
+            print(f"⚠️ MongoDB unreachable, attendance for {user_id} journaled for replay: {str(e)}")
+            return True
+        except Exception as e:
+            print(f"❌ Error marking attendance: {str(e)}")
+            return False
+        
+        # The database is reachable again, so flush anything journaled while it was not
+        if self.journal.has_pending():
+            self.replay_journal()
+        return marked
+
+    def _insert_attendance(self, user_id, now):
+        """Insert an attendance record, raising ConnectionFailure when MongoDB is unreachable"""
+        date = now.strftime("%Y-%m-%d")
+        
+        # Check if user exists, fetching only what gets denormalized
+        user = self._find_people([user_id]).get(user_id)
+        if not user:
+            print(f"❌ User {user_id} not found!")
+            return False
+        
+        # Try to insert attendance record
+        try:
+            self._collection_for(date).insert_one({
+                'user_id': user_id,
+                'name': user.get('name'),
+                'user_version': user.get('version', 0),
+                'date': date,
+                'time': now.strftime("%H:%M:%S"),
+                'timestamp': now,
+                'first_seen': now,
+                'last_seen': now
+            })
+            self._bump_change_counter()
+            print(f"✅ Attendance marked for {user_id}")
+            return True
             
-            # Check if user exists
-            user = self.get_user(user_id)
-            if not user:
-                print(f"❌ User {user_id} not found!")
+        except Exception as e:
+            if "duplicate key error" in str(e).lower():
+                print(f"ℹ️ Attendance already marked for {user_id} on {date}")
                 return False
+            raise e
+
+    def mark_checkout(self, user_id, timestamp=None):
+        """Record the latest sighting of a user on an already marked day"""
+        if self._offline():
+            # Check-outs are not journaled, a later sighting updates last_seen again
+            return False
+        try:
+            now = timestamp or datetime.now()
+            date = now.strftime("%Y-%m-%d")
+            result = with_retry(lambda: self._collection_for(date).update_one(
+                {'date': date, 'user_id': user_id},
+                {'$max': {'last_seen': now}}
+            ))
+            if result.modified_count:
+                self._bump_change_counter()
+            return result.matched_count > 0
+        except ConnectionFailure as e:
+            self._offline_until = time.monotonic() + OUTAGE_RETRY_INTERVAL
+            print(f"⚠️ MongoDB unreachable, check-out for {user_id} dropped: {str(e)}")
+            return False
+        except Exception as e:
+            print(f"❌ Error marking check-out: {str(e)}")
+            return False
+
+    def upsert_sessions(self, sessions):
+        """Apply first/last sightings per user per day as $min/$max upserts"""
+        try:
+            users = self._find_people({session['user_id'] for session in sessions})
             
-            # Try to insert attendance record
-            try:
-                self.attendance.insert_one({
-                    'user_id': user_id,
-                    'date': date,
-                    'time': now.strftime("%H:%M:%S"),
-                    'timestamp': now
-                })
-                print(f"✅ Attendance marked for {user_id}")
-                return True
+            # Bulk recognition and migrations write past days, grouped by the collection holding them
+            requests = {}
+            for session in sessions:
+                user = users.get(session['user_id'])
+                if not user:
+                    continue
                 
-            except Exception as e:
-                if "duplicate key error" in str(e).lower():
-                    print(f"ℹ️ Attendance already marked for {user_id} today")
-                    return False
-                raise e
+                earliest = {'first_seen': session['first_seen']}
+                latest = {'last_seen': session['last_seen']}
+                for zone, zone_session in session.get('zones', {}).items():
+                    earliest[f"zones.{zone}.first_seen"] = zone_session['first_seen']
+                    latest[f"zones.{zone}.last_seen"] = zone_session['last_seen']
                 
+                # A session flushed before its check-in insert creates the record itself
+                collection = self._collection_for(session['date'])
+                requests.setdefault(collection.name, (collection, []))[1].append(UpdateOne(
+                    {'date': session['date'], 'user_id': session['user_id']},
+                    {
+                        '$min': earliest,
+                        '$max': latest,
+                        '$setOnInsert': {
+                            'name': user.get('name'),
+                            'user_version': user.get('version', 0),
+                            'time': session['first_seen'].strftime("%H:%M:%S"),
+                            'timestamp': session['first_seen']
+                        }
+                    },
+                    upsert=True
+                ))
+            
+            for collection, updates in requests.values():
+                with_retry(lambda: collection.bulk_write(updates, ordered=False))
+            if requests:
+                self._bump_change_counter()
+            return True
         except Exception as e:
-            print(f"❌ Error marking attendance: {str(e)}")
+            print(f"❌ Error writing sessions: {str(e)}")
             return False
 
-    def get_attendance(self, date=None):
+    def replay_journal(self):
+        """Write attendance marks journaled during an outage to MongoDB"""
+        try:
+            replayed_count = self.journal.replay(self._insert_attendance)
+            if replayed_count:
+                print(f"✅ Replayed {replayed_count} journaled attendance marks")
+            return replayed_count
+        except Exception as e:
+            print(f"❌ Error replaying attendance journal: {str(e)}")
+            return 0
+
+    def _find_attendance(self, match_query, skip=0, limit=None, partitions=None):
+        """Run a paged attendance listing against the covering indexes of each partition"""
+        cursors = []
+        for collection in partitions or [self.attendance]:
+            cursor = collection.find(
+                match_query,
+                {'user_id': 1, 'name': 1, 'date': 1, 'time': 1,
+                 'first_seen': 1, 'last_seen': 1, '_id': 0}
+            ).sort([('date', DESCENDING), ('time', ASCENDING)])
+            if limit:
+                cursor = cursor.limit(skip + limit)
+            cursors.append(cursor)
+        
+        # Hot can hold months older than an archive (bulk recognition, journal
+        # replay, migrations), so the sorted partitions are merged, not chained
+        merged = heapq.merge(*cursors, key=_listing_order)
+        return list(islice(merged, skip, skip + limit if limit else None))
+
+    def get_attendance(self, date=None, skip=0, limit=None):
         """Get attendance records for a specific date or all dates"""
         try:
             query = {'date': date} if date else {}
             
             # Get attendance records and sort by date and time
-            records = list(self.attendance.aggregate([
-                {'$match': query},
-                {'$lookup': {
-                    'from': 'users',
-                    'localField': 'user_id',
-                    'foreignField': 'user_id',
-                    'as': 'user_info'
-                }},
-                {'$unwind': {'path': '$user_info', 'preserveNullAndEmptyArrays': True}},
-                {'$project': {
-                    'user_id': 1,
-                    'date': 1,
-                    'time': 1,
-                    'name': '$user_info.name'
-                }},
-                {'$sort': {'date': -1, 'time': 1}}
-            ]))
+            records = self._find_attendance(
+                query, skip, limit, self._partitions(date, date) if date else self._partitions()
+            )
             
             return records
             
         except Exception as e:
             print(f"❌ Error retrieving attendance records: {str(e)}")
-            return []
+            return None
 
-    def get_all_users(self):
+    def get_all_users(self, skip=0, limit=None):
         """Get all registered users"""
         try:
             return list(self.users.find({}, {
@@ -165,31 +605,71 @@ class Database:
                 'name': 1,
                 'registered_date': 1,
                 '_id': 0
-            }).sort('registered_date', -1))
+            }).sort('registered_date', -1).skip(skip).limit(limit or 0))
         except Exception as e:
             print(f"❌ Error retrieving users: {str(e)}")
-            return []
+            return None
+
+    def count_attendance(self, date=None):
+        """Count attendance records for a specific date or all dates"""
+        try:
+            if not date:
+                return sum(
+                    collection.estimated_document_count()
+                    for collection in self._partitions()
+                )
+            return sum(
+                collection.count_documents({'date': date})
+                for collection in self._partitions(date, date)
+            )
+        except Exception as e:
+            print(f"❌ Error counting attendance records: {str(e)}")
+            return 0
+
+    def count_users(self):
+        """Count registered users without loading them"""
+        try:
+            return self.users.count_documents({})
+        except Exception as e:
+            print(f"❌ Error counting users: {str(e)}")
+            return 0
 
     def get_user_stats(self, user_id):
         """Get attendance statistics for a user"""
         try:
+            partitions = self._partitions()
+            
             # Get total attendance count
-            total_attendance = self.attendance.count_documents({'user_id': user_id})
+            total_attendance = sum(
+                collection.count_documents({'user_id': user_id})
+                for collection in partitions
+            )
             
             # Get first and last attendance
-            first_attendance = self.attendance.find_one(
-                {'user_id': user_id},
-                sort=[('timestamp', 1)]
+            first_attendance = self._find_one_across(
+                partitions, {'user_id': user_id}, sort=[('timestamp', 1)]
             )
-            last_attendance = self.attendance.find_one(
-                {'user_id': user_id},
-                sort=[('timestamp', -1)]
+            last_attendance = self._find_one_across(
+                partitions, {'user_id': user_id}, sort=[('timestamp', -1)]
             )
             
+            # Sum time on site from each day's first and last sighting
+            total_ms = 0
+            for collection in partitions:
+                for rollup in collection.aggregate([
+                    {'$match': {'user_id': user_id}},
+                    {'$group': {
+                        '_id': None,
+                        'total_ms': {'$sum': {'$subtract': ['$last_seen', '$first_seen']}}
+                    }}
+                ]):
+                    total_ms += rollup['total_ms'] or 0
+            
             return {
                 'total_attendance': total_attendance,
                 'first_attendance': first_attendance['timestamp'] if first_attendance else None,
-                'last_attendance': last_attendance['timestamp'] if last_attendance else None
+                'last_attendance': last_attendance['timestamp'] if last_attendance else None,
+                'total_hours': round(total_ms / 3600000, 2)
             }
             
         except Exception as e:
@@ -200,22 +680,21 @@ class Database:
         """Get daily attendance statistics"""
         try:
             query = {'date': date} if date else {}
+            partitions = self._partitions(date, date) if date else self._partitions()
             
             # Get total attendance for the day
-            total_attendance = self.attendance.count_documents(query)
+            total_attendance = sum(
+                collection.count_documents(query) for collection in partitions
+            )
             
             # Get unique users who attended
-            unique_users = len(self.attendance.distinct('user_id', query))
+            unique_users = len(set().union(
+                *(collection.distinct('user_id', query) for collection in partitions)
+            ))
             
             # Get first and last attendance of the day
-            first_attendance = self.attendance.find_one(
-                query,
-                sort=[('timestamp', 1)]
-            )
-            last_attendance = self.attendance.find_one(
-                query,
-                sort=[('timestamp', -1)]
-            )
+            first_attendance = self._find_one_across(partitions, query, sort=[('timestamp', 1)])
+            last_attendance = self._find_one_across(partitions, query, sort=[('timestamp', -1)])
             
             return {
                 'total_attendance': total_attendance,
@@ -228,103 +707,249 @@ class Database:
             print(f"❌ Error retrieving daily stats: {str(e)}")
             return None
 
+    @staticmethod
+    def _find_one_across(partitions, query, sort):
+        """Find the first record by a single-field sort across all partitions"""
+        field, direction = sort[0]
+        candidates = [
+            record for record in (
+                collection.find_one(query, sort=sort) for collection in partitions
+            ) if record
+        ]
+        if not candidates:
+            return None
+        pick = min if direction == 1 else max
+        return pick(candidates, key=lambda record: record[field])
+
     def update_user(self, user_id, updates):
         """Update user information"""
         try:
             updates['last_updated'] = datetime.now()
             result = self.users.update_one(
                 {'user_id': user_id},
-                {'$set': updates}
+                {'$set': updates, '$inc': {'version': 1}}
             )
+            if result.modified_count > 0:
+                self._bump_change_counter()
+            if result.modified_count > 0 and 'name' in updates:
+                self.schedule_name_propagation(user_id)
             return result.modified_count > 0
         except Exception as e:
             print(f"❌ Error updating user: {str(e)}")
             return False
 
-    def get_user_attendance(self, user_id):
+    def schedule_name_propagation(self, user_id):
+        """Propagate a renamed user's name to attendance records in the background"""
+        thread = threading.Thread(
+            target=self.propagate_user_name,
+            args=(user_id,),
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def propagate_user_name(self, user_id):
+        """Copy a user's current name onto attendance records written with an older version"""
+        try:
+            user = self.users.find_one(
+                {'user_id': user_id},
+                {'name': 1, 'version': 1, '_id': 0}
+            )
+            if not user:
+                return 0
+            
+            version = user.get('version', 0)
+            modified_count = 0
+            for collection in self._partitions():
+                result = collection.update_many(
+                    {'user_id': user_id, '$or': [
+                        {'user_version': {'$lt': version}},
+                        {'user_version': {'$exists': False}}
+                    ]},
+                    {'$set': {'name': user.get('name'), 'user_version': version}}
+                )
+                modified_count += result.modified_count
+            if modified_count:
+                self._bump_change_counter()
+            return modified_count
+        except Exception as e:
+            print(f"❌ Error propagating user name: {str(e)}")
+            return 0
+
+    def merge_user(self, alias_id, user_id):
+        """Fold an alias of a user into it, moving the alias's attendance onto user_id.
+
+        The merge is recorded on both user documents before any record
+        moves and every step is idempotent, so a merge that fails part way
+        is finished by calling it again or by resume_merges().
+        """
+        try:
+            user = self.users.find_one(
+                {'user_id': user_id},
+                {'name': 1, 'version': 1, '_id': 0}
+            )
+            if not user:
+                print(f"❌ User {user_id} not found!")
+                return 0
+            
+            self.users.update_one({'user_id': alias_id}, {'$set': {'merged_into': user_id}})
+            self.users.update_one({'user_id': user_id}, {'$addToSet': {'aliases': alias_id}})
+            
+            moved_count = 0
+            for collection in self._partitions():
+                for record in collection.find({'user_id': alias_id}):
+                    first_seen = record.get('first_seen', record['timestamp'])
+                    # Both ids may have a record for the same day, keep the widest span
+                    collection.update_one(
+                        {'date': record['date'], 'user_id': user_id},
+                        {
+                            '$min': {'first_seen': first_seen},
+                            '$max': {'last_seen': record.get('last_seen', first_seen)},
+                            '$setOnInsert': {
+                                'name': user.get('name'),
+                                'user_version': user.get('version', 0),
+                                'time': record['time'],
+                                'timestamp': record['timestamp']
+                            }
+                        },
+                        upsert=True
+                    )
+                    # The check-in time follows the earlier of the two marks
+                    collection.update_one(
+                        {'date': record['date'], 'user_id': user_id, 'timestamp': {'$gt': record['timestamp']}},
+                        {'$set': {'time': record['time'], 'timestamp': record['timestamp']}}
+                    )
+                    collection.delete_one({'_id': record['_id']})
+                    moved_count += 1
+            
+            # Last, so an interrupted merge is still listed by resume_merges()
+            self.users.delete_one({'user_id': alias_id})
+            self._bump_change_counter()
+            return moved_count
+        except Exception as e:
+            print(f"❌ Error merging user {alias_id} into {user_id}, run it again to finish: {str(e)}")
+            return 0
+
+    def resume_merges(self):
+        """Finish alias merges that failed part way, returning the records moved"""
+        try:
+            pending = list(self.users.find(
+                {'merged_into': {'$exists': True}},
+                {'user_id': 1, 'merged_into': 1, '_id': 0}
+            ))
+        except Exception as e:
+            print(f"❌ Error finding unfinished merges: {str(e)}")
+            return 0
+        return sum(self.merge_user(alias['user_id'], alias['merged_into']) for alias in pending)
+
+    def get_user_attendance(self, user_id, skip=0, limit=None):
         """Get all attendance records for a specific user"""
         try:
-            records = list(self.attendance.aggregate([
-                {'$match': {'user_id': user_id}},
-                {'$lookup': {
-                    'from': 'users',
-                    'localField': 'user_id',
-                    'foreignField': 'user_id',
-                    'as': 'user_info'
-                }},
-                {'$unwind': {'path': '$user_info', 'preserveNullAndEmptyArrays': True}},
-                {'$project': {
-                    'user_id': 1,
-                    'date': 1,
-                    'time': 1,
-                    'name': '$user_info.name'
-                }},
-                {'$sort': {'date': -1, 'time': 1}}
-            ]))
+            records = self._find_attendance(
+                {'user_id': user_id}, skip, limit, self._partitions()
+            )
             return records
         except Exception as e:
             print(f"❌ Error retrieving user attendance: {str(e)}")
-            return []
+            return None
 
-    def get_attendance_range(self, start_date, end_date):
+    def get_attendance_range(self, start_date, end_date, skip=0, limit=None):
         """Get attendance records within a date range"""
         try:
-            records = list(self.attendance.aggregate([
-                {'$match': {
-                    'date': {
-                        '$gte': start_date,
-                        '$lte': end_date
-                    }
-                }},
-                {'$lookup': {
-                    'from': 'users',
-                    'localField': 'user_id',
-                    'foreignField': 'user_id',
-                    'as': 'user_info'
-                }},
-                {'$unwind': {'path': '$user_info', 'preserveNullAndEmptyArrays': True}},
-                {'$project': {
-                    'user_id': 1,
-                    'date': 1,
-                    'time': 1,
-                    'name': '$user_info.name'
-                }},
-                {'$sort': {'date': -1, 'time': 1}}
-            ]))
+            match_query = {
+                'date': {
+                    '$gte': start_date,
+                    '$lte': end_date
+                }
+            }
+            records = self._find_attendance(
+                match_query, skip, limit, self._partitions(start_date, end_date)
+            )
             return records
         except Exception as e:
             print(f"❌ Error retrieving attendance range: {str(e)}")
-            return []
+            return None
 
     def get_attendance_summary(self, start_date=None, end_date=None):
         """Get attendance summary statistics"""
         try:
             match_query = {}
+            partitions = self._partitions()
             if start_date and end_date:
                 match_query['date'] = {
                     '$gte': start_date,
                     '$lte': end_date
                 }
+                partitions = self._partitions(start_date, end_date)
             
-            summary = self.attendance.aggregate([
-                {'$match': match_query},
-                {'$group': {
-                    '_id': '$date',
-                    'total_attendance': {'$sum': 1},
-                    'unique_users': {'$addToSet': '$user_id'}
-                }},
-                {'$project': {
-                    'date': '$_id',
-                    'total_attendance': 1,
-                    'unique_users': {'$size': '$unique_users'}
-                }},
-                {'$sort': {'date': -1}}
-            ])
-            
-            return list(summary)
+            # Rows written to hot for an archived month before it was drained
+            # can split a day across partitions, so days are merged here
+            days = {}
+            for collection in partitions:
+                for day in collection.aggregate([
+                    {'$match': match_query},
+                    {'$group': {
+                        '_id': '$date',
+                        'total_attendance': {'$sum': 1},
+                        'unique_users': {'$addToSet': '$user_id'}
+                    }}
+                ]):
+                    merged = days.setdefault(day['_id'], {'total_attendance': 0, 'unique_users': set()})
+                    merged['total_attendance'] += day['total_attendance']
+                    merged['unique_users'].update(day['unique_users'])
+            
+            return [
+                {'_id': date, 'date': date, 'total_attendance': day['total_attendance'],
+                 'unique_users': len(day['unique_users'])}
+                for date, day in sorted(days.items(), reverse=True)
+            ]
         except Exception as e:
             print(f"❌ Error retrieving attendance summary: {str(e)}")
-            return []
+            return None
+
+    def get_data_version(self, start_date=None, end_date=None, user_id=None):
+        """Get a version token for the attendance data behind a report query"""
+        try:
+            if user_id:
+                match_query = {'user_id': user_id}
+                partitions = self._partitions()
+            elif start_date and end_date:
+                match_query = {'date': {'$gte': start_date, '$lte': end_date}}
+                partitions = self._partitions(start_date, end_date)
+            else:
+                match_query = {}
+                partitions = self._partitions()
+
+            rollup = []
+            for collection in partitions:
+                rollup.extend(collection.aggregate([
+                    {'$match': match_query},
+                    {'$group': {
+                        '_id': None,
+                        'count': {'$sum': 1},
+                        'max_timestamp': {'$max': '$timestamp'},
+                        'max_last_seen': {'$max': '$last_seen'}
+                    }}
+                ]))
+
+            # Renames are copied onto attendance rows, so they change the report too
+            last_user_update = self.users.find_one(
+                {},
+                {'last_updated': 1, '_id': 0},
+                sort=[('last_updated', -1)]
+            )
+
+            count = sum(part['count'] for part in rollup)
+            timestamps = [part['max_timestamp'] for part in rollup if part['max_timestamp']]
+            max_timestamp = max(timestamps) if timestamps else None
+            # Session flushes move last_seen without adding records
+            sightings = [part['max_last_seen'] for part in rollup if part.get('max_last_seen')]
+            max_last_seen = max(sightings) if sightings else None
+            users_updated = last_user_update.get('last_updated') if last_user_update else None
+            return f"{count}:{max_timestamp}:{max_last_seen}:{users_updated}"
+        except Exception as e:
+            print(f"❌ Error retrieving data version: {str(e)}")
+            return None
 
 # Initialize database instance
 db = Database()
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+
+# Connection settings, overridable from the environment
+DATABASE_URL = os.getenv('DATABASE_URL', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'attendance_system')
+MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '50'))
+MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '3000'))
+CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '3000'))
+SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '10000'))
+
+# Retry settings for transient connection errors
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.2  # seconds, doubled after each attempt
+OUTAGE_RETRY_INTERVAL = int(os.getenv('MONGO_OUTAGE_RETRY_INTERVAL', '30'))  # Seconds marks skip MongoDB after it was unreachable
+
+JOURNAL_PATH = "data/attendance_journal.jsonl"
+
+def create_client(url=DATABASE_URL, max_pool_size=MAX_POOL_SIZE, min_pool_size=MIN_POOL_SIZE,
+                  server_selection_timeout_ms=SERVER_SELECTION_TIMEOUT_MS,
+                  connect_timeout_ms=CONNECT_TIMEOUT_MS, socket_timeout_ms=SOCKET_TIMEOUT_MS):
+    """Create a MongoDB client with a bounded pool, timeouts and retryable writes"""
+    return MongoClient(
+        url,
+        maxPoolSize=max_pool_size,
+        minPoolSize=min_pool_size,
+        serverSelectionTimeoutMS=server_selection_timeout_ms,
+        connectTimeoutMS=connect_timeout_ms,
+        socketTimeoutMS=socket_timeout_ms,
+        retryWrites=True,
+        retryReads=True
+    )
+
+def with_retry(operation, attempts=RETRY_ATTEMPTS, backoff=RETRY_BACKOFF):
+    """Run an operation, retrying with exponential backoff on connection failures"""
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except ConnectionFailure:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+class AttendanceJournal:
+    """Append-only local journal of attendance marks that could not reach MongoDB.
+
+    Each line is one JSON mark. Appends are fsynced so a crash while the
+    database is down does not lose marks, and replay rewrites the file with
+    only the marks that still could not be written. Lines that cannot be
+    parsed or written for any other reason are moved to <path>.rejected
+    with the error, so one bad mark never holds up the rest.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self.rejected_path = f"{path}.rejected"
+        self._lock = threading.Lock()
+
+    def append(self, user_id, timestamp):
+        """Record an attendance mark for later replay"""
+        entry = {'user_id': user_id, 'timestamp': timestamp.isoformat()}
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def has_pending(self):
+        """Check whether any marks are waiting to be replayed"""
+        try:
+            return os.path.getsize(self.path) > 0
+        except OSError:
+            return False
+
+    def pending(self):
+        """Return the journaled marks as (user_id, timestamp) tuples"""
+        return self._read()[0]
+
+    def _read(self):
+        """Parse the journal into (marks, [(line, error), ...] for lines that are not marks)"""
+        if not self.has_pending():
+            return [], []
+        entries = []
+        unreadable = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    entries.append((entry['user_id'], datetime.fromisoformat(entry['timestamp'])))
+                except (ValueError, KeyError, TypeError) as e:
+                    # A torn last line from a crash mid-append, or a hand edit
+                    unreadable.append((line, e))
+        return entries, unreadable
+
+    def _reject(self, rejected):
+        """Append (line, error) pairs to the rejected file"""
+        with open(self.rejected_path, 'a') as f:
+            for line, error in rejected:
+                f.write(json.dumps({'entry': line, 'error': str(error), 'rejected_at': datetime.now().isoformat()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay(self, writer):
+        """Replay journaled marks through writer, keeping those that hit a connection failure.
+
+        writer(user_id, timestamp) should write the mark and raise
+        ConnectionFailure if the database is still unreachable. Marks that
+        fail with any other error are rejected and replay carries on.
+        """
+        with self._lock:
+            entries, rejected = self._read()
+            if not entries and not rejected:
+                return 0
+
+            remaining = []
+            replayed = 0
+            for index, (user_id, timestamp) in enumerate(entries):
+                try:
+                    writer(user_id, timestamp)
+                    replayed += 1
+                except ConnectionFailure:
+                    # Still offline, keep this and every later mark in order
+                    remaining = entries[index:]
+                    break
+                except Exception as e:
+                    rejected.append((json.dumps({'user_id': user_id, 'timestamp': timestamp.isoformat()}), e))
+
+            if rejected:
+                self._reject(rejected)
+                print(f"⚠️ Rejected {len(rejected)} journaled attendance marks, see {self.rejected_path}")
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                for user_id, timestamp in remaining:
+                    f.write(json.dumps({'user_id': user_id, 'timestamp': timestamp.isoformat()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            return replayed
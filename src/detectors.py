@@ -0,0 +1,292 @@
+import cv2
+import os
+import sys
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+try:
+    import dlib
+except ImportError:
+    dlib = None
+
+DEFAULT_DETECTOR = os.getenv('FACE_DETECTOR', 'haar')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Not bundled; fetch it with: python src/detectors.py --download-yunet
+YUNET_MODEL_PATH = os.getenv('YUNET_MODEL_PATH', os.path.join(PROJECT_ROOT, 'models', 'face_detection_yunet_2023mar.onnx'))
+YUNET_MODEL_URL = ("https://github.com/opencv/opencv_zoo/raw/main/models/"
+                   "face_detection_yunet/face_detection_yunet_2023mar.onnx")
+YUNET_STRIDES = (8, 16, 32)
+YUNET_OUTPUTS = [f"{head}_{stride}" for head in ('cls', 'obj', 'bbox') for stride in YUNET_STRIDES]
+YUNET_BATCH_SIZE = 8  # Frames stacked into one network pass
+BATCH_WORKERS = os.cpu_count() or 1
+
+class FaceDetector:
+    """Common interface for face detection backends.
+
+    detect() takes a BGR frame (and optionally its grayscale version, so
+    callers that already converted it don't pay twice) and returns a list of
+    (x, y, w, h) boxes. detect_batch() runs several frames at once.
+    """
+
+    name = None
+
+    def detect(self, frame, gray=None):
+        raise NotImplementedError
+
+    def detect_batch(self, frames):
+        """Detect faces in several frames, one list of boxes per frame"""
+        return [self.detect(frame) for frame in frames]
+
+    def detect_largest(self, frame, gray=None):
+        """Return the largest detected face box, or None"""
+        boxes = self.detect(frame, gray)
+        if not boxes:
+            return None
+        return max(boxes, key=lambda box: box[2] * box[3])
+
+class _ThreadedBatchDetector(FaceDetector):
+    """Batch support for backends that release the GIL, with one model per worker thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._pool = None
+
+    def _model(self):
+        model = getattr(self._local, 'model', None)
+        if model is None:
+            model = self._local.model = self._load_model()
+        return model
+
+    def _load_model(self):
+        raise NotImplementedError
+
+    def detect_batch(self, frames):
+        if len(frames) < 2:
+            return [self.detect(frame) for frame in frames]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+        return list(self._pool.map(self.detect, frames))
+
+class HaarDetector(_ThreadedBatchDetector):
+    """OpenCV Haar cascade (haarcascade_frontalface_default.xml)"""
+
+    name = 'haar'
+
+    def __init__(self, scale_factor=1.1, min_neighbors=5, min_size=(30, 30)):
+        super().__init__()
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def _load_model(self):
+        return cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    def detect(self, frame, gray=None):
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = self._model().detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=self.min_size
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+class DlibHogDetector(_ThreadedBatchDetector):
+    """dlib HOG + linear SVM frontal face detector"""
+
+    name = 'dlib'
+
+    def __init__(self, upsample=0):
+        if dlib is None:
+            raise ImportError("dlib is not installed, run: pip install dlib")
+        super().__init__()
+        self.upsample = upsample
+
+    def _load_model(self):
+        return dlib.get_frontal_face_detector()
+
+    def detect(self, frame, gray=None):
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape[:2]
+        boxes = []
+        for rect in self._model()(gray, self.upsample):
+            x, y = max(rect.left(), 0), max(rect.top(), 0)
+            right, bottom = min(rect.right(), width), min(rect.bottom(), height)
+            if right > x and bottom > y:
+                boxes.append((x, y, right - x, bottom - y))
+        return boxes
+
+class YuNetDetector(FaceDetector):
+    """OpenCV DNN YuNet detector.
+
+    detect() runs cv2.FaceDetectorYN on one frame. detect_batch() pads
+    same-size frames to a multiple of 32, stacks up to batch_size of them
+    into one blob and runs the network once through cv2.dnn, decoding the
+    outputs the way FaceDetectorYN does. If the network rejects a batch it
+    falls back to one frame at a time.
+    """
+
+    name = 'yunet'
+
+    def __init__(self, model_path=YUNET_MODEL_PATH, score_threshold=0.8, nms_threshold=0.3,
+                 batch_size=YUNET_BATCH_SIZE):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"YuNet model not found at {model_path}. Fetch it with: python src/detectors.py --download-yunet"
+            )
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self.batch_size = batch_size
+        self._model = None
+        self._input_size = None
+        self._net = None
+        self._batched = True
+
+    def _model_for(self, frame):
+        height, width = frame.shape[:2]
+        if self._model is None:
+            self._model = cv2.FaceDetectorYN.create(
+                self.model_path, "", (width, height),
+                self.score_threshold, self.nms_threshold
+            )
+            self._input_size = (width, height)
+        elif self._input_size != (width, height):
+            self._model.setInputSize((width, height))
+            self._input_size = (width, height)
+        return self._model
+
+    def detect(self, frame, gray=None):
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        _, faces = self._model_for(frame).detect(frame)
+        if faces is None:
+            return []
+        return _clip_boxes(faces, frame.shape)
+
+    def detect_batch(self, frames):
+        # Only frames of one size can share a blob
+        groups = {}
+        for index, frame in enumerate(frames):
+            groups.setdefault(frame.shape[:2], []).append(index)
+
+        results = [None] * len(frames)
+        for indices in groups.values():
+            for start in range(0, len(indices), self.batch_size):
+                chunk = indices[start:start + self.batch_size]
+                boxes = None
+                if self._batched and len(chunk) > 1:
+                    boxes = self._detect_stacked([frames[index] for index in chunk])
+                if boxes is None:
+                    boxes = [self.detect(frames[index]) for index in chunk]
+                for index, frame_boxes in zip(chunk, boxes):
+                    results[index] = frame_boxes
+        return results
+
+    def _detect_stacked(self, frames):
+        """One forward pass over same-size frames, None if the network cannot take the batch"""
+        height, width = frames[0].shape[:2]
+        pad_height, pad_width = -(-height // 32) * 32, -(-width // 32) * 32
+        padded = [
+            cv2.copyMakeBorder(
+                cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) if frame.ndim == 2 else frame,
+                0, pad_height - height, 0, pad_width - width, cv2.BORDER_CONSTANT, value=0
+            )
+            for frame in frames
+        ]
+        if self._net is None:
+            self._net = cv2.dnn.readNet(self.model_path)
+        try:
+            self._net.setInput(cv2.dnn.blobFromImages(padded))
+            outputs = self._net.forward(YUNET_OUTPUTS)
+            heads = []
+            for i, stride in enumerate(YUNET_STRIDES):
+                cells = (pad_height // stride) * (pad_width // stride)
+                cls, obj, bbox = (
+                    np.asarray(outputs[i + k * len(YUNET_STRIDES)]).reshape(len(frames), cells, -1)
+                    for k in range(3)
+                )
+                heads.append((stride, pad_width // stride, cls, obj, bbox))
+        except (cv2.error, ValueError) as e:
+            # Exports with a fixed batch dimension cannot stack frames
+            print(f"⚠️ YuNet cannot run batches, detecting one frame at a time: {str(e)}")
+            self._batched = False
+            return None
+
+        results = []
+        for b in range(len(frames)):
+            faces, scores = [], []
+            for stride, cols, cls, obj, bbox in heads:
+                score = np.sqrt(np.clip(cls[b, :, 0], 0, 1) * np.clip(obj[b, :, 0], 0, 1))
+                keep = np.flatnonzero(score >= self.score_threshold)
+                if not len(keep):
+                    continue
+                rows, columns = np.divmod(keep, cols)
+                deltas = bbox[b, keep]
+                w = np.exp(deltas[:, 2]) * stride
+                h = np.exp(deltas[:, 3]) * stride
+                x = (columns + deltas[:, 0]) * stride - w / 2
+                y = (rows + deltas[:, 1]) * stride - h / 2
+                faces.append(np.stack([x, y, w, h], axis=1))
+                scores.append(score[keep])
+            if not faces:
+                results.append([])
+                continue
+            faces = np.concatenate(faces)
+            keep = cv2.dnn.NMSBoxes(faces.tolist(), np.concatenate(scores).tolist(),
+                                    self.score_threshold, self.nms_threshold)
+            results.append(_clip_boxes(faces[np.asarray(keep, dtype=int).reshape(-1)], frames[b].shape))
+        return results
+
+def _clip_boxes(faces, shape):
+    """(x, y, w, h) int boxes from float detections, clipped to the frame"""
+    height, width = shape[:2]
+    boxes = []
+    for face in faces:
+        x, y = max(int(face[0]), 0), max(int(face[1]), 0)
+        w, h = min(int(face[2]), width - x), min(int(face[3]), height - y)
+        if w > 0 and h > 0:
+            boxes.append((x, y, w, h))
+    return boxes
+
+DETECTORS = {
+    HaarDetector.name: HaarDetector,
+    DlibHogDetector.name: DlibHogDetector,
+    YuNetDetector.name: YuNetDetector,
+}
+
+def create_detector(name=None, **options):
+    """Create a face detector backend by name (haar, dlib or yunet)"""
+    name = name or DEFAULT_DETECTOR
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown face detector '{name}', choose from: {', '.join(DETECTORS)}")
+    return DETECTORS[name](**options)
+
+def download_yunet(path=YUNET_MODEL_PATH, url=YUNET_MODEL_URL):
+    """Fetch the YuNet ONNX model from the OpenCV model zoo"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    urllib.request.urlretrieve(url, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Face detector backends")
+    parser.add_argument('--download-yunet', action='store_true', help=f"Fetch the YuNet model to {YUNET_MODEL_PATH}")
+    args = parser.parse_args()
+    if not args.download_yunet:
+        parser.print_help()
+        return
+    try:
+        print(f"✅ YuNet model saved to {download_yunet()}")
+    except OSError as e:
+        print(f"❌ Could not download the YuNet model from {YUNET_MODEL_URL}: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import cv2
+import threading
+import numpy as np
+
+try:
+    import face_recognition
+except ImportError:
+    face_recognition = None
+
+EMBEDDING_TOLERANCE = 0.6  # face_recognition's default match distance
+RELOAD_INTERVAL = 10  # Seconds between checks for newly registered employees
+RETRY_FRAMES = 10  # Frames before an unmatched track is embedded again
+CROP_MARGIN = 0.25  # Context kept around the detected box for the landmark model
+
+class EmbeddingEngine:
+    """Recognize faces by nearest stored face_recognition encoding.
+
+    All known encodings live in one float32 matrix so a match is a single
+    vectorized distance computation. Embeddings are only computed when a
+    track first appears (and periodically for tracks that did not match);
+    the identity is cached in the track state for the rest of the track.
+
+    loader() returns (user_ids, matrix). If version_probe() is given, a
+    background thread polls it and reloads the matrix when it changes, so
+    newly inserted employees are picked up without a restart.
+    """
+
+    def __init__(self, loader, version_probe=None, tolerance=EMBEDDING_TOLERANCE,
+                 reload_interval=RELOAD_INTERVAL):
+        if face_recognition is None:
+            raise ImportError("face_recognition is not installed, run: pip install face_recognition")
+        self.loader = loader
+        self.version_probe = version_probe
+        self.tolerance = tolerance
+        self.reload_interval = reload_interval
+        self._version = version_probe() if version_probe else None
+        self._known = self._load()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load(self):
+        user_ids, matrix = self.loader()
+        return list(user_ids), np.asarray(matrix, dtype=np.float32).reshape(len(user_ids), -1)
+
+    @property
+    def known_count(self):
+        return len(self._known[0])
+
+    def reload(self):
+        """Reload encodings and swap them in with a single assignment"""
+        self._known = self._load()
+        print(f"🔄 Loaded {self.known_count} face encodings")
+
+    def encode(self, frame, box, pool=None):
+        """Compute the 128-d encoding of the face in a (x, y, w, h) box"""
+        x, y, w, h = box
+        margin_x, margin_y = int(w * CROP_MARGIN), int(h * CROP_MARGIN)
+        left, top = max(x - margin_x, 0), max(y - margin_y, 0)
+        right = min(x + w + margin_x, frame.shape[1])
+        bottom = min(y + h + margin_y, frame.shape[0])
+
+        region = frame[top:bottom, left:right]
+        crop = pool.rgb(region, name='face_rgb') if pool is not None else cv2.cvtColor(region, cv2.COLOR_BGR2RGB)
+        location = (y - top, x - left + w, y - top + h, x - left)
+        encodings = face_recognition.face_encodings(crop, known_face_locations=[location])
+        return encodings[0] if encodings else None
+
+    def match(self, encoding):
+        """Return (user_id, distance) for the nearest known encoding, user_id None if too far"""
+        return self.match_batch([encoding])[0]
+
+    def match_batch(self, encodings):
+        """Match several encodings at once against the known matrix"""
+        user_ids, matrix = self._known
+        if not len(encodings):
+            return []
+        if not user_ids:
+            return [(None, float('inf'))] * len(encodings)
+
+        queries = np.asarray(encodings, dtype=np.float32)
+        distances = np.linalg.norm(queries[:, None, :] - matrix[None, :, :], axis=2)
+        best = distances.argmin(axis=1)
+        results = []
+        for row, index in enumerate(best):
+            distance = float(distances[row, index])
+            results.append((user_ids[index] if distance <= self.tolerance else None, distance))
+        return results
+
+    def identify(self, frame, gray, box, state, pool=None):
+        """Identify a face, reusing the cached identity of its track when possible"""
+        cached = state.get('identity')
+        if cached is not None:
+            if cached[0] is not None:
+                return cached
+            state['retry'] = state.get('retry', 0) + 1
+            if state['retry'] < RETRY_FRAMES:
+                return cached
+
+        encoding = self.encode(frame, box, pool)
+        result = self.match(encoding) if encoding is not None else (None, float('inf'))
+        state['identity'] = result
+        state['retry'] = 0
+        return result
+
+    def start_watching(self):
+        """Poll for new encodings in the background and hot-reload them"""
+        if self.version_probe is None or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                version = self.version_probe()
+                if version != self._version:
+                    self.reload()
+                    self._version = version
+            except Exception as e:
+                print(f"❌ Error reloading face encodings: {str(e)}")
+
+    def stop_watching(self):
+        """Stop the background reload thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
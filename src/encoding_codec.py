@@ -0,0 +1,51 @@
+import struct
+import numpy as np
+from bson import Binary
+
+# Stored layout: magic, dtype, ndim, ndim uint32 dimensions, then the raw
+# little-endian float32 values. Unlike pickle, decoding never runs code.
+MAGIC = b'FENC'
+DTYPE = np.dtype('<f4')
+HEADER = struct.Struct('<4s3sB')
+
+def encode(encoding):
+    """Pack a face encoding into Binary with a dtype/shape header"""
+    array = np.ascontiguousarray(encoding, dtype=DTYPE)
+    header = HEADER.pack(MAGIC, DTYPE.str.encode(), array.ndim)
+    dims = struct.pack(f'<{array.ndim}I', *array.shape)
+    return Binary(header + dims + array.tobytes())
+
+def is_encoded(data):
+    """Whether a stored value was written by encode()"""
+    return isinstance(data, bytes) and data[:len(MAGIC)] == MAGIC
+
+def _parse_header(data):
+    magic, dtype, ndim = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded face encoding")
+    if dtype != DTYPE.str.encode():
+        raise ValueError(f"Unsupported face encoding dtype: {dtype.decode()}")
+    shape = struct.unpack_from(f'<{ndim}I', data, HEADER.size)
+    return shape, HEADER.size + 4 * ndim
+
+def decode(data):
+    """Unpack a face encoding written by encode() into a read-only float32 array"""
+    shape, offset = _parse_header(data)
+    return np.frombuffer(data, dtype=DTYPE, offset=offset).reshape(shape)
+
+def decode_matrix(blobs, dim=128):
+    """Decode many 1-d encodings into one (len(blobs), dim) float32 matrix.
+
+    The payloads are concatenated and converted with a single np.frombuffer,
+    so the cost is one copy regardless of how many encodings are loaded.
+    """
+    if not blobs:
+        return np.empty((0, dim), dtype=np.float32)
+    payloads = []
+    for data in blobs:
+        shape, offset = _parse_header(data)
+        if len(shape) != 1 or shape[0] != dim:
+            raise ValueError(f"Expected a {dim}-d face encoding, got shape {shape}")
+        payloads.append(memoryview(data)[offset:])
+    matrix = np.frombuffer(b''.join(payloads), dtype=DTYPE).reshape(len(blobs), dim)
+    return matrix.astype(np.float32, copy=False)
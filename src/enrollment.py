@@ -0,0 +1,87 @@
+import cv2
+import os
+import numpy as np
+
+BURST_FRAMES = 40  # Frames captured per enrollment
+TOP_K = 8  # Crops kept per user
+MIN_FACE_SIZE = 80  # Pixels, smaller faces are rejected
+SHARPNESS_REF = 300.0  # Laplacian variance treated as fully sharp
+SIZE_REF = 200.0  # Face width treated as fully sized
+DIVERSITY_THRESHOLD = 0.08  # Minimum mean abs difference between kept crops
+THUMB_SIZE = (32, 32)
+
+# Score weights for sharpness, face size and frontal pose
+WEIGHTS = (0.5, 0.2, 0.3)
+
+def sharpness(gray_face):
+    """Variance of the Laplacian, higher is sharper"""
+    return cv2.Laplacian(gray_face, cv2.CV_64F).var()
+
+def frontalness(gray_face):
+    """Left/right mirror symmetry of the face in [0, 1], higher is more frontal"""
+    face = cv2.resize(gray_face, (64, 64)).astype(np.float32)
+    left = face[:, :32]
+    right = np.fliplr(face[:, 32:])
+    return 1.0 - float(np.mean(np.abs(left - right))) / 255.0
+
+def score_face(frame, box):
+    """Score a detected face for enrollment, returning None if it is unusable"""
+    x, y, w, h = box
+    x, y = max(x, 0), max(y, 0)
+    if w < MIN_FACE_SIZE or h < MIN_FACE_SIZE:
+        return None
+
+    crop = frame[y:y+h, x:x+w]
+    if crop.size == 0:
+        return None
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+
+    sharp = sharpness(gray)
+    pose = frontalness(gray)
+    score = (
+        WEIGHTS[0] * min(sharp / SHARPNESS_REF, 1.0) +
+        WEIGHTS[1] * min(w / SIZE_REF, 1.0) +
+        WEIGHTS[2] * pose
+    )
+    return {
+        'crop': crop.copy(),
+        'thumb': cv2.resize(gray, THUMB_SIZE).astype(np.float32) / 255.0,
+        'score': score,
+        'sharpness': sharp,
+        'size': w,
+        'pose': pose
+    }
+
+def select_diverse(candidates, top_k=TOP_K, min_distance=DIVERSITY_THRESHOLD):
+    """Pick the top-K scoring candidates that differ enough from each other.
+
+    Candidates are taken best-first and skipped if too similar to one already
+    picked; if that leaves fewer than top_k, the best skipped ones fill up.
+    """
+    ranked = sorted(candidates, key=lambda candidate: candidate['score'], reverse=True)
+    selected = []
+    skipped = []
+    for candidate in ranked:
+        if len(selected) >= top_k:
+            break
+        if all(np.mean(np.abs(candidate['thumb'] - chosen['thumb'])) >= min_distance
+               for chosen in selected):
+            selected.append(candidate)
+        else:
+            skipped.append(candidate)
+    selected.extend(skipped[:top_k - len(selected)])
+    return selected
+
+def save_samples(user_dir, samples):
+    """Write selected face crops into a per-user directory, replacing older ones"""
+    os.makedirs(user_dir, exist_ok=True)
+    for name in os.listdir(user_dir):
+        if name.endswith(('.jpg', '.jpeg', '.png')):
+            os.remove(os.path.join(user_dir, name))
+
+    paths = []
+    for index, sample in enumerate(samples):
+        path = os.path.join(user_dir, f"{index:02d}.jpg")
+        cv2.imwrite(path, sample['crop'])
+        paths.append(path)
+    return paths
@@ -0,0 +1,267 @@
+import os
+import json
+import mmap
+import threading
+from datetime import datetime, timedelta, date as date_type
+import numpy as np
+
+EVENT_LOG_DIR = "data/events"
+EVENTS_FILE = 'events.bin'
+USERS_FILE = 'users.txt'
+CAMERAS_FILE = 'cameras.txt'
+DAY_INDEX_FILE = 'days.json'
+FSYNC_BATCH = 64  # Records appended before the log is fsynced
+FSYNC_INTERVAL = 1.0  # Seconds a record may wait for its fsync
+
+# Fixed 24-byte little-endian records, so the reader can view the file as an array
+RECORD_DTYPE = np.dtype([
+    ('user', '<u4'),
+    ('camera', '<u2'),
+    ('flags', '<u2'),
+    ('timestamp', '<f8'),
+    ('confidence', '<f4'),
+    ('reserved', '<u4')
+])
+RECORD_SIZE = RECORD_DTYPE.itemsize
+
+def _day_key(timestamp):
+    return timestamp.strftime("%Y-%m-%d")
+
+class EventLog:
+    """Append-only attendance event log for edge boxes without MongoDB.
+
+    Each sighting is one fixed-size record (user index, camera id, epoch
+    timestamp, confidence) in events.bin. User ids are interned into
+    users.txt, where line n is user index n, and camera stream names the
+    same way into cameras.txt. Appends are fsynced in batches of
+    FSYNC_BATCH records or every FSYNC_INTERVAL seconds, and days.json
+    maps each day to the first record written for it. days.json is only
+    rewritten after the records it points at are fsynced, so it may lag
+    behind the data but never runs ahead of it; readers bound days by
+    timestamp, and reopening the log indexes any days it is missing.
+    Records are expected in time order, as the live loops produce them.
+    """
+
+    def __init__(self, log_dir=EVENT_LOG_DIR, fsync_batch=FSYNC_BATCH, fsync_interval=FSYNC_INTERVAL):
+        self.log_dir = log_dir
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        os.makedirs(log_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._user_ids = _read_lines(log_dir, USERS_FILE)
+        self._user_index = {user_id: index for index, user_id in enumerate(self._user_ids)}
+        self._users_file = open(os.path.join(log_dir, USERS_FILE), 'a', encoding='utf-8')
+        self._camera_ids = _read_lines(log_dir, CAMERAS_FILE)
+        self._camera_index = {camera: index for index, camera in enumerate(self._camera_ids)}
+        self._cameras_file = open(os.path.join(log_dir, CAMERAS_FILE), 'a', encoding='utf-8')
+        self._events = open(os.path.join(log_dir, EVENTS_FILE), 'ab')
+
+        # Drop a torn trailing record left by a crash mid-append
+        size = self._events.seek(0, os.SEEK_END)
+        if size % RECORD_SIZE:
+            self._events.truncate(size - size % RECORD_SIZE)
+        self._count = size // RECORD_SIZE
+        self._days = _read_day_index(log_dir)
+        self._days_changed = self._index_missing_days()
+        if self._days_changed:
+            self._write_day_index()
+        self._unsynced = 0
+
+        # Syncs a partial batch once it has waited fsync_interval
+        self._stop = threading.Event()
+        self._syncer = threading.Thread(target=self._run_syncer, daemon=True)
+        self._syncer.start()
+
+    def _index_missing_days(self):
+        """Add days whose records were synced before a crash cut off the days.json rewrite"""
+        start = max(self._days.values(), default=0)
+        if start >= self._count:
+            return False
+        tail = np.fromfile(os.path.join(self.log_dir, EVENTS_FILE), dtype=RECORD_DTYPE,
+                           count=self._count - start, offset=start * RECORD_SIZE)
+        changed = False
+        for offset, timestamp in enumerate(tail['timestamp'], start):
+            day = _day_key(datetime.fromtimestamp(timestamp))
+            if day not in self._days:
+                self._days[day] = offset
+                changed = True
+        return changed
+
+    def _run_syncer(self):
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Error syncing event log: {str(e)}")
+
+    def append(self, user_id, timestamp=None, confidence=float('nan'), camera_id=0):
+        """Append one sighting and return its record number.
+
+        camera_id is a number, or a stream name that is interned into cameras.txt.
+        """
+        timestamp = timestamp or datetime.now()
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record['timestamp'] = timestamp.timestamp()
+        record['confidence'] = float('nan') if confidence is None else confidence
+
+        with self._lock:
+            index = self._user_index.get(user_id)
+            if index is None:
+                index = self._intern(user_id, self._user_ids, self._user_index, self._users_file)
+            record['user'] = index
+            if isinstance(camera_id, str):
+                name = camera_id
+                camera_id = self._camera_index.get(name)
+                if camera_id is None:
+                    camera_id = self._intern(name, self._camera_ids, self._camera_index, self._cameras_file)
+            record['camera'] = camera_id
+
+            day = _day_key(timestamp)
+            if day not in self._days:
+                self._days[day] = self._count
+                self._days_changed = True
+
+            self._events.write(record.tobytes())
+            number = self._count
+            self._count += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch:
+                self._sync()
+            return number
+
+    def _intern(self, name, names, index_of, names_file):
+        index = len(names)
+        names.append(name)
+        index_of[name] = index
+        # The name line must be durable before any record refers to it
+        names_file.write(name + '\n')
+        names_file.flush()
+        os.fsync(names_file.fileno())
+        return index
+
+    def _write_day_index(self):
+        path = os.path.join(self.log_dir, DAY_INDEX_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._days, f)
+        os.replace(path + '.tmp', path)
+
+    def _sync(self):
+        self._events.flush()
+        os.fsync(self._events.fileno())
+        self._unsynced = 0
+        # Only now do the new day offsets point at durable records
+        if self._days_changed:
+            self._write_day_index()
+            self._days_changed = False
+
+    def flush(self):
+        """fsync any records still waiting for their batch"""
+        with self._lock:
+            if self._unsynced:
+                self._sync()
+
+    def close(self):
+        self._stop.set()
+        self._syncer.join()
+        self.flush()
+        self._events.close()
+        self._users_file.close()
+        self._cameras_file.close()
+
+def _read_lines(log_dir, name):
+    path = os.path.join(log_dir, name)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+def _read_day_index(log_dir):
+    path = os.path.join(log_dir, DAY_INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class EventLogReader:
+    """Memory-mapped view of an event log as a NumPy record array.
+
+    Opening maps the records written so far; call refresh() to see later
+    appends. Day queries slice the mapping using the per-day offset index,
+    so they never read other days' records.
+    """
+
+    def __init__(self, log_dir=EVENT_LOG_DIR):
+        self.log_dir = log_dir
+        self._file = None
+        self._mmap = None
+        self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self.refresh()
+
+    def refresh(self):
+        """Re-map the log and reload the user table and day index"""
+        self.close()
+        self.user_ids = _read_lines(self.log_dir, USERS_FILE)
+        self.camera_ids = _read_lines(self.log_dir, CAMERAS_FILE)
+        self.days = _read_day_index(self.log_dir)
+        path = os.path.join(self.log_dir, EVENTS_FILE)
+        count = os.path.getsize(path) // RECORD_SIZE if os.path.exists(path) else 0
+        if count == 0:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+            return
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), count * RECORD_SIZE, access=mmap.ACCESS_READ)
+        self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=count)
+
+    def close(self):
+        # Drop the array view first, the mmap cannot close while it is exported
+        self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Arrays returned to callers still reference the mapping, it is released with them
+                pass
+            self._file.close()
+            self._mmap = self._file = None
+
+    def day(self, date):
+        """Records for a date ('YYYY-MM-DD' or a date), in log order"""
+        if isinstance(date, date_type):
+            date = date.strftime("%Y-%m-%d")
+        # The index narrows the search; it can lag the data by up to one
+        # fsync, so the exact bounds come from the (time-ordered) timestamps
+        earlier = [offset for day, offset in self.days.items() if day <= date]
+        later = [offset for day, offset in self.days.items() if day > date]
+        start = max(earlier) if earlier else 0
+        end = min(later) if later else len(self.records)
+        midnight = datetime.strptime(date, "%Y-%m-%d")
+        first, last = np.searchsorted(self.records['timestamp'][start:end], [
+            midnight.timestamp(), (midnight + timedelta(days=1)).timestamp()
+        ])
+        return self.records[start + first:start + last]
+
+    def users_on(self, date):
+        """Set of user ids seen on a date, e.g. to rebuild a dedup set after a restart"""
+        return {self.user_ids[index] for index in np.unique(self.day(date)['user'])}
+
+    def sessions(self, date):
+        """First and last sighting per user on a date, in SessionTable's format"""
+        records = self.day(date)
+        if not len(records):
+            return []
+        order = np.argsort(records['user'], kind='stable')
+        users = records['user'][order]
+        timestamps = records['timestamp'][order]
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        first = np.minimum.reduceat(timestamps, starts)
+        last = np.maximum.reduceat(timestamps, starts)
+        return [
+            {
+                'date': date if isinstance(date, str) else date.strftime("%Y-%m-%d"),
+                'user_id': self.user_ids[users[start]],
+                'first_seen': datetime.fromtimestamp(first[i]),
+                'last_seen': datetime.fromtimestamp(last[i])
+            }
+            for i, start in enumerate(starts)
+        ]
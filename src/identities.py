@@ -0,0 +1,98 @@
+import os
+import re
+import json
+import argparse
+
+DATASET_DIR = "images/registered"
+IDENTITY_MANIFEST = os.getenv('IDENTITY_MANIFEST', os.path.join(DATASET_DIR, 'identities.json'))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def load_manifest(path=IDENTITY_MANIFEST):
+    """Read a {user_id: [image or directory name, ...]} manifest, empty if the file is missing"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_db_aliases(users):
+    """Map alias names to user ids from the 'aliases' lists in the users collection"""
+    aliases = {}
+    for user in users.find({'aliases': {'$exists': True, '$ne': []}}, {'user_id': 1, 'aliases': 1, '_id': 0}):
+        for alias in user['aliases']:
+            aliases[alias] = user['user_id']
+    return aliases
+
+class IdentityResolver:
+    """Maps dataset entries to the user id they belong to.
+
+    A flat photo or per-user directory is normally its own identity, named
+    after the file stem or directory. The manifest groups several entries
+    under one user id, e.g. {"Gopi": ["Gopi.jpg", "Gopi2.jpg"]}, and
+    aliases recorded on user documents do the same for ids already in
+    MongoDB. Manifest entries win over database aliases.
+    """
+
+    def __init__(self, manifest=None, aliases=None):
+        self.aliases = dict(aliases or {})
+        for user_id, entries in (manifest or {}).items():
+            for entry in entries:
+                self.aliases[entry] = user_id
+                self.aliases[_entry_name(entry)] = user_id
+
+    @classmethod
+    def load(cls, manifest_path=IDENTITY_MANIFEST, users=None):
+        """Build a resolver from the manifest file and, when given, the users collection"""
+        aliases = load_db_aliases(users) if users is not None else {}
+        return cls(load_manifest(manifest_path), aliases)
+
+    def user_id_for(self, entry):
+        """User id for a dataset file or directory name"""
+        return self.aliases.get(entry) or self.aliases.get(_entry_name(entry)) or _entry_name(entry)
+
+    def aliases_of(self, user_id):
+        """Names other than user_id that resolve to it"""
+        return sorted({_entry_name(name) for name, target in self.aliases.items()
+                       if target == user_id and _entry_name(name) != user_id})
+
+def _entry_name(entry):
+    return os.path.splitext(entry)[0] if entry.endswith(IMAGE_EXTENSIONS) else entry
+
+def suggest_manifest(dataset_dir=DATASET_DIR):
+    """Group entries whose name is another entry's name plus a number, e.g. Gopi2.jpg with Gopi.jpg"""
+    names = {}
+    for entry in sorted(os.listdir(dataset_dir)):
+        if entry.endswith(IMAGE_EXTENSIONS) or os.path.isdir(os.path.join(dataset_dir, entry)):
+            names.setdefault(_entry_name(entry), []).append(entry)
+
+    manifest = {}
+    for name, entries in names.items():
+        base = re.sub(r'[_ -]?\d+$', '', name)
+        if base != name and base in names:
+            manifest.setdefault(base, list(names[base])).extend(entries)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or create the identity manifest used for training")
+    parser.add_argument('--dataset', default=DATASET_DIR)
+    parser.add_argument('--manifest', default=IDENTITY_MANIFEST)
+    parser.add_argument('--suggest', action='store_true', help="Propose groups of numbered photos of one person")
+    parser.add_argument('--write', action='store_true', help="Merge the suggestions into the manifest file")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    if args.suggest or args.write:
+        for user_id, entries in suggest_manifest(args.dataset).items():
+            if user_id not in manifest:
+                print(f"ℹ️ Suggested: {user_id} <- {', '.join(entries)}")
+                manifest[user_id] = entries
+    if args.write:
+        with open(args.manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+            f.write('\n')
+        print(f"✅ Wrote {len(manifest)} identities to {args.manifest}")
+    else:
+        for user_id, entries in manifest.items():
+            print(f"{user_id}: {', '.join(entries)}")
+
+if __name__ == "__main__":
+    main()
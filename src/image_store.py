@@ -0,0 +1,93 @@
+import os
+import hashlib
+import tempfile
+import cv2
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_STORE_DIR = os.getenv('IMAGE_STORE_DIR', os.path.join(PROJECT_ROOT, 'data', 'images'))
+THUMBNAIL_SIZE = 96  # Longest side of cached thumbnails, in pixels
+CHUNK_SIZE = 1 << 16
+
+class ImageStore:
+    """Content-addressed image files keyed by SHA-256.
+
+    Images live at objects/<first two hex chars>/<sha256>, so identical
+    files are stored once no matter how many users or training runs refer
+    to them. Thumbnails are generated on first request and cached under
+    thumbs/.
+    """
+
+    def __init__(self, root=IMAGE_STORE_DIR):
+        self.root = root
+
+    def path(self, image_id):
+        """File path of a stored image"""
+        return os.path.join(self.root, 'objects', image_id[:2], image_id)
+
+    def exists(self, image_id):
+        return os.path.exists(self.path(image_id))
+
+    def put_bytes(self, data):
+        """Store encoded image bytes and return their SHA-256 id"""
+        image_id = hashlib.sha256(data).hexdigest()
+        if not self.exists(image_id):
+            self._write(image_id, [data])
+        return image_id
+
+    def put_file(self, file_path):
+        """Store an image file and return its SHA-256 id, skipping the copy if already stored"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        image_id = digest.hexdigest()
+        if not self.exists(image_id):
+            with open(file_path, 'rb') as f:
+                self._write(image_id, iter(lambda: f.read(CHUNK_SIZE), b''))
+        return image_id
+
+    def _write(self, image_id, chunks):
+        target = self.path(image_id)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def read(self, image_id):
+        """Encoded bytes of a stored image"""
+        with open(self.path(image_id), 'rb') as f:
+            return f.read()
+
+    def imread(self, image_id, flags=cv2.IMREAD_COLOR):
+        """Decode a stored image with OpenCV, None if missing or unreadable"""
+        return cv2.imread(self.path(image_id), flags)
+
+    def thumbnail(self, image_id, size=THUMBNAIL_SIZE):
+        """Path of a cached JPEG thumbnail whose longest side is size, None if the image is unreadable"""
+        thumb_path = os.path.join(self.root, 'thumbs', f"{image_id}_{size}.jpg")
+        if os.path.exists(thumb_path):
+            return thumb_path
+
+        image = self.imread(image_id)
+        if image is None:
+            return None
+        height, width = image.shape[:2]
+        scale = size / float(max(height, width))
+        if scale < 1:
+            image = cv2.resize(image, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                               interpolation=cv2.INTER_AREA)
+
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        tmp_path = thumb_path + '.tmp.jpg'
+        cv2.imwrite(tmp_path, image)
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+
+images = ImageStore()
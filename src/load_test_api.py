@@ -0,0 +1,101 @@
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+import numpy as np
+
+DEFAULT_PATHS = ['/attendance/today', '/stats/daily', '/summary', '/users']
+USER_STATS_SAMPLE = 10  # Users whose /stats endpoint is added to the mix
+
+async def _request(reader, writer, host, path):
+    """Send one keep-alive GET and return (status, X-Cache header, body)"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('x-cache'), body
+
+async def _client(host, port, paths, offset, deadline, results):
+    """Cycle through the paths on one connection until the deadline"""
+    reader, writer = await asyncio.open_connection(host, port)
+    index = offset
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                status, cache, _ = await _request(reader, writer, host, path)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                results['errors'] += 1
+                print(f"❌ Connection lost: {str(e)}")
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            results['latencies'].append(time.perf_counter() - started)
+            if status != 200:
+                results['errors'] += 1
+            if cache == 'HIT':
+                results['hits'] += 1
+    finally:
+        writer.close()
+
+async def _discover_user_paths(host, port):
+    """Add per-user stats endpoints for a few registered users"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, _, body = await _request(reader, writer, host, f"/users?limit={USER_STATS_SAMPLE}")
+        if status != 200:
+            return []
+        return [f"/users/{user['user_id']}/stats" for user in json.loads(body)]
+    finally:
+        writer.close()
+
+async def run(url, concurrency, duration, paths):
+    parts = urlsplit(url)
+    host, port = parts.hostname or 'localhost', parts.port or 80
+    paths = list(paths) + await _discover_user_paths(host, port)
+    print(f"🔄 {concurrency} clients for {duration:.0f}s over {len(paths)} endpoints...")
+
+    results = {'latencies': [], 'errors': 0, 'hits': 0}
+    began = time.perf_counter()
+    deadline = began + duration
+    await asyncio.gather(*(
+        _client(host, port, paths, offset, deadline, results) for offset in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - began
+    return results, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure requests/sec of the attendance API")
+    parser.add_argument('--url', default='http://localhost:8080', help="Base URL of api_server.py")
+    parser.add_argument('--concurrency', type=int, default=50, help="Concurrent keep-alive connections")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds to run")
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS, help="Endpoints to cycle through")
+    args = parser.parse_args()
+
+    try:
+        results, elapsed = asyncio.run(run(args.url, args.concurrency, args.duration, args.paths))
+    except ConnectionError as e:
+        print(f"❌ Cannot reach {args.url}: {str(e)}")
+        return
+
+    latencies = np.array(results['latencies']) * 1000
+    if not len(latencies):
+        print("❌ No requests completed")
+        return
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"📊 {len(latencies)} requests in {elapsed:.1f}s: {len(latencies) / elapsed:.0f} requests/s")
+    print(f"📊 Latency p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms, max {latencies.max():.1f} ms")
+    print(f"📊 Cache hits {results['hits'] / len(latencies):.0%}, errors {results['errors']}")
+
+if __name__ == "__main__":
+    main()
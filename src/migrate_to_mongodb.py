@@ -1,7 +1,14 @@
 import os
 import csv
+import pickle
+import numpy as np
 from datetime import datetime
+from pymongo import UpdateOne
 from database import db
+import encoding_codec
+from image_store import images
+from event_log import EventLogReader
+from identities import IdentityResolver
 
 def migrate_users():
     """Migrate users from images directory to MongoDB"""
@@ -12,20 +19,43 @@ def migrate_users():
         print("❌ No registered users found!")
         return
     
-    success_count = 0
-    for img_name in os.listdir(images_dir):
+    # Photos the identity manifest groups together register one user
+    resolver = IdentityResolver.load()
+    identities = {}
+    for img_name in sorted(os.listdir(images_dir)):
         if not img_name.endswith(('.jpg', '.jpeg', '.png')):
             continue
-            
-        user_id = os.path.splitext(img_name)[0]
+        identities.setdefault(resolver.user_id_for(img_name), []).append(img_name)
+    
+    success_count = 0
+    for user_id, img_names in identities.items():
+        # Prefer the photo named after the user as its profile image
+        img_name = min(img_names, key=lambda name: (os.path.splitext(name)[0] != user_id, name))
         image_path = os.path.join(images_dir, img_name)
         
-        # Add user to MongoDB
+        # Add user to MongoDB, identical photos are stored only once in the image store
         if db.add_user(user_id, user_id, image_path):
             success_count += 1
             
     print(f"✅ Successfully migrated {success_count} users to MongoDB")
 
+def migrate_user_images():
+    """Move images embedded in user documents into the image store"""
+    print("\n🔄 Moving user images into the image store...")
+    
+    success_count = 0
+    for user in db.users.find({'image_data': {'$exists': True}}, {'image_data': 1}):
+        try:
+            update = {'$unset': {'image_data': ''}}
+            if user['image_data']:
+                update['$set'] = {'image_ref': images.put_bytes(bytes(user['image_data']))}
+            db.users.update_one({'_id': user['_id']}, update)
+            success_count += 1
+        except Exception as e:
+            print(f"❌ Error moving image for user {user['_id']}: {str(e)}")
+    
+    print(f"✅ Successfully moved {success_count} user images")
+
 def migrate_attendance():
     """Migrate attendance records from CSV files to MongoDB"""
     print("\n🔄 Migrating attendance records...")
@@ -71,6 +101,77 @@ def migrate_attendance():
     
     print(f"✅ Successfully migrated {success_count} attendance records to MongoDB")
 
+def migrate_event_log():
+    """Upsert first/last sightings from the local event log written by main.py"""
+    print("\n🔄 Migrating the attendance event log...")
+    
+    reader = EventLogReader()
+    success_count = 0
+    try:
+        for date in sorted(reader.days):
+            sessions = reader.sessions(date)
+            if sessions and db.upsert_sessions(sessions):
+                success_count += len(sessions)
+    finally:
+        reader.close()
+    
+    print(f"✅ Successfully migrated {success_count} daily attendance records from the event log")
+
+def migrate_identity_aliases():
+    """Merge users and attendance recorded under ids the identity manifest marks as aliases"""
+    print("\n🔄 Merging identity aliases...")
+    
+    success_count = db.resume_merges()
+    resolver = IdentityResolver.load(users=db.users)
+    for user_id in sorted(set(resolver.aliases.values())):
+        for alias_id in resolver.aliases_of(user_id):
+            moved_count = db.merge_user(alias_id, user_id)
+            if moved_count:
+                print(f"ℹ️ Moved {moved_count} attendance records from {alias_id} to {user_id}")
+            success_count += moved_count
+    
+    print(f"✅ Successfully merged {success_count} attendance records from aliases")
+
+def migrate_attendance_names():
+    """Denormalize user names onto existing attendance records"""
+    print("\n🔄 Copying user names onto attendance records...")
+    
+    success_count = 0
+    for user in db.users.find({}, {'user_id': 1, '_id': 0}):
+        success_count += db.propagate_user_name(user['user_id'])
+    
+    print(f"✅ Successfully updated {success_count} attendance records")
+
+def migrate_face_encodings(batch_size=500):
+    """Rewrite pickled and list face encodings in the float32 codec format"""
+    print("\n🔄 Converting face encodings...")
+    
+    success_count = 0
+    sources = ((db.users, {'face_encoding': {'$ne': None}}), (db.employees, {'face_encoding': {'$exists': True}}))
+    for collection, query in sources:
+        updates = []
+        for doc in collection.find(query, {'face_encoding': 1}):
+            encoding = doc['face_encoding']
+            if encoding_codec.is_encoded(encoding):
+                continue
+            try:
+                if isinstance(encoding, list):
+                    vector = np.asarray(encoding, dtype=np.float32)
+                else:
+                    # Only ever written by this application's old add_user
+                    vector = np.asarray(pickle.loads(encoding), dtype=np.float32).ravel()
+            except Exception as e:
+                print(f"❌ Error decoding face encoding {doc['_id']}: {str(e)}")
+                continue
+            updates.append(UpdateOne({'_id': doc['_id']}, {'$set': {'face_encoding': encoding_codec.encode(vector)}}))
+            if len(updates) >= batch_size:
+                success_count += collection.bulk_write(updates, ordered=False).modified_count
+                updates = []
+        if updates:
+            success_count += collection.bulk_write(updates, ordered=False).modified_count
+    
+    print(f"✅ Successfully converted {success_count} face encodings")
+
 def main():
     print("📊 Starting data migration to MongoDB...")
     
@@ -81,7 +182,12 @@ def main():
         
         # Migrate data
         migrate_users()
+        migrate_user_images()
         migrate_attendance()
+        migrate_event_log()
+        migrate_identity_aliases()
+        migrate_attendance_names()
+        migrate_face_encodings()
         
         print("\n✅ Migration completed successfully!")
         
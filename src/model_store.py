@@ -0,0 +1,150 @@
+import os
+import sys
+import shutil
+from datetime import datetime
+
+# Anchored to the project root rather than the working directory, so scripts
+# started from src/ and from the project root share one store (the old
+# data/ and src/data/ model copies drifted apart for exactly that reason)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_STORE_DIR = os.getenv('MODEL_STORE_DIR', os.path.join(PROJECT_ROOT, 'data', 'models'))
+KEEP_VERSIONS = 5  # Published versions kept for rollback
+CURRENT_FILE = 'CURRENT'
+STAGING_PREFIX = '.staging-'
+
+MODEL_FILE = 'trained_model.yml'
+LABEL_MAP_FILE = 'label_map.pkl'
+THRESHOLDS_FILE = 'thresholds.pkl'
+
+def _fsync_dir(path):
+    # Directory fsync makes renames durable on POSIX, it is not supported on Windows
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class ModelStore:
+    """Versioned, atomically published model artifacts.
+
+    Every training run writes its files into a staging directory, which is
+    renamed into place as data/models/<version>/ once all files are on disk.
+    The CURRENT file names the active version and is swapped with a single
+    os.replace, so readers that resolve it once and then load from that
+    directory never see a model and label map from different runs. Rolling
+    back only rewrites CURRENT.
+    """
+
+    def __init__(self, root=MODEL_STORE_DIR, keep=KEEP_VERSIONS):
+        self.root = root
+        self.keep = keep
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            entry for entry in os.listdir(self.root)
+            if not entry.startswith(STAGING_PREFIX) and os.path.isdir(os.path.join(self.root, entry))
+        )
+
+    def current_version(self):
+        """The active version, or None if nothing has been published"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), 'r') as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def current_dir(self):
+        """Directory of the active version, or None"""
+        version = self.current_version()
+        return self.version_dir(version) if version else None
+
+    def stage(self):
+        """Create an empty staging directory for a new version and return its path"""
+        os.makedirs(self.root, exist_ok=True)
+        version = datetime.now().strftime('%Y%m%d-%H%M%S')
+        suffix = 1
+        while os.path.exists(self.version_dir(version)):
+            version = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}"
+            suffix += 1
+        staging_dir = os.path.join(self.root, STAGING_PREFIX + version)
+        os.makedirs(staging_dir)
+        return staging_dir
+
+    def publish(self, staging_dir):
+        """Move a fully written staging directory into place and make it current"""
+        version = os.path.basename(staging_dir)[len(STAGING_PREFIX):]
+        for name in os.listdir(staging_dir):
+            with open(os.path.join(staging_dir, name), 'rb+') as f:
+                os.fsync(f.fileno())
+        os.rename(staging_dir, self.version_dir(version))
+        _fsync_dir(self.root)
+        self.set_current(version)
+        self.prune()
+        return version
+
+    def discard(self, staging_dir):
+        """Remove a staging directory after a failed training run"""
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def set_current(self, version):
+        """Point CURRENT at a published version"""
+        if not os.path.isdir(self.version_dir(version)):
+            raise ValueError(f"Unknown model version: {version}")
+        tmp_path = os.path.join(self.root, CURRENT_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+        _fsync_dir(self.root)
+
+    def rollback(self, version=None):
+        """Make an older version current, by default the one before the active version"""
+        if version is None:
+            versions = self.versions()
+            current = self.current_version()
+            older = [v for v in versions if current is None or v < current]
+            if not older:
+                raise ValueError("No older model version to roll back to")
+            version = older[-1]
+        self.set_current(version)
+        return version
+
+    def prune(self):
+        """Delete all but the newest versions, never the current one"""
+        current = self.current_version()
+        versions = self.versions()
+        for version in versions[:max(len(versions) - self.keep, 0)]:
+            if version != current:
+                shutil.rmtree(self.version_dir(version), ignore_errors=True)
+
+store = ModelStore()
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    try:
+        if command == 'list':
+            current = store.current_version()
+            for version in store.versions():
+                print(f"{'*' if version == current else ' '} {version}")
+            if current is None:
+                print("ℹ️ No model has been published yet, run train_model.py")
+        elif command == 'rollback':
+            version = store.rollback(sys.argv[2] if len(sys.argv) > 2 else None)
+            print(f"✅ Current model is now {version}")
+        else:
+            print("Usage: python src/model_store.py [list | rollback [version]]")
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+
+if __name__ == "__main__":
+    main()
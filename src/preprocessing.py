@@ -0,0 +1,92 @@
+import cv2
+import math
+import threading
+import numpy as np
+
+FACE_SIZE = (100, 100)  # Crop size fed to the recognizer at train and inference time
+CLAHE_CLIP_LIMIT = 2.0
+CLAHE_TILE_GRID = (8, 8)
+MAX_ALIGN_ANGLE = 30  # Degrees, larger eye-line tilts are treated as bad eye detections
+ALIGNMENT_REFRESH = 15  # Frames between eye re-detection within a track
+
+class FacePreprocessor:
+    """Normalize grayscale face crops identically for training and recognition.
+
+    Each crop is rotated so the eyes are level, resized to FACE_SIZE and
+    contrast-equalized with CLAHE. Eye detection is the expensive step, so
+    when a per-track state dict is passed the alignment angle is cached
+    there and only re-estimated every ALIGNMENT_REFRESH frames.
+
+    CLAHE and CascadeClassifier objects are not thread-safe, so each thread
+    gets its own, and one engine can serve several stream threads.
+    """
+
+    def __init__(self, face_size=FACE_SIZE, align=True):
+        self.face_size = face_size
+        self.align = align
+        self._local = threading.local()
+
+    @property
+    def clahe(self):
+        clahe = getattr(self._local, 'clahe', None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID)
+        return clahe
+
+    @property
+    def eye_cascade(self):
+        cascade = getattr(self._local, 'eye_cascade', None)
+        if cascade is None:
+            cascade = self._local.eye_cascade = cv2.CascadeClassifier(
+                cv2.data.haarcascades + 'haarcascade_eye.xml')
+        return cascade
+
+    def eye_angle(self, gray_face):
+        """Angle of the line through both eyes in degrees, or 0 if they are not found"""
+        height, width = gray_face.shape[:2]
+        upper = gray_face[:height // 2, :]
+        min_eye = max(width // 10, 5)
+        eyes = self.eye_cascade.detectMultiScale(upper, 1.1, 5, minSize=(min_eye, min_eye))
+        if len(eyes) < 2:
+            return 0.0
+
+        # Use the two largest detections, ordered left to right
+        eyes = sorted(sorted(eyes, key=lambda eye: eye[2] * eye[3], reverse=True)[:2], key=lambda eye: eye[0])
+        (lx, ly, lw, lh), (rx, ry, rw, rh) = eyes
+        dx = (rx + rw / 2) - (lx + lw / 2)
+        dy = (ry + rh / 2) - (ly + lh / 2)
+        if dx <= 0:
+            return 0.0
+        angle = math.degrees(math.atan2(dy, dx))
+        return angle if abs(angle) <= MAX_ALIGN_ANGLE else 0.0
+
+    def normalize(self, gray_face, state=None, pool=None):
+        """Align, resize and equalize a grayscale face crop.
+
+        With a camera.FramePool the intermediate and returned images live in
+        pooled buffers, so the result is only valid until the next call.
+        """
+        angle = 0.0
+        if self.align:
+            if state is None:
+                angle = self.eye_angle(gray_face)
+            else:
+                frames = state.get('align_frames', ALIGNMENT_REFRESH)
+                if 'align_angle' not in state or frames >= ALIGNMENT_REFRESH:
+                    state['align_angle'] = self.eye_angle(gray_face)
+                    frames = 0
+                state['align_frames'] = frames + 1
+                angle = state['align_angle']
+
+        if angle:
+            height, width = gray_face.shape[:2]
+            rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+            aligned = pool.get('aligned', (height, width)) if pool is not None else None
+            gray_face = cv2.warpAffine(gray_face, rotation, (width, height), dst=aligned,
+                                       borderMode=cv2.BORDER_REPLICATE)
+
+        if pool is None:
+            face = cv2.resize(gray_face, self.face_size)
+            return self.clahe.apply(np.ascontiguousarray(face))
+        face = pool.resize(gray_face, self.face_size, name='face')
+        return self.clahe.apply(face, dst=pool.get('face_equalized', face.shape))
@@ -0,0 +1,333 @@
+import cv2
+import os
+import queue
+import pickle
+import threading
+from datetime import datetime, timedelta
+from detectors import create_detector
+from preprocessing import FacePreprocessor
+from tracking import FaceTracker
+from camera import FramePool
+from model_store import store, MODEL_FILE, LABEL_MAP_FILE, THRESHOLDS_FILE
+
+# Pre-versioning model location, trained without alignment or CLAHE and never loaded
+LEGACY_MODEL_PATH = "data/trained_model.yml"
+CONFIDENCE_THRESHOLD = 100  # LBPH distance, lower is a closer match
+ATTENDANCE_COOLDOWN = 300  # Seconds between check-out updates for the same user
+RECOGNITION_ENGINE = os.getenv('RECOGNITION_ENGINE', 'lbph')
+MODEL_RELOAD_INTERVAL = 5  # Seconds between checks for a retrained model
+
+CHECK_IN = 'check_in'
+CHECK_OUT = 'check_out'
+
+def load_model_and_labels(model_path, label_map_path):
+    """Load the trained LBPH model and return it with a label -> user_id map"""
+    if not os.path.exists(model_path):
+        print("❌ No trained model found! Please train the model first.")
+        return None, None
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(model_path)
+
+    # Load the label mapping (user_id -> label) and invert it once for O(1) lookups
+    with open(label_map_path, 'rb') as f:
+        label_map = pickle.load(f)
+    id_map = {label: user_id for user_id, label in label_map.items()}
+    return recognizer, id_map
+
+def load_thresholds(thresholds_path):
+    """Load per-label distance thresholds calibrated by train_model.py, if present"""
+    if not os.path.exists(thresholds_path):
+        return {}
+    with open(thresholds_path, 'rb') as f:
+        return pickle.load(f)
+
+def model_version():
+    """Active model version from the model store"""
+    return store.current_version()
+
+def load_lbph_engine():
+    """Load the trained LBPH model, labels and thresholds into an engine"""
+    # Resolve the current version once so all files come from the same run
+    version = store.current_version()
+    if version is None:
+        if os.path.exists(LEGACY_MODEL_PATH):
+            # Its crops were neither aligned nor CLAHE-equalized, so it would misidentify live faces
+            print(f"❌ {LEGACY_MODEL_PATH} is an unversioned model from before face alignment and CLAHE "
+                  "and is not loaded. Retrain with: python src/train_model.py")
+        else:
+            print("❌ No trained model found! Please train the model first.")
+        return None
+    model_dir = store.version_dir(version)
+    recognizer, id_map = load_model_and_labels(
+        os.path.join(model_dir, MODEL_FILE),
+        os.path.join(model_dir, LABEL_MAP_FILE)
+    )
+    thresholds = load_thresholds(os.path.join(model_dir, THRESHOLDS_FILE))
+    if recognizer is None:
+        return None
+    return LBPHEngine(recognizer, id_map, thresholds, version=version)
+
+class AttendanceDebouncer:
+    """Per-user cache of the last mark that reached the writer.
+
+    The first sighting of a user on a given day is a check-in. Later
+    sightings are dropped until the cooldown has elapsed, after which one
+    check-out update is let through. The cache is cleared when the date
+    changes.
+    """
+
+    def __init__(self, cooldown=ATTENDANCE_COOLDOWN):
+        self.cooldown = timedelta(seconds=cooldown)
+        self.date = None
+        self.last_marked = {}
+
+    def check(self, user_id, timestamp):
+        """Return CHECK_IN, CHECK_OUT or None if the sighting should be suppressed"""
+        date = timestamp.date()
+        if date != self.date:
+            self.date = date
+            self.last_marked = {}
+
+        last = self.last_marked.get(user_id)
+        if last is None:
+            self.last_marked[user_id] = timestamp
+            return CHECK_IN
+        if timestamp - last >= self.cooldown:
+            self.last_marked[user_id] = timestamp
+            return CHECK_OUT
+        return None
+
+    def forget(self, user_id):
+        """Forget a user so their next sighting is a check-in again"""
+        self.last_marked.pop(user_id, None)
+
+class AttendanceSink:
+    """Non-blocking attendance writer.
+
+    Sightings are debounced in memory and only check-ins and cooled-down
+    check-outs are handed to a worker thread, so the capture loop never
+    waits on the database or the filesystem. writer(user_id, timestamp)
+    records check-ins, e.g. Database.mark_attendance, and the optional
+    checkout_writer(user_id, timestamp) records check-outs, e.g.
+    Database.mark_checkout. With details=True both writers are called as
+    writer(user_id, timestamp, confidence, camera_id), e.g. EventLog.append.
+    """
+
+    def __init__(self, writer, checkout_writer=None, debouncer=None, max_pending=1000, details=False):
+        self.writer = writer
+        self.checkout_writer = checkout_writer
+        self.details = details
+        self.debouncer = debouncer or AttendanceDebouncer()
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, user_id, timestamp=None, confidence=None, camera_id=0):
+        """Queue a mark for a recognized user, returning False if it was suppressed"""
+        timestamp = timestamp or datetime.now()
+        event = self.debouncer.check(user_id, timestamp)
+        if event is None or (event == CHECK_OUT and self.checkout_writer is None):
+            return False
+        try:
+            self.queue.put_nowait((user_id, timestamp, confidence, camera_id, event))
+        except queue.Full:
+            # Let a later sighting retry instead of blocking the frame loop
+            if event == CHECK_IN:
+                self.debouncer.forget(user_id)
+            print(f"⚠️ Attendance queue full, dropping mark for {user_id}")
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    break
+                user_id, timestamp, confidence, camera_id, event = item
+                writer = self.writer if event == CHECK_IN else self.checkout_writer
+                if self.details:
+                    writer(user_id, timestamp, confidence, camera_id)
+                else:
+                    writer(user_id, timestamp)
+            except Exception as e:
+                print(f"❌ Error writing attendance: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def close(self, timeout=None):
+        """Flush queued marks and stop the worker"""
+        self.queue.put(None)
+        self.worker.join(timeout)
+
+class LBPHEngine:
+    """Recognize normalized face crops with the trained LBPH model"""
+
+    def __init__(self, recognizer, id_map, thresholds=None, threshold=CONFIDENCE_THRESHOLD, version=None):
+        self.recognizer = recognizer
+        self.id_map = id_map
+        self.threshold = threshold
+        self.version = version
+        # Per-label thresholds override the global one where calibrated
+        self.thresholds = thresholds or {}
+        # Same crop normalization as training, with alignment cached per track
+        self.preprocessor = FacePreprocessor()
+
+    def identify(self, frame, gray, box, state, pool=None):
+        """Return (user_id, confidence) for a face box, user_id None if not recognized"""
+        x, y, w, h = box
+        face_roi = self.preprocessor.normalize(gray[y:y+h, x:x+w], state, pool)
+        label, confidence = self.recognizer.predict(face_roi)
+        user_id = self.id_map.get(label)
+        if user_id is not None and confidence < self.thresholds.get(label, self.threshold):
+            return user_id, confidence
+        return None, confidence
+
+def create_engine(name=None):
+    """Create the recognition engine selected by name or RECOGNITION_ENGINE (lbph or embedding)"""
+    name = name or RECOGNITION_ENGINE
+    if name == 'lbph':
+        return load_lbph_engine()
+    if name == 'embedding':
+        # Imported here so the LBPH path works without MongoDB or face_recognition
+        from database import db
+        from embedding_engine import EmbeddingEngine
+        engine = EmbeddingEngine(db.load_face_encodings, db.get_encodings_version)
+        engine.start_watching()
+        return engine
+    raise ValueError(f"Unknown recognition engine '{name}', choose from: lbph, embedding")
+
+class RecognitionPipeline:
+    """Detect, recognize and mark attendance for the faces in a frame"""
+
+    def __init__(self, engine, sink, detector=None, sessions=None, zone=None, camera_id=0):
+        self.engine = engine
+        self.sink = sink
+        self.sessions = sessions
+        self.zone = zone
+        # Passed to the sink with every mark, a number or stream name
+        self.camera_id = camera_id
+        # Same detector backend as enrollment and training unless overridden
+        self.detector = detector or create_detector()
+        # Tracks let engines cache per-face work across frames
+        self.tracker = FaceTracker()
+        # Gray, crop and resize buffers reused across frames of this stream
+        self.pool = FramePool()
+
+    def process_frame(self, frame, gray=None):
+        """Annotate a BGR frame in place and return (user_id, confidence, box) per face.
+
+        gray can be passed when the capture layer already produced it (see Camera.read).
+        """
+        # Read the engine once so a hot reload never changes it mid-frame
+        engine = self.engine
+        if gray is None:
+            gray = self.pool.gray(frame)
+        faces = self.detector.detect(frame, gray)
+        track_ids = self.tracker.update(faces)
+
+        results = []
+        for (x, y, w, h), track_id in zip(faces, track_ids):
+            user_id, confidence = engine.identify(
+                frame, gray, (x, y, w, h), self.tracker.state(track_id), self.pool
+            )
+
+            if user_id is not None:
+                now = datetime.now()
+                self.sink.submit(user_id, now, confidence, self.camera_id)
+                if self.sessions is not None:
+                    self.sessions.record(user_id, now, self.zone)
+                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                cv2.putText(frame, f'{user_id} - Present', (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            else:
+                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+                cv2.putText(frame, 'Unknown', (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+            results.append((user_id, confidence, (x, y, w, h)))
+
+        version = getattr(engine, 'version', None)
+        if version:
+            cv2.putText(frame, f'model {version}', (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+        return results
+
+class ModelReloader:
+    """Hot-swap retrained LBPH models into running pipelines.
+
+    A background thread polls model_version(), which follows the model
+    store's CURRENT pointer, so publishing or rolling back a version is
+    picked up automatically. A new version is only loaded once it has been
+    seen unchanged on two consecutive polls. The
+    new engine is built off the frame loop and installed with one attribute
+    assignment per pipeline, which takes effect from the next frame.
+    """
+
+    def __init__(self, pipelines, interval=MODEL_RELOAD_INTERVAL, version_probe=model_version,
+                 loader=load_lbph_engine):
+        self.pipelines = list(pipelines)
+        self.interval = interval
+        self.version_probe = version_probe
+        self.loader = loader
+        self.version = getattr(self.pipelines[0].engine, 'version', None) if self.pipelines else None
+        self.loaded_at = datetime.now()
+        self.reloads = 0
+        self.failures = 0
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Load and install a new model version if one is ready, returning True if swapped"""
+        version = self.version_probe()
+        if version is None or version == self.version:
+            self._pending = None
+            return False
+        if version != self._pending:
+            # Wait one more poll for the artifacts to settle
+            self._pending = version
+            return False
+
+        engine = self.loader()
+        if engine is None or self.version_probe() != version:
+            self.failures += 1
+            return False
+
+        for pipeline in self.pipelines:
+            pipeline.engine = engine
+        self.version = version
+        self.loaded_at = datetime.now()
+        self.reloads += 1
+        self._pending = None
+        print(f"🔄 Switched to model version {version}")
+        return True
+
+    def status(self):
+        """Active model version and reload counters"""
+        return {
+            'model_version': self.version,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'failures': self.failures
+        }
+
+    def start(self):
+        """Start polling for new models in the background"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.failures += 1
+                print(f"❌ Error reloading model: {str(e)}")
+
+    def stop(self):
+        """Stop the background polling thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
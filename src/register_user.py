@@ -1,11 +1,14 @@
 import cv2
-import dlib
 import os
 import uuid
 from dotenv import load_dotenv
 from datetime import datetime
 from pymongo import MongoClient
 import face_recognition  # Ensure you have this library installed
+from enrollment import BURST_FRAMES, score_face, select_diverse, save_samples
+from detectors import create_detector
+from camera_discovery import discovery
+import encoding_codec
 
 # Load environment variables
 load_dotenv()
@@ -16,23 +19,41 @@ client = MongoClient(database_url)
 db = client['attendance_system']  # Use your database name
 collection = db['employees']  # Use your collection name
 
-# Initialize video capture
-camera_found = False
-for i in range(3):
-    cap = cv2.VideoCapture(i)
-    if cap.isOpened():
-        camera_found = True
-        print(f"Camera opened successfully at index {i}.")
-        break
-    else:
-        print(f"Trying camera index {i}... Camera not found.")
-
-if not camera_found:
+# Initialize video capture, probing the first indices concurrently
+available = discovery.healthy(range(3))
+if not available:
     print("❌ Camera not found. Please check the connection and permissions.")
     exit(1)
+cap = cv2.VideoCapture(available[0])
+print(f"Camera opened successfully at index {available[0]}.")
 
-# Load the face detector
-detector = dlib.get_frontal_face_detector()
+# Load the face detector (the same backend training and the live loops use)
+detector = create_detector()
+
+def capture_burst(frames=BURST_FRAMES):
+    """Capture a burst of frames and score the single face found in each"""
+    candidates = []
+    best_frame = None
+    best_score = -1.0
+
+    for _ in range(frames):
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        faces = detector.detect(frame)
+        if len(faces) == 1:
+            candidate = score_face(frame, faces[0])
+            if candidate is not None:
+                candidates.append(candidate)
+                if candidate['score'] > best_score:
+                    best_score = candidate['score']
+                    best_frame = frame.copy()
+
+        cv2.imshow("Register User", frame)
+        cv2.waitKey(1)
+
+    return candidates, best_frame
 
 def register_user():
     employee_name = input("Enter employee's full name: ")
@@ -49,23 +70,29 @@ def register_user():
             print("❌ Failed to capture image from camera.")
             break
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = detector(gray)
-        for face in faces:
-            cv2.rectangle(frame, (face.left(), face.top()), (face.right(), face.bottom()), (255, 0, 0), 2)
-            cv2.putText(frame, employee_name, (face.left(), face.top() - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+        faces = detector.detect(frame)
+        for (x, y, w, h) in faces:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+            cv2.putText(frame, employee_name, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
 
         cv2.imshow("Register User", frame)
 
         key = cv2.waitKey(1)
-        if key == 32:  # Press space to confirm registration
-            print("User registered!")
+        if key == 32:  # Press space to start the enrollment burst
+            print("📸 Capturing samples, keep looking at the camera and turn your head slightly...")
+            candidates, best_frame = capture_burst()
+            samples = select_diverse(candidates)
+            if not samples:
+                print("No usable face samples captured. Registration failed.")
+                break
 
-            img_path = f"images/registered/{employee_name.replace(' ', '_')}.jpg"
-            cv2.imwrite(img_path, frame)
+            # Keep the best, most varied crops in a per-user directory for training
+            user_dir = os.path.join("images/registered", employee_name.replace(' ', '_'))
+            sample_paths = save_samples(user_dir, samples)
+            print(f"User registered with {len(sample_paths)} face samples in {user_dir}")
 
-            # Generate face encoding
-            face_image = face_recognition.load_image_file(img_path)
+            # Generate face encoding from the best scoring frame
+            face_image = cv2.cvtColor(best_frame, cv2.COLOR_BGR2RGB)
             face_encodings = face_recognition.face_encodings(face_image)
             if not face_encodings:
                 print("No face encodings found. Registration failed.")
@@ -80,8 +107,9 @@ def register_user():
                 "name": employee_name,
                 "employee_id": employee_id,
                 "attendance_time": attendance_time,
-                "image_path": img_path,
-                "face_encoding": face_encoding.tolist()  # Convert to list for MongoDB
+                "image_path": user_dir,
+                "sample_paths": sample_paths,
+                "face_encoding": encoding_codec.encode(face_encoding)  # Raw float32 with a shape header
             }
             try:
                 result = collection.insert_one(employee_data)
@@ -106,6 +134,6 @@ def register_user():
 if __name__ == "__main__":
     print("\n📸 Instructions:")
     print("1. Position your face in front of the camera.")
-    print("2. Press 'space' to capture when ready.")
+    print("2. Press 'space' to start capturing samples when ready.")
     print("3. Press 'q' to cancel.\n")
     register_user()
\ No newline at end of file
@@ -0,0 +1,94 @@
+import os
+import json
+import shutil
+import hashlib
+
+CACHE_DIR = "reports/cache"
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # 256 MB
+
+class ReportCache:
+    """On-disk cache of generated report files with LRU size-bounded eviction.
+
+    Entries are keyed by the report query (format, date range, user) plus a
+    data version, so a report is only reused while the underlying attendance
+    data is unchanged. The file modification time doubles as the LRU clock,
+    which keeps the cache safe to share between processes without an index.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(extension, start_date=None, end_date=None, user_id=None, data_version=None):
+        """Build a cache key from the report query and data version"""
+        payload = json.dumps(
+            [extension, start_date, end_date, user_id, data_version],
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key, extension):
+        return os.path.join(self.cache_dir, f"{key}.{extension}")
+
+    def get(self, key, extension):
+        """Return the cached report path for a key, or None on a miss"""
+        path = self._path(key, extension)
+        if not os.path.exists(path):
+            return None
+        try:
+            # Touch the entry so it counts as recently used
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key, extension, source_path):
+        """Copy a generated report into the cache and evict old entries"""
+        path = self._path(key, extension)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"❌ Error caching report: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        self.evict()
+        return path
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+        return total
+
+    def clear(self):
+        """Remove every cached report"""
+        for name in os.listdir(self.cache_dir):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
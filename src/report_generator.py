@@ -2,6 +2,7 @@ import os
 from datetime import datetime, timedelta
 import pandas as pd
 from database import db
+from report_cache import ReportCache
 from fpdf import FPDF
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -10,10 +11,17 @@ class ReportGenerator:
     def __init__(self):
         self.reports_dir = "reports"
         os.makedirs(self.reports_dir, exist_ok=True)
+        self.cache = ReportCache(os.path.join(self.reports_dir, 'cache'))
 
     def generate_csv_report(self, start_date=None, end_date=None, user_id=None):
         """Generate CSV report for attendance records"""
         try:
+            # Serve unchanged periods straight from the cache
+            cache_key, cached_path = self._get_cached_report("csv", start_date, end_date, user_id)
+            if cached_path:
+                print(f"✅ CSV report served from cache: {cached_path}")
+                return cached_path
+
             # Get attendance records
             records = self._get_attendance_records(start_date, end_date, user_id)
             
@@ -22,7 +30,7 @@ class ReportGenerator:
                 return None
             
             # Convert to DataFrame
-            df = pd.DataFrame(records)
+            df = self._to_dataframe(records)
             
             # Generate filename
             filename = self._generate_filename("csv", start_date, end_date, user_id)
@@ -30,6 +38,7 @@ class ReportGenerator:
             
             # Save to CSV
             df.to_csv(filepath, index=False)
+            self._cache_report(cache_key, "csv", filepath)
             print(f"✅ CSV report generated: {filepath}")
             return filepath
             
@@ -40,6 +49,12 @@ class ReportGenerator:
     def generate_excel_report(self, start_date=None, end_date=None, user_id=None):
         """Generate Excel report with attendance records and statistics"""
         try:
+            # Serve unchanged periods straight from the cache
+            cache_key, cached_path = self._get_cached_report("xlsx", start_date, end_date, user_id)
+            if cached_path:
+                print(f"✅ Excel report served from cache: {cached_path}")
+                return cached_path
+
             # Get attendance records
             records = self._get_attendance_records(start_date, end_date, user_id)
             
@@ -48,7 +63,7 @@ class ReportGenerator:
                 return None
             
             # Convert to DataFrame
-            df = pd.DataFrame(records)
+            df = self._to_dataframe(records)
             
             # Generate filename
             filename = self._generate_filename("xlsx", start_date, end_date, user_id)
@@ -67,6 +82,7 @@ class ReportGenerator:
                 daily_summary = self._generate_daily_summary(df)
                 daily_summary.to_excel(writer, sheet_name='Daily Summary', index=True)
             
+            self._cache_report(cache_key, "xlsx", filepath)
             print(f"✅ Excel report generated: {filepath}")
             return filepath
             
@@ -77,6 +93,12 @@ class ReportGenerator:
     def generate_pdf_report(self, start_date=None, end_date=None, user_id=None):
         """Generate PDF report with attendance records and visualizations"""
         try:
+            # Serve unchanged periods straight from the cache
+            cache_key, cached_path = self._get_cached_report("pdf", start_date, end_date, user_id)
+            if cached_path:
+                print(f"✅ PDF report served from cache: {cached_path}")
+                return cached_path
+
             # Get attendance records
             records = self._get_attendance_records(start_date, end_date, user_id)
             
@@ -85,7 +107,7 @@ class ReportGenerator:
                 return None
             
             # Convert to DataFrame
-            df = pd.DataFrame(records)
+            df = self._to_dataframe(records)
             
             # Generate filename
             filename = self._generate_filename("pdf", start_date, end_date, user_id)
@@ -127,11 +149,12 @@ class ReportGenerator:
             
             # Add table headers
             pdf.set_font('Arial', 'B', 12)
-            col_width = pdf.w / 4.5
+            col_width = pdf.w / 5.5
             pdf.cell(col_width, 10, 'Date', 1, 0, 'C')
             pdf.cell(col_width, 10, 'Time', 1, 0, 'C')
             pdf.cell(col_width, 10, 'User ID', 1, 0, 'C')
-            pdf.cell(col_width, 10, 'Name', 1, 1, 'C')
+            pdf.cell(col_width, 10, 'Name', 1, 0, 'C')
+            pdf.cell(col_width, 10, 'Hours', 1, 1, 'C')
             
             # Add table data
             pdf.set_font('Arial', '', 12)
@@ -139,10 +162,12 @@ class ReportGenerator:
                 pdf.cell(col_width, 10, str(row['date']), 1, 0, 'C')
                 pdf.cell(col_width, 10, str(row['time']), 1, 0, 'C')
                 pdf.cell(col_width, 10, str(row['user_id']), 1, 0, 'C')
-                pdf.cell(col_width, 10, str(row['name']), 1, 1, 'C')
+                pdf.cell(col_width, 10, str(row['name']), 1, 0, 'C')
+                pdf.cell(col_width, 10, '' if pd.isna(row['hours']) else str(row['hours']), 1, 1, 'C')
             
             # Save PDF
             pdf.output(filepath)
+            self._cache_report(cache_key, "pdf", filepath)
             print(f"✅ PDF report generated: {filepath}")
             return filepath
             
@@ -150,6 +175,19 @@ class ReportGenerator:
             print(f"❌ Error generating PDF report: {str(e)}")
             return None
 
+    def _get_cached_report(self, extension, start_date=None, end_date=None, user_id=None):
+        """Look up a cached report for the query at the current data version"""
+        data_version = db.get_data_version(start_date, end_date, user_id)
+        if data_version is None:
+            return None, None
+        cache_key = self.cache.make_key(extension, start_date, end_date, user_id, data_version)
+        return cache_key, self.cache.get(cache_key, extension)
+
+    def _cache_report(self, cache_key, extension, filepath):
+        """Store a freshly generated report in the cache"""
+        if cache_key is not None:
+            self.cache.put(cache_key, extension, filepath)
+
     def _get_attendance_records(self, start_date=None, end_date=None, user_id=None):
         """Get attendance records based on date range or user_id"""
         try:
@@ -167,6 +205,16 @@ class ReportGenerator:
             print(f"❌ Error retrieving attendance records: {str(e)}")
             return []
 
+    def _to_dataframe(self, records):
+        """Build the report DataFrame, deriving hours on site from first/last sightings"""
+        df = pd.DataFrame(records)
+        if 'first_seen' in df and 'last_seen' in df:
+            duration = pd.to_datetime(df['last_seen']) - pd.to_datetime(df['first_seen'])
+            df['hours'] = (duration.dt.total_seconds() / 3600).round(2)
+        else:
+            df['hours'] = float('nan')
+        return df
+
     def _generate_statistics(self, df):
         """Generate statistics from attendance records"""
         stats = {
@@ -174,7 +222,8 @@ class ReportGenerator:
             'Unique Users': df['user_id'].nunique(),
             'Date Range': f"{df['date'].min()} to {df['date'].max()}",
             'Most Active User': df['user_id'].mode().iloc[0] if not df.empty else 'N/A',
-            'Average Daily Attendance': round(len(df) / df['date'].nunique(), 2) if not df.empty else 0
+            'Average Daily Attendance': round(len(df) / df['date'].nunique(), 2) if not df.empty else 0,
+            'Average Hours On Site': round(df['hours'].mean(), 2) if df['hours'].notna().any() else 'N/A'
         }
         return pd.DataFrame(list(stats.items()), columns=['Statistic', 'Value'])
 
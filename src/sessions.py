@@ -0,0 +1,113 @@
+import threading
+from datetime import datetime
+
+FLUSH_INTERVAL = 30  # Seconds between session flushes to the database
+
+class SessionTable:
+    """In-memory first-seen/last-seen per user per day, optionally per zone.
+
+    Every recognized sighting updates the table in memory. A background
+    thread periodically hands the sessions that changed since the last flush
+    to flush_writer, e.g. Database.upsert_sessions, which applies them as
+    $min/$max upserts. flush_writer must return True on success; failed
+    sessions are kept dirty and retried on the next flush, which is safe
+    because $min/$max updates are idempotent.
+    """
+
+    def __init__(self, flush_writer, flush_interval=FLUSH_INTERVAL):
+        self.flush_writer = flush_writer
+        self.flush_interval = flush_interval
+        self.sessions = {}
+        self.dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, timestamp=None, zone=None):
+        """Record a sighting of a user"""
+        timestamp = timestamp or datetime.now()
+        key = (timestamp.strftime("%Y-%m-%d"), user_id)
+        with self._lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = {
+                    'date': key[0],
+                    'user_id': user_id,
+                    'first_seen': timestamp,
+                    'last_seen': timestamp,
+                    'zones': {}
+                }
+                self.sessions[key] = session
+            else:
+                session['first_seen'] = min(session['first_seen'], timestamp)
+                session['last_seen'] = max(session['last_seen'], timestamp)
+
+            if zone is not None:
+                # Zone names become MongoDB field names, which cannot contain dots
+                zone = str(zone).replace('.', '_')
+                zone_session = session['zones'].get(zone)
+                if zone_session is None:
+                    session['zones'][zone] = {'first_seen': timestamp, 'last_seen': timestamp}
+                else:
+                    zone_session['first_seen'] = min(zone_session['first_seen'], timestamp)
+                    zone_session['last_seen'] = max(zone_session['last_seen'], timestamp)
+
+            self.dirty.add(key)
+
+    def get(self, user_id, date=None):
+        """Return the in-memory session for a user on a date (default today)"""
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            session = self.sessions.get((date, user_id))
+            return dict(session) if session else None
+
+    def flush(self):
+        """Write sessions changed since the last flush, returning how many were sent"""
+        with self._lock:
+            keys = list(self.dirty)
+            batch = [
+                dict(self.sessions[key], zones={
+                    zone: dict(zone_session)
+                    for zone, zone_session in self.sessions[key]['zones'].items()
+                })
+                for key in keys
+            ]
+            self.dirty = set()
+
+        if not batch:
+            return 0
+
+        if not self.flush_writer(batch):
+            with self._lock:
+                self.dirty.update(keys)
+            return 0
+
+        # Sessions from earlier days are final once flushed
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            for key in [key for key in self.sessions if key[0] < today and key not in self.dirty]:
+                del self.sessions[key]
+        return len(batch)
+
+    def start(self):
+        """Start flushing in the background every flush_interval seconds"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Error flushing sessions: {str(e)}")
+
+    def stop(self):
+        """Stop the background thread and flush what is left"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -0,0 +1,324 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+import numpy as np
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+SCRATCH_DATABASE = 'attendance_smoke'
+
+# name -> function returning [(description, passed), ...], in run order
+CHECKS = {}
+
+def check(name):
+    def register(function):
+        CHECKS[name] = function
+        return function
+    return register
+
+def scratch_database():
+    """A Database on an emptied scratch database with its own journal"""
+    from db_client import create_client, AttendanceJournal
+    from database import Database
+    client = create_client()
+    client.drop_database(SCRATCH_DATABASE)
+    journal_path = os.path.join(tempfile.mkdtemp(prefix='smoke_journal_'), 'journal.jsonl')
+    return Database(client, AttendanceJournal(journal_path), name=SCRATCH_DATABASE)
+
+@check('employee-attendance')
+def check_employee_attendance():
+    """An employee enrolled by register_user.py is matched and gets an attendance record"""
+    import encoding_codec
+    database = scratch_database()
+    rng = np.random.default_rng(0)
+    encoding = rng.normal(0, 0.1, 128).astype(np.float32)
+    database.employees.insert_one({'name': 'Test Employee', 'employee_id': 'EMP-1',
+                                   'face_encoding': encoding_codec.encode(encoding)})
+    database.employees.insert_one({'name': 'Corrupt', 'employee_id': 'EMP-2',
+                                   'face_encoding': encoding_codec.MAGIC + b'<f4\x01\xff'})
+
+    user_ids, matrix = database.load_face_encodings()
+    # The embedding engine's match: nearest stored encoding
+    nearest = user_ids[int(np.argmin(np.linalg.norm(matrix - encoding, axis=1)))] if user_ids else None
+    marked = database.mark_attendance(nearest, datetime.now())
+    record = database.attendance.find_one({'user_id': 'EMP-1'})
+    return [
+        ("corrupt encoding skipped, valid one loaded", user_ids == ['EMP-1']),
+        ("employee matched by encoding", nearest == 'EMP-1'),
+        ("employee-only match marked", marked),
+        ("attendance record carries the employee name", bool(record) and record.get('name') == 'Test Employee'),
+    ]
+
+@check('journal-replay')
+def check_journal_replay():
+    """Marks during an outage are journaled without waiting on MongoDB and replayed, bad ones rejected"""
+    from pymongo.errors import ServerSelectionTimeoutError, OperationFailure
+    database = scratch_database()
+    for user_id in ('u1', 'u2'):
+        database.users.insert_one({'user_id': user_id, 'name': user_id})
+
+    # MongoDB goes away: every query fails server selection
+    users_find = database.users.find
+    attempts = []
+    def unreachable(*args, **kwargs):
+        attempts.append(args)
+        raise ServerSelectionTimeoutError("no servers")
+    database.users.find = unreachable
+    database.mark_attendance('u1', datetime(2024, 1, 1, 9))
+    first_attempts = len(attempts)
+    started = time.perf_counter()
+    database.mark_attendance('u2', datetime(2024, 1, 1, 9))
+    database.mark_attendance('u1', datetime(2024, 1, 2, 9))
+    outage_seconds = time.perf_counter() - started
+    skipped = len(attempts) == first_attempts
+    with open(database.journal.path, 'a') as f:
+        f.write('{"user_id": "u1", "timest\n')
+
+    # Back online, except that u2's mark fails for a reason retrying cannot fix
+    database.users.find = users_find
+    insert_one = database.attendance.insert_one
+    def insert_failing_u2(document, *args, **kwargs):
+        if document['user_id'] == 'u2':
+            raise OperationFailure("document failed validation")
+        return insert_one(document, *args, **kwargs)
+    database.attendance.insert_one = insert_failing_u2
+    database._offline_until = 1  # Let the next mark probe
+    database.mark_attendance('u1', datetime(2024, 1, 3, 9))
+    database.attendance.insert_one = insert_one
+
+    with open(database.journal.rejected_path) as f:
+        rejected = f.read().splitlines()
+    return [
+        ("later marks skip MongoDB during the outage", skipped and outage_seconds < 0.5),
+        ("good marks replayed", database.attendance.count_documents({'user_id': 'u1'}) == 3),
+        ("journal emptied", not database.journal.has_pending()),
+        ("failed and unreadable entries rejected", len(rejected) == 2),
+    ]
+
+@check('alias-merge')
+def check_alias_merge():
+    """A merge that fails part way leaves a marker and resume_merges() finishes it"""
+    database = scratch_database()
+    for user_id in ('Gopi', 'Gopi2'):
+        database.users.insert_one({'user_id': user_id, 'name': user_id})
+    for day in range(1, 4):
+        database.mark_attendance('Gopi2', datetime(2024, 1, day, 9))
+    database.mark_attendance('Gopi', datetime(2024, 1, 1, 8))
+
+    # The connection drops after the first alias record has moved
+    attendance = database.attendance
+    delete_one = attendance.delete_one
+    deletes = []
+    def failing_delete_one(*args, **kwargs):
+        deletes.append(args)
+        if len(deletes) > 1:
+            raise ConnectionError("connection reset")
+        return delete_one(*args, **kwargs)
+    attendance.delete_one = failing_delete_one
+    database.merge_user('Gopi2', 'Gopi')
+    attendance.delete_one = delete_one
+    marker = database.users.find_one({'user_id': 'Gopi2'}) or {}
+
+    moved = database.resume_merges()
+    first = database.attendance.find_one({'user_id': 'Gopi', 'date': '2024-01-01'}) or {}
+    return [
+        ("interrupted merge is marked", marker.get('merged_into') == 'Gopi'),
+        ("resume moves the remaining records", moved == 2),
+        ("no attendance left under the alias", database.attendance.count_documents({'user_id': 'Gopi2'}) == 0),
+        ("one record per day for the user", database.attendance.count_documents({'user_id': 'Gopi'}) == 3),
+        ("earliest check-in kept", first.get('time') == '08:00:00'),
+        ("alias user removed and recorded", database.users.find_one({'user_id': 'Gopi2'}) is None
+         and database.users.find_one({'user_id': 'Gopi'}).get('aliases') == ['Gopi2']),
+    ]
+
+@check('archive')
+def check_archive():
+    """Archiving keeps sightings written during the move and reads still see every month"""
+    database = scratch_database()
+    for user_id in ('u1', 'u2'):
+        database.users.insert_one({'user_id': user_id, 'name': user_id})
+    database.mark_attendance('u1', datetime(2024, 1, 5, 9))
+    database.mark_attendance('u2', datetime(2024, 1, 6, 9))
+    today = datetime.now().replace(microsecond=0)
+    database.mark_attendance('u1', today)
+
+    # A check-out lands in hot after the copy, before the month is registered
+    copy_to_archive = database._copy_to_archive
+    def copy_then_checkout(archive, records):
+        copy_to_archive(archive, records)
+        database.mark_checkout('u1', datetime(2024, 1, 5, 18))
+    database._copy_to_archive = copy_then_checkout
+    # While draining, writes for the month go to the archive
+    move_to_archive = database._move_to_archive
+    def write_then_move(archive, records):
+        database._move_to_archive = move_to_archive
+        database.upsert_sessions([{'user_id': 'u2', 'date': '2024-01-06', 'zones': {},
+                                   'first_seen': datetime(2024, 1, 6, 7), 'last_seen': datetime(2024, 1, 6, 7)}])
+        database.mark_attendance('u1', datetime(2024, 1, 7, 9))
+        return move_to_archive(archive, records)
+    database._move_to_archive = write_then_move
+    archived = database.archive_old_attendance()
+    database._copy_to_archive = copy_to_archive
+
+    archive = database.db[database.partitions.find_one({'period': '2024-01'})['collection']]
+    checked_out = archive.find_one({'user_id': 'u1', 'date': '2024-01-05'}) or {}
+    early = archive.find_one({'user_id': 'u2', 'date': '2024-01-06'}) or {}
+    listed = database.get_attendance_range('2024-01-01', today.strftime("%Y-%m-%d")) or []
+    summary = database.get_attendance_summary() or []
+    return [
+        ("old month moved out of hot", archived == 2
+         and database.attendance.count_documents({'date': {'$lt': '2024-02-01'}}) == 0),
+        ("check-out written during the copy kept", checked_out.get('last_seen') == datetime(2024, 1, 5, 18)),
+        ("sighting written while draining kept", early.get('first_seen') == datetime(2024, 1, 6, 7)
+         and early.get('last_seen') == datetime(2024, 1, 6, 9)),
+        ("mark while draining goes to the archive", archive.count_documents({'date': '2024-01-07'}) == 1),
+        ("month no longer draining", database.partitions.find_one({'period': '2024-01'}).get('draining') is None),
+        ("range reads span hot and archive, newest first",
+         [record['date'] for record in listed] == [today.strftime("%Y-%m-%d"), '2024-01-07', '2024-01-06', '2024-01-05']),
+        ("summary covers archived days", len(summary) == 4),
+        ("user history spans partitions", len(database.get_user_attendance('u1') or []) == 3),
+    ]
+
+class FakeWorker:
+    """Speaks the cluster protocol over a raw socket and records its assignments"""
+
+    def __init__(self, port, worker_id, capacity):
+        self.worker_id = worker_id
+        self.streams = None
+        self.connection = socket.create_connection(('127.0.0.1', port))
+        self.rfile = self.connection.makefile('rb')
+        self.beating = threading.Event()
+        self.beating.set()
+        self._send({'type': 'hello', 'worker_id': worker_id, 'capacity': capacity})
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+        threading.Thread(target=self._heartbeats, daemon=True).start()
+
+    def _send(self, message):
+        self.connection.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+    def _read(self):
+        try:
+            for line in self.rfile:
+                message = json.loads(line)
+                if message.get('type') == 'assign':
+                    self.streams = sorted(message['streams'])
+        except (OSError, ValueError):
+            pass
+
+    def _heartbeats(self):
+        while self.beating.wait():
+            try:
+                self._send({'type': 'heartbeat', 'fps': {}})
+            except OSError:
+                return
+            time.sleep(0.2)
+
+    def close(self):
+        self.beating.clear()
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.connection.close()
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+@check('cluster-failover')
+def check_cluster_failover():
+    """A late worker takes a share of the streams and gets them all back when the other one dies"""
+    from cluster import Coordinator
+    streams = [f'synthetic:{index}' for index in range(4)]
+    coordinator = Coordinator(streams, heartbeat_timeout=1.5)
+    threading.Thread(target=coordinator.serve, args=('127.0.0.1', 0, 3600), daemon=True).start()
+    wait_for(lambda: coordinator._server is not None)
+    port = coordinator._server.server_address[1]
+    workers = []
+    try:
+        first = FakeWorker(port, 'worker-a', 100)
+        workers.append(first)
+        first_took_all = wait_for(lambda: first.streams == streams)
+        second = FakeWorker(port, 'worker-b', 100)
+        workers.append(second)
+        spread = wait_for(lambda: second.streams and first.streams and len(second.streams) == 2
+                          and sorted(first.streams + second.streams) == streams)
+
+        # A hung worker: connection open, heartbeats stopped
+        second.beating.clear()
+        reaped = wait_for(lambda: 'worker-b' not in coordinator.status())
+        survived = wait_for(lambda: first.streams == streams)
+        # The survivor dies too; streams wait for the next worker
+        first.close()
+        released = wait_for(lambda: not coordinator.assignments)
+        third = FakeWorker(port, 'worker-c', 100)
+        workers.append(third)
+        replaced = wait_for(lambda: third.streams == streams)
+
+        # It reconnects under its own id before its old connection is noticed as dead
+        third.beating.clear()
+        rejoined = FakeWorker(port, 'worker-c', 100)
+        workers.append(rejoined)
+        kept = wait_for(lambda: rejoined.streams == streams)
+        old_closed = wait_for(lambda: not third.reader.is_alive())
+        time.sleep(0.3)  # Let the old connection's handler finish
+        still_running = sorted(coordinator.status().get('worker-c', {}).get('streams', {})) == streams
+    finally:
+        for worker in workers:
+            worker.close()
+        coordinator.stop()
+    return [
+        ("first worker runs every stream", first_took_all),
+        ("late worker gets an even share", bool(spread)),
+        ("worker without heartbeats is reaped", reaped),
+        ("survivor takes over its streams", survived),
+        ("disconnected worker releases its streams", released),
+        ("new worker picks up orphaned streams", replaced),
+        ("rejoining worker keeps its streams", kept),
+        ("rejoin closes the old connection without dropping the worker", old_closed and still_running),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Scripted end-to-end checks against an in-memory MongoDB")
+    parser.add_argument('checks', nargs='*', help=f"Checks to run (default all): {', '.join(CHECKS)}")
+    args = parser.parse_args()
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    if mongomock is None:
+        print("❌ mongomock is not installed: pip install mongomock")
+        sys.exit(2)
+
+    passed = True
+    # Every MongoClient created from here on is served in memory
+    with mongomock.patch(servers=(), on_new='create'):
+        for name in args.checks or list(CHECKS):
+            print(f"\n🔄 {name}")
+            try:
+                results = CHECKS[name]()
+            except Exception as e:
+                results = [(f"ran without error ({str(e)})", False)]
+            for description, ok in results:
+                print(f"{'✅' if ok else '❌'} {description}")
+                passed = passed and ok
+
+    print(f"\n{'✅ All checks passed' if passed else '❌ Some checks failed'}")
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+from collections import Counter, deque
+from datetime import datetime
+import cv2
+import numpy as np
+from camera import Camera, SYNTHETIC_DATASET_DIR, SYNTHETIC_FRAME_SIZE
+from recognition import create_engine, AttendanceSink, RecognitionPipeline
+from identities import IdentityResolver, IMAGE_EXTENSIONS
+from benchmark_memory import rss_bytes
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+SOAK_DATABASE = 'attendance_soak'
+DWELL_FRAMES = 40  # Frames each synthetic visitor stays in view
+RSS_GROWTH_LIMIT = 64  # MiB the process may grow after warm-up
+P99_LATENCY_LIMIT = 400  # Milliseconds per frame through detect and recognize, with headroom for scheduler jitter
+MIN_FPS_RATIO = 0.8  # Fraction of the requested frame rate that must be sustained
+
+class _Pacer:
+    # Sleeps like a live camera delivering fps frames per second, no-op when fps is None
+    def __init__(self, fps):
+        self.fps = fps
+        self._next_frame = time.monotonic()
+
+    def wait(self):
+        if not self.fps:
+            return
+        delay = self._next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame = max(self._next_frame, time.monotonic() - 1) + 1.0 / self.fps
+
+class CompositeCapture:
+    """Synthetic camera showing registered people walking past.
+
+    Each visitor is a registered photo scaled to a random size and pasted
+    onto this camera's background, drifting a few pixels per frame. A new
+    visitor appears every dwell frames. The identity in each frame read is
+    queued on identities, so whoever consumes the frames can pop the one
+    that belongs to the frame it is checking.
+    """
+
+    def __init__(self, photos, background, fps=None, dwell=DWELL_FRAMES, seed=0):
+        self.photos = photos
+        self.background = background
+        self.dwell = dwell
+        self.random = random.Random(seed)
+        self.pacer = _Pacer(fps)
+        self.fps = fps
+        self.index = 0
+        self.identities = deque()
+        self._visitor = None
+
+    def isOpened(self):
+        return bool(self.photos)
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        return float(self.fps or 0) if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def _next_visitor(self):
+        user_id, photo = self.random.choice(self.photos)
+        frame_height, frame_width = self.background.shape[:2]
+        height = int(frame_height * self.random.uniform(0.5, 0.8))
+        width = min(int(photo.shape[1] * height / photo.shape[0]), frame_width)
+        image = cv2.resize(photo, (width, height), interpolation=cv2.INTER_AREA)
+        x = self.random.randint(0, frame_width - width)
+        y = self.random.randint(0, frame_height - height)
+        dx, dy = self.random.choice((-2, -1, 1, 2)), self.random.choice((-1, 0, 1))
+        self._visitor = (user_id, image, x, y, dx, dy)
+
+    def read(self, image=None):
+        if not self.photos:
+            return False, image
+        self.pacer.wait()
+        if self.index % self.dwell == 0:
+            self._next_visitor()
+        user_id, photo, x, y, dx, dy = self._visitor
+        step = self.index % self.dwell
+        self.index += 1
+
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        np.copyto(image, self.background)
+        height, width = photo.shape[:2]
+        x = int(np.clip(x + dx * step, 0, image.shape[1] - width))
+        y = int(np.clip(y + dy * step, 0, image.shape[0] - height))
+        image[y:y+height, x:x+width] = photo
+        self.identities.append(user_id)
+        return True, image
+
+    def release(self):
+        self.photos = []
+
+class LoopedCapture:
+    """A video file replayed forever at a live camera's pace"""
+
+    def __init__(self, path, fps=None):
+        self.cap = cv2.VideoCapture(path)
+        self.pacer = _Pacer(fps or self.cap.get(cv2.CAP_PROP_FPS) or 25.0)
+        # Nobody known is shown, so recognitions are not checked
+        self.identities = deque()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def read(self, image=None):
+        self.pacer.wait()
+        ret, image = self.cap.read(image)
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, image = self.cap.read(image)
+        return ret, image
+
+    def release(self):
+        self.cap.release()
+
+def load_photos(dataset_dir=SYNTHETIC_DATASET_DIR):
+    """(user_id, image) for every registered photo, including per-user sample directories"""
+    resolver = IdentityResolver.load()
+    photos = []
+    for entry in sorted(os.listdir(dataset_dir)):
+        entry_path = os.path.join(dataset_dir, entry)
+        paths = [entry_path]
+        if os.path.isdir(entry_path):
+            paths = [os.path.join(entry_path, name) for name in sorted(os.listdir(entry_path))]
+        for path in paths:
+            if path.endswith(IMAGE_EXTENSIONS):
+                image = cv2.imread(path)
+                if image is not None:
+                    photos.append((resolver.user_id_for(entry), image))
+    return photos
+
+def make_background(seed, frame_size=SYNTHETIC_FRAME_SIZE, backgrounds=None):
+    """A background image from the given files, or a noisy gradient when there are none"""
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    if backgrounds:
+        image = cv2.imread(backgrounds[seed % len(backgrounds)])
+        if image is not None:
+            return cv2.resize(image, frame_size)
+    low, high = rng.integers(0, 256, size=(2, 3))
+    ramp = np.linspace(0, 1, width)[None, :, None]
+    image = low + (high - low) * ramp + rng.normal(0, 8, size=(height, width, 3))
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed latency histogram, so hours of samples take constant memory"""
+
+    BOUNDS = np.geomspace(1e-4, 10.0, 256)  # Seconds
+
+    def __init__(self):
+        self.counts = np.zeros(len(self.BOUNDS) + 1, dtype=np.int64)
+
+    def add(self, seconds):
+        self.counts[np.searchsorted(self.BOUNDS, seconds)] += 1
+
+    def merge(self, others):
+        for other in others:
+            self.counts += other.counts
+        return self
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile, in seconds"""
+        if not self.total:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), self.total * q / 100.0))
+        return float(self.BOUNDS[min(index, len(self.BOUNDS) - 1)])
+
+class MarkRecorder:
+    """Wraps Database.mark_attendance to time it and count accepted check-ins per user and day"""
+
+    def __init__(self, database):
+        self.database = database
+        self.latency = LatencyHistogram()
+        self.accepted = Counter()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def mark(self, user_id, timestamp):
+        started = time.perf_counter()
+        marked = self.database.mark_attendance(user_id, timestamp)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latency.add(elapsed)
+            self.calls += 1
+            if marked:
+                self.accepted[(timestamp.strftime("%Y-%m-%d"), user_id)] += 1
+        return marked
+
+class SoakRunner:
+    """One synthetic camera running the live pipeline on its own thread.
+
+    Each camera has its own sink, as separate processes or hosts would, so
+    the database's unique index is what keeps marks from being duplicated.
+    The engine is shared like on a cluster worker; its detector and
+    preprocessing state are per thread.
+    """
+
+    def __init__(self, name, capture, engine, database, recorder):
+        self.camera = Camera(name, luma=False, capture_factory=lambda _: capture)
+        self.capture = capture
+        self.sink = AttendanceSink(recorder.mark, database.mark_checkout)
+        self.pipeline = RecognitionPipeline(engine, self.sink)
+        self.latency = LatencyHistogram()
+        self.frames = 0
+        self.recognized = 0
+        self.misidentified = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.camera.start()
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                frame, gray = self.camera.read()
+                if frame is None:
+                    raise RuntimeError(f"{self.camera.camera_id} stopped delivering frames")
+                identities = self.capture.identities
+                shown = identities.popleft() if identities else None
+                started = time.perf_counter()
+                results = self.pipeline.process_frame(frame, gray)
+                self.latency.add(time.perf_counter() - started)
+                self.frames += 1
+                for user_id, _, _ in results:
+                    if user_id is None:
+                        continue
+                    self.recognized += 1
+                    if shown is not None and user_id != shown:
+                        self.misidentified += 1
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ {self.camera.camera_id} failed: {self.error}")
+
+    def reset_counters(self):
+        """Start measuring afresh, e.g. once warm-up is over"""
+        self.latency = LatencyHistogram()
+        self.frames = self.recognized = self.misidentified = 0
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sink.close()
+        self.camera.stop()
+
+def find_duplicates(database):
+    """(date, user_id) pairs with more than one attendance record"""
+    return list(database.attendance.aggregate([
+        {'$group': {'_id': {'date': '$date', 'user_id': '$user_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ]))
+
+def seed_users(database, user_ids):
+    for user_id in sorted(user_ids):
+        database.users.update_one(
+            {'user_id': user_id},
+            {'$setOnInsert': {'name': user_id, 'version': 1, 'registered_date': datetime.now(),
+                              'last_updated': datetime.now()}},
+            upsert=True
+        )
+
+def run(args):
+    from db_client import create_client, AttendanceJournal, DATABASE_NAME
+    from database import Database
+
+    if args.database == DATABASE_NAME:
+        print(f"❌ Refusing to soak test the production database '{DATABASE_NAME}', pick another --database")
+        return False
+
+    engine = create_engine()
+    if engine is None:
+        print("❌ No recognition engine available, train the model first")
+        return False
+
+    # A dedicated database and journal, emptied first so the duplicate checks only see this run
+    client = create_client()
+    client.drop_database(args.database)
+    journal_dir = tempfile.mkdtemp(prefix='soak_journal_')
+    database = Database(client, AttendanceJournal(os.path.join(journal_dir, 'journal.jsonl')), name=args.database)
+
+    if args.video:
+        captures = [LoopedCapture(args.video[i % len(args.video)], args.fps) for i in range(args.cameras)]
+        user_ids = set()
+    else:
+        photos = load_photos(args.dataset)
+        if not photos:
+            print(f"❌ No registered photos in {args.dataset}")
+            return False
+        backgrounds = [os.path.join(args.backgrounds, name) for name in sorted(os.listdir(args.backgrounds))
+                       if name.endswith(IMAGE_EXTENSIONS)] if args.backgrounds else None
+        captures = [
+            CompositeCapture(photos, make_background(i, backgrounds=backgrounds), args.fps, args.dwell, seed=i)
+            for i in range(args.cameras)
+        ]
+        user_ids = {user_id for user_id, _ in photos}
+    seed_users(database, user_ids | set(getattr(engine, 'id_map', {}).values()))
+
+    recorder = MarkRecorder(database)
+    runners = [SoakRunner(f"soak-{i}", capture, engine, database, recorder) for i, capture in enumerate(captures)]
+    print(f"🔄 Soaking {args.cameras} cameras at {args.fps or 'max'} fps for {args.duration:.0f}s "
+          f"({args.warmup:.0f}s warm-up) against {'mongomock' if args.mongomock else 'MongoDB'}...")
+    for runner in runners:
+        runner.start()
+
+    samples = []
+    try:
+        time.sleep(args.warmup)
+        for runner in runners:
+            runner.reset_counters()
+        baseline = rss_bytes()
+        start = time.perf_counter()
+        next_sample = start + args.interval
+        print(f"📊 Baseline RSS {baseline / 2**20:.1f} MiB\n")
+        print(f"{'Elapsed':>8} {'Frames':>9} {'FPS':>7} {'p99 ms':>7} {'Marks':>6} {'RSS MiB':>9} {'Drift MiB':>10}")
+        while time.perf_counter() - start < args.duration:
+            if any(runner.error for runner in runners):
+                break
+            time.sleep(max(min(next_sample, start + args.duration) - time.perf_counter(), 0))
+            now = time.perf_counter()
+            rss = rss_bytes()
+            samples.append((now - start, rss))
+            frames = sum(runner.frames for runner in runners)
+            latency = LatencyHistogram().merge(runner.latency for runner in runners)
+            print(f"{now - start:>7.0f}s {frames:>9} {frames / (now - start):>7.1f} "
+                  f"{latency.percentile(99) * 1000:>7.1f} {recorder.calls:>6} "
+                  f"{rss / 2**20:>9.1f} {(rss - baseline) / 2**20:>10.2f}")
+            next_sample += args.interval
+    finally:
+        for runner in runners:
+            runner.stop()
+    elapsed = time.perf_counter() - start
+
+    return report(args, runners, recorder, database, baseline, samples, elapsed)
+
+def report(args, runners, recorder, database, baseline, samples, elapsed):
+    """Print the soak results and return True if every check passed"""
+    frames = sum(runner.frames for runner in runners)
+    latency = LatencyHistogram().merge(runner.latency for runner in runners)
+    recognized = sum(runner.recognized for runner in runners)
+    misidentified = sum(runner.misidentified for runner in runners)
+    fps = frames / elapsed if elapsed else 0.0
+    growth = (samples[-1][1] - baseline) / 2**20 if samples else 0.0
+    slope = 0.0
+    if len(samples) >= 3:
+        hours = np.array([t for t, _ in samples]) / 3600
+        slope = np.polyfit(hours, np.array([rss for _, rss in samples]) / 2**20, 1)[0]
+
+    duplicates = find_duplicates(database)
+    repeated = {key: count for key, count in recorder.accepted.items() if count > 1}
+    records = database.attendance.count_documents({})
+
+    print(f"\n📊 {frames} frames in {elapsed:.0f}s: {fps:.1f} frames/s over {len(runners)} cameras")
+    print(f"📊 Frame latency p50 {latency.percentile(50) * 1000:.1f} ms, p95 {latency.percentile(95) * 1000:.1f} ms, "
+          f"p99 {latency.percentile(99) * 1000:.1f} ms")
+    print(f"📊 {recorder.calls} check-in writes, p50 {recorder.latency.percentile(50) * 1000:.2f} ms, "
+          f"p99 {recorder.latency.percentile(99) * 1000:.2f} ms, {records} attendance records")
+    if recognized:
+        print(f"📊 {recognized} recognitions, {misidentified / recognized:.1%} not the person shown")
+    print(f"📊 RSS growth {growth:.1f} MiB ({slope:.1f} MiB/hour)")
+
+    min_fps = args.min_fps if args.min_fps is not None else (
+        MIN_FPS_RATIO * args.fps * args.cameras if args.fps else 0.0)
+    checks = [
+        ("cameras ran without errors", not any(runner.error for runner in runners)),
+        (f"throughput >= {min_fps:.1f} frames/s", fps >= min_fps),
+        (f"p99 frame latency <= {args.max_p99_ms:.0f} ms", latency.percentile(99) * 1000 <= args.max_p99_ms),
+        (f"RSS growth <= {args.max_rss_growth:.0f} MiB", growth <= args.max_rss_growth),
+        ("one attendance record per user per day", not duplicates),
+        ("each check-in accepted once across cameras", not repeated),
+        ("every accepted check-in was stored", records == len(recorder.accepted)),
+    ]
+    if args.max_misidentified is not None:
+        rate = misidentified / recognized if recognized else 0.0
+        checks.append((f"misidentified <= {args.max_misidentified:.0%}", rate <= args.max_misidentified))
+
+    print()
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+    for duplicate in duplicates[:10]:
+        print(f"   duplicate: {duplicate['_id']['user_id']} on {duplicate['_id']['date']} x{duplicate['count']}")
+    return all(passed for _, passed in checks)
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test capture, recognition and attendance marking under load")
+    parser.add_argument('--cameras', type=int, default=4, help="Synthetic cameras running concurrently")
+    parser.add_argument('--fps', type=float, default=5, help="Frames/sec per camera, 0 for as fast as possible")
+    parser.add_argument('--duration', type=float, default=3600, help="Seconds to measure after warm-up")
+    parser.add_argument('--warmup', type=float, default=30, help="Seconds before measuring starts")
+    parser.add_argument('--interval', type=float, default=60, help="Seconds between progress samples")
+    parser.add_argument('--dataset', default=SYNTHETIC_DATASET_DIR, help="Registered photos to composite")
+    parser.add_argument('--backgrounds', help="Directory of background images, generated when omitted")
+    parser.add_argument('--dwell', type=int, default=DWELL_FRAMES, help="Frames each visitor stays in view")
+    parser.add_argument('--video', nargs='+', help="Loop these video files instead of compositing photos")
+    parser.add_argument('--mongomock', action='store_true', help="Use an in-process mongomock server instead of mongod")
+    parser.add_argument('--database', default=SOAK_DATABASE, help="Database to write to, dropped at start")
+    parser.add_argument('--min-fps', type=float, default=None,
+                        help=f"Required total frames/s (default {MIN_FPS_RATIO:.0%}% of cameras x fps)")
+    parser.add_argument('--max-p99-ms', type=float, default=P99_LATENCY_LIMIT)
+    parser.add_argument('--max-rss-growth', type=float, default=RSS_GROWTH_LIMIT, help="MiB")
+    parser.add_argument('--max-misidentified', type=float, default=None,
+                        help="Fail above this fraction of recognitions naming someone else")
+    args = parser.parse_args()
+    args.fps = args.fps or None
+
+    if args.mongomock:
+        if mongomock is None:
+            print("❌ mongomock is not installed: pip install mongomock")
+            sys.exit(2)
+        # Every MongoClient created from here on, including database.py's, is served in memory
+        with mongomock.patch(servers=(), on_new='create'):
+            passed = run(args)
+    else:
+        passed = run(args)
+
+    print(f"\n{'✅ Soak test passed' if passed else '❌ Soak test failed'}")
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
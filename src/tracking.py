@@ -0,0 +1,76 @@
+import itertools
+
+IOU_THRESHOLD = 0.3  # Minimum overlap for a box to continue a track
+MAX_MISSED_FRAMES = 5  # Frames a track survives without a matching box
+
+def iou(box_a, box_b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / float(aw * ah + bw * bh - inter)
+
+class FaceTracker:
+    """Greedy IoU tracker that links face boxes across frames of one stream.
+
+    Each track carries a state dict where per-face work (alignment, identity,
+    embeddings) can be cached for as long as the face stays in view.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_missed=MAX_MISSED_FRAMES):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks = {}
+        self._ids = itertools.count(1)
+
+    def update(self, boxes):
+        """Match this frame's boxes to tracks and return a track id per box"""
+        pairs = sorted(
+            (
+                (iou(track['box'], box), track_id, index)
+                for track_id, track in self.tracks.items()
+                for index, box in enumerate(boxes)
+            ),
+            reverse=True
+        )
+
+        assigned = [None] * len(boxes)
+        matched_tracks = set()
+        for overlap, track_id, index in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if track_id in matched_tracks or assigned[index] is not None:
+                continue
+            assigned[index] = track_id
+            matched_tracks.add(track_id)
+
+        for index, box in enumerate(boxes):
+            track_id = assigned[index]
+            if track_id is None:
+                track_id = assigned[index] = next(self._ids)
+                self.tracks[track_id] = {'box': box, 'missed': 0, 'state': {}, 'new': True}
+            else:
+                track = self.tracks[track_id]
+                track.update(box=box, missed=0, new=False)
+
+        # Age out tracks that were not seen in this frame
+        for track_id in list(self.tracks):
+            if track_id not in assigned:
+                self.tracks[track_id]['missed'] += 1
+                if self.tracks[track_id]['missed'] > self.max_missed:
+                    del self.tracks[track_id]
+        return assigned
+
+    def state(self, track_id):
+        """Per-track cache dict, or an empty throwaway dict for unknown tracks"""
+        track = self.tracks.get(track_id)
+        return track['state'] if track else {}
+
+    def is_new(self, track_id):
+        """Whether the track started in the most recent update"""
+        track = self.tracks.get(track_id)
+        return bool(track and track['new'])
@@ -2,13 +2,125 @@ import cv2
 import os
 import numpy as np
 import pickle
+import argparse
+from detectors import create_detector
+from preprocessing import FacePreprocessor
+from model_store import store, MODEL_FILE, LABEL_MAP_FILE, THRESHOLDS_FILE
+from image_store import images
+from identities import IdentityResolver
 
 DATASET_DIR = "images/registered"
-MODEL_PATH = "data/trained_model.yml"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
 
-def train_model():
-    # Initialize face detector
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+DEFAULT_THRESHOLD = 100  # Used when a label cannot be calibrated
+IMPOSTOR_MARGIN = 0.9  # Fraction of the nearest impostor distance to accept
+
+def chi_square_distances(histograms):
+    """Pairwise LBPH distances (OpenCV HISTCMP_CHISQR_ALT) between histograms"""
+    histograms = np.asarray(histograms, dtype=np.float64)
+    count = len(histograms)
+    distances = np.zeros((count, count))
+    for i in range(count - 1):
+        diff = histograms[i + 1:] - histograms[i]
+        total = histograms[i + 1:] + histograms[i]
+        terms = np.divide(diff * diff, total, out=np.zeros_like(diff), where=total > 0)
+        distances[i, i + 1:] = 2 * terms.sum(axis=1)
+    return distances + distances.T
+
+def calibrate_thresholds(recognizer, labels):
+    """Compute a per-label distance threshold from leave-one-out matches over the training crops.
+
+    For every crop, the nearest other crop of the same label is its genuine
+    distance and the nearest crop of another label its impostor distance.
+    A label's threshold sits midway between its worst genuine and closest
+    impostor distance when the two separate, and just below the impostor
+    distance otherwise.
+    """
+    labels = np.asarray(labels)
+    histograms = [histogram.ravel() for histogram in recognizer.getHistograms()]
+    distances = chi_square_distances(histograms)
+    np.fill_diagonal(distances, np.inf)
+
+    thresholds = {}
+    for label in np.unique(labels):
+        own = labels == label
+        if own.all():
+            thresholds[int(label)] = DEFAULT_THRESHOLD
+            continue
+
+        impostor = distances[own][:, ~own].min()
+        genuine = None
+        if own.sum() > 1:
+            genuine = distances[own][:, own].min(axis=1).max()
+
+        if genuine is not None and genuine < impostor:
+            threshold = (genuine + impostor) / 2
+        else:
+            threshold = impostor * IMPOSTOR_MARGIN
+        thresholds[int(label)] = float(threshold)
+        print(f"Label {label}: genuine={genuine if genuine is None else round(genuine, 2)} "
+              f"impostor={impostor:.2f} threshold={threshold:.2f}")
+    return thresholds
+
+def store_image(img_path, seen):
+    """Add an image to the image store, returning its id or None if an identical file was already used"""
+    image_id = images.put_file(img_path)
+    if image_id in seen:
+        print(f"Skipping duplicate image: {img_path}")
+        return None
+    seen.add(image_id)
+    return image_id
+
+def load_face_crops(user_dir, preprocessor, seen):
+    """Load the enrollment face crops in a per-user directory"""
+    crops = []
+    for img_name in sorted(os.listdir(user_dir)):
+        if not img_name.endswith(IMAGE_EXTENSIONS):
+            continue
+        img_path = os.path.join(user_dir, img_name)
+        image_id = store_image(img_path, seen)
+        if image_id is None:
+            continue
+        image = images.imread(image_id, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"Failed to load image: {img_path}")
+            continue
+        crops.append(preprocessor.normalize(image))  # Align, resize and equalize
+    return crops
+
+def detect_face_crop(detector, preprocessor, img_path, seen):
+    """Detect the largest face in a full photo and return it as a normalized crop"""
+    image_id = store_image(img_path, seen)
+    if image_id is None:
+        return None
+    
+    # Read and convert image to grayscale
+    image = images.imread(image_id)
+    if image is None:
+        print(f"Failed to load image: {img_path}")
+        return None
+        
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    # The largest face is the subject, smaller hits are usually background noise
+    face = detector.detect_largest(image, gray)
+    if face is None:
+        return None
+    (x, y, w, h) = face
+    face_roi = gray[y:y+h, x:x+w]
+    return preprocessor.normalize(face_roi)  # Align, resize and equalize
+
+def train_model(resolver=None):
+    # Initialize face detector (the same backend the live loops use). Haar now runs
+    # with the shared minNeighbors=5 instead of the old training-only 3: only the
+    # largest face per photo is kept, and 3 let background hits through.
+    detector = create_detector()
+    
+    # Initialize crop normalization (identical to the live pipeline)
+    preprocessor = FacePreprocessor()
+    
+    # Several photos or directories can belong to one person
+    resolver = resolver or IdentityResolver.load()
     
     # Initialize face recognizer
     recognizer = cv2.face_LBPHFaceRecognizer.create()
@@ -17,6 +129,7 @@ def train_model():
     labels = []
     label_map = {}
     current_label = 0
+    seen = set()  # Image store ids already used, so identical files are trained once
     
     print("Training model...")
     
@@ -25,46 +138,33 @@ def train_model():
         print(f"Dataset directory not found: {DATASET_DIR}")
         return
     
-    # Load and process images
-    for img_name in os.listdir(DATASET_DIR):
-        if not img_name.endswith(('.jpg', '.jpeg', '.png')):
-            continue
-            
-        user_id = os.path.splitext(img_name)[0]
-        img_path = os.path.join(DATASET_DIR, img_name)
+    # Load and process images: flat files hold one photo per user, while
+    # per-user directories hold several enrollment face crops
+    for entry in sorted(os.listdir(DATASET_DIR)):
+        entry_path = os.path.join(DATASET_DIR, entry)
+        user_id = resolver.user_id_for(entry)
         
-        print(f"Processing image: {img_path}")
+        if os.path.isdir(entry_path):
+            print(f"Processing directory: {entry_path}")
+            crops = load_face_crops(entry_path, preprocessor, seen)
+        elif entry.endswith(IMAGE_EXTENSIONS):
+            print(f"Processing image: {entry_path}")
+            crop = detect_face_crop(detector, preprocessor, entry_path, seen)
+            crops = [crop] if crop is not None else []
+        else:
+            continue
         
-        # Read and convert image to grayscale
-        image = cv2.imread(img_path)
-        if image is None:
-            print(f"Failed to load image: {img_path}")
+        if not crops:
             continue
-            
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
-        # Detect faces with more lenient parameters
-        detected_faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,  # More gradual scaling
-            minNeighbors=3,   # Fewer neighbors required
-            minSize=(30, 30)  # Smaller minimum face size
-        )
+        # Add faces and labels
+        if user_id not in label_map:
+            label_map[user_id] = current_label
+            current_label += 1
         
-        if len(detected_faces) > 0:
-            (x, y, w, h) = detected_faces[0]  # Use the first detected face
-            face_roi = gray[y:y+h, x:x+w]
-            face_roi = cv2.resize(face_roi, (100, 100))  # Normalize size
-            
-            # Add face and label
-            faces.append(face_roi)
-            
-            if user_id not in label_map:
-                label_map[user_id] = current_label
-                current_label += 1
-                
-            labels.append(label_map[user_id])
-            print(f"Successfully processed user: {user_id}")
+        faces.extend(crops)
+        labels.extend([label_map[user_id]] * len(crops))
+        print(f"Successfully processed user: {user_id} ({len(crops)} samples)")
     
     if not faces:
         print("No faces found in the dataset!")
@@ -76,29 +176,42 @@ def train_model():
     
     print(f"Training with {len(faces)} faces...")
     
+    staging_dir = None
     try:
         # Train the recognizer
         recognizer.train(faces, labels)
         
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-        
-        # Save the model
-        recognizer.save(MODEL_PATH)
+        # Calibrate per-label recognition thresholds
+        thresholds = calibrate_thresholds(recognizer, labels)
         
-        # Save the label mapping
-        label_map_path = os.path.join(os.path.dirname(MODEL_PATH), 'label_map.pkl')
-        with open(label_map_path, 'wb') as f:
+        # Write the model, label mapping and thresholds into a staging
+        # directory, then publish them together as one new version
+        staging_dir = store.stage()
+        recognizer.save(os.path.join(staging_dir, MODEL_FILE))
+        with open(os.path.join(staging_dir, LABEL_MAP_FILE), 'wb') as f:
             pickle.dump(label_map, f)
+        with open(os.path.join(staging_dir, THRESHOLDS_FILE), 'wb') as f:
+            pickle.dump(thresholds, f)
+        version = store.publish(staging_dir)
         
         print(" Model trained successfully!")
-        print(f"Model saved to: {MODEL_PATH}")
-        print(f"Label map saved to: {label_map_path}")
+        print(f"Model version {version} saved to: {store.version_dir(version)}")
         print(f"Total users trained: {len(label_map)}")
         
     except Exception as e:
+        if staging_dir is not None and os.path.exists(staging_dir):
+            store.discard(staging_dir)
         print(f"Error during training: {str(e)}")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the LBPH model from the registered images")
+    parser.add_argument('--db-aliases', action='store_true',
+                        help="Also group images by the aliases stored on MongoDB user documents")
+    args = parser.parse_args()
+    
+    users = None
+    if args.db_aliases:
+        from database import db
+        users = db.users
+    train_model(IdentityResolver.load(users=users))
     input("Press Enter to exit...")
\ No newline at end of file
@@ -4,34 +4,57 @@ from database import db
 from tabulate import tabulate
 
 tolerance_value = 0.1  # 10% tolerance
+PAGE_SIZE = 50  # Records shown per page
 
-def view_attendance(date=None):
-    """View attendance records for a specific date or all dates"""
-    records = db.get_attendance(date)
+def view_attendance(date=None, page_size=PAGE_SIZE):
+    """View attendance records for a specific date or all dates, one page at a time"""
+    total_records = db.count_attendance(date)
     
-    if not records:
+    if not total_records:
         print(f"❌ No attendance records found{' for ' + date if date else ''}!")
         return
     
-    # Convert records to DataFrame for better display
-    df = pd.DataFrame(records)
-    
     if date:
         print(f"\n📊 Attendance for {date}:")
     else:
         print("\n📊 All Attendance Records:")
     
-    # Format the DataFrame
-    df = df[['date', 'time', 'name', 'user_id']]  # Reorder columns
-    df.columns = ['Date', 'Time', 'Name', 'User ID']  # Rename columns
+    page = 0
+    while True:
+        start = page * page_size
+        records = db.get_attendance(date, skip=start, limit=page_size)
+        if not records:
+            break
+        
+        # Convert records to DataFrame for better display
+        df = pd.DataFrame(records)
+        
+        # Format the DataFrame
+        df = df.reindex(columns=['date', 'time', 'name', 'user_id'])  # Reorder columns
+        df.columns = ['Date', 'Time', 'Name', 'User ID']  # Rename columns
+        
+        # Display using tabulate for better formatting
+        print(tabulate(df, headers='keys', tablefmt='grid', showindex=False))
+        print(f"\nShowing records {start + 1}-{start + len(df)} of {total_records}")
+        
+        if start + len(df) >= total_records:
+            break
+        
+        action = input("Press Enter for next page, 'p' for previous, 'q' to stop: ").strip().lower()
+        if action == 'q':
+            break
+        elif action == 'p':
+            page = max(page - 1, 0)
+        else:
+            page += 1
     
-    # Display using tabulate for better formatting
-    print(tabulate(df, headers='keys', tablefmt='grid', showindex=False))
-    print(f"\nTotal Records: {len(df)}")
+    print(f"\nTotal Records: {total_records}")
     
     # Calculate attendance percentage
-    expected_attendance = len(db.get_all_users())
-    actual_attendance = len(df)
+    expected_attendance = db.count_users()
+    actual_attendance = total_records
+    if not expected_attendance:
+        return
     
     # Check if attendance is within acceptable limits
     if abs(actual_attendance - expected_attendance) <= tolerance_value * expected_attendance: